@@ -9,8 +9,6 @@ import logging
 sys.path.append(str(Path(__file__).parent.parent))
 
 import config
-from services.rag_service import RAGService
-from services.db_service import DBService
 from utils.logger import setup_colored_logger
 
 setup_colored_logger()
@@ -18,8 +16,83 @@ logger = logging.getLogger(__name__)
 
 UPLOAD_FOLDER = config.DATA_PATH
 IMAGES_FOLDER = config.IMAGES_PATH
-db_service = DBService()
-rag_service = RAGService()
+QUERY_ONLY_MESSAGE = (
+    "⚠️ App đang chạy ở chế độ chỉ chat (RAG_QUERY_ONLY=1), không hỗ trợ thao tác này"
+)
+
+# Services được khởi tạo lazy: import UI không kéo theo Docling/Qdrant/NLTK.
+# Process chỉ chat không bao giờ import stack parsing; DBService chỉ được dựng
+# ở lần upload/xóa/rebuild đầu tiên.
+_services_lock = threading.Lock()
+_db_service = None
+_rag_service = None
+
+
+def get_db_service():
+    global _db_service
+    if config.QUERY_ONLY:
+        raise RuntimeError(QUERY_ONLY_MESSAGE)
+    if _db_service is None:
+        with _services_lock:
+            if _db_service is None:
+                from services.db_service import DBService
+
+                _db_service = DBService()
+    return _db_service
+
+
+def get_rag_service():
+    global _rag_service
+    if _rag_service is None:
+        with _services_lock:
+            if _rag_service is None:
+                from services.rag_service import RAGService
+
+                _rag_service = RAGService()
+    return _rag_service
+
+
+def prewarm_ingestion() -> None:
+    """
+    Dựng DBService và load model Docling ở nền (nếu bật PREWARM_CONVERTERS),
+    UI vẫn phục vụ chat ngay trong lúc chờ. Bỏ qua ở chế độ chỉ chat.
+    """
+    if config.QUERY_ONLY or not config.PREWARM_CONVERTERS:
+        return
+
+    def _warm_up():
+        try:
+            get_db_service().warm_up()
+        except Exception as e:
+            logger.warning(f"Không thể warm-up ingestion: {e}")
+
+    threading.Thread(target=_warm_up, daemon=True).start()
+
+
+def start_data_watcher() -> None:
+    """
+    Bật watcher cho thư mục data (nếu WATCH_DATA_FOLDER): file do job sync thả vào
+    được ingest tự động. Dựng ở nền để UI không phải chờ kết nối Qdrant.
+    """
+    if config.QUERY_ONLY or not config.WATCH_DATA_FOLDER:
+        return
+
+    def _start():
+        try:
+            from services.watcher_service import WatcherService
+
+            WatcherService(
+                get_db_service(),
+                UPLOAD_FOLDER,
+                poll_seconds=config.WATCH_POLL_SECONDS,
+                debounce_seconds=config.WATCH_DEBOUNCE_SECONDS,
+                batch_size=config.WATCH_BATCH_SIZE,
+                queue_size=config.WATCH_QUEUE_SIZE,
+            ).start()
+        except Exception as e:
+            logger.warning(f"Không thể bật watcher thư mục data: {e}")
+
+    threading.Thread(target=_start, daemon=True).start()
 
 
 # --- CÁC HÀM CHO TAB QUẢN LÝ FILE --- #
@@ -51,6 +124,12 @@ def list_files():
 
 def upload_file(file):
     """Upload một file với error handling và status feedback"""
+    if config.QUERY_ONLY:
+        return (
+            gr.update(choices=list_files(), value=[]),
+            gr.update(value=None),
+            QUERY_ONLY_MESSAGE,
+        )
     if not file:
         new_files = list_files()
         return (
@@ -72,7 +151,7 @@ def upload_file(file):
         shutil.copy2(file, dest)
         # Bước 2: Thêm vào database (với rollback nếu thất bại)
         try:
-            db_service.add_chunks_from_list_file(list_file_path=[dest])
+            get_db_service().add_chunks_from_list_file(list_file_path=[dest])
             status = "✅ File đã được lưu thành công"
         except Exception as db_error:
             # Rollback: xóa file đã copy
@@ -88,10 +167,12 @@ def upload_file(file):
 def delete_selected_files(selected_files):
     """Xóa file được chọn và cập nhật danh sách"""
     # Bắt đầu thao tác xóa
+    if config.QUERY_ONLY:
+        return gr.update(choices=list_files(), value=[]), QUERY_ONLY_MESSAGE
     if not selected_files:
         new_files = list_files()
         return gr.update(choices=new_files, value=[]), "⚠️ Không có file nào được chọn"
-    deleted_count = 0
+    deleted_paths = []
     errors = []
     try:
         for filename in selected_files:
@@ -99,16 +180,23 @@ def delete_selected_files(selected_files):
             # Xử lý xóa file
             if file_path.exists():
                 file_path.unlink()
-                try:
-                    db_service.delete_chunks_from_list_file(list_file_path=[file_path])
-                    deleted_count += 1
-                except Exception as db_error:
-                    logger.error(f"Lỗi khi xóa khỏi database: {db_error}")
+                deleted_paths.append(file_path)
             else:
                 errors.append(f"File không tồn tại: {filename}")
     except Exception as e:
         errors.append(f"Lỗi khi xóa: {str(e)}")
-    status = f"✅ Đã xóa {deleted_count} file(s)"
+    deleted_chunks = 0
+    if deleted_paths:
+        # Xóa khỏi database 1 lần cho tất cả file đã chọn
+        try:
+            counts = get_db_service().delete_chunks_from_list_file(
+                list_file_path=deleted_paths
+            )
+            deleted_chunks = sum(c or 0 for c in counts.values())
+        except Exception as db_error:
+            logger.error(f"Lỗi khi xóa khỏi database: {db_error}")
+            errors.append(f"Lỗi khi xóa khỏi database: {db_error}")
+    status = f"✅ Đã xóa {len(deleted_paths)} file(s) ({deleted_chunks} chunks)"
     if errors:
         status += f"\n❌ Lỗi: {'; '.join(errors)}"
     new_files = list_files()
@@ -118,6 +206,8 @@ def delete_selected_files(selected_files):
 def delete_all_files():
     """Xóa tất cả file và cập nhật danh sách"""
     # Bắt đầu thao tác xóa tất cả
+    if config.QUERY_ONLY:
+        return gr.update(choices=list_files(), value=[]), QUERY_ONLY_MESSAGE
     try:
         files = list(UPLOAD_FOLDER.glob("*"))
         file_count = len([f for f in files if f.is_file()])
@@ -129,7 +219,7 @@ def delete_all_files():
                 # Đang xóa file
                 f.unlink()
         try:
-            db_service.clear_all_database()
+            get_db_service().clear_all_database()
             logger.info("Đã xóa toàn bộ database thành công")
         except Exception as db_error:
             logger.error(f"Lỗi khi xóa database: {db_error}")
@@ -167,7 +257,9 @@ def respond(user_message, history):
         return history, ""
     try:
         # Lấy phản hồi từ AI
-        ai_answer = rag_service.semantic_query(query=user_message.strip(), top_k=10)
+        ai_answer = get_rag_service().semantic_query(
+            query=user_message.strip(), top_k=10
+        )
         # Thêm vào lịch sử với định dạng đúng [[user, ai], [user2, ai2]]
         history.append([user_message.strip(), ai_answer])
         # Giới hạn lịch sử để tránh vấn đề về bộ nhớ
@@ -187,4 +279,4 @@ def clear_chat():
 
 
 def reload_database() -> None:
-    db_service.rebuild_database_from_folder(folder_path=UPLOAD_FOLDER)
+    get_db_service().rebuild_database_from_folder(folder_path=UPLOAD_FOLDER)
@@ -149,4 +149,5 @@ with gr.Blocks(title="AI Document Assistant") as demo:
     # Tự động refresh file list khi app khởi động
     demo.load(fn=refresh_file_list, outputs=file_list)
 
-demo.launch()
+if __name__ == "__main__":
+    demo.launch()
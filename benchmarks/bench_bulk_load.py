@@ -0,0 +1,112 @@
+"""
+So sánh tốc độ nạp chunks đã embed vào Qdrant khi rebuild:
+- Cũ: add_chunks từng file qua QdrantDocumentStore.write_documents (kiểm tra trùng,
+  write_batch_size=128, chờ từng batch, HNSW index chạy song song lúc ghi).
+- Mới: QdrantManager.bulk_load() (upload_points song song, wait=False, indexing_threshold=0
+  trong lúc nạp, bật lại và chờ optimizer xong).
+Báo points/s của giai đoạn upload và của cả quá trình (gồm build index).
+
+Nên chạy với server thật (--url): chế độ in-memory của qdrant-client không có HNSW/optimizer
+nên chỉ kiểm tra đúng/sai. Collection tạm, xóa sau khi chạy.
+Chạy: python benchmarks/bench_bulk_load.py --url http://localhost:6333 [--files 200] [--chunks 100] [--dim 1536]
+"""
+
+from pathlib import Path
+import argparse
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from haystack import Document
+from haystack_integrations.document_stores.qdrant import QdrantDocumentStore
+
+import config
+from storage.file_manifest import FileManifest
+from storage.qdrant_store_manager import QdrantManager
+
+
+def _make_docs(n_files: int, n_chunks: int, dim: int) -> dict:
+    rng = np.random.default_rng(0)
+    docs_dict = {}
+    for i in range(n_files):
+        source = f"/data/file_{i:04d}.pdf"
+        vectors = rng.random((n_chunks, dim), dtype=np.float32)
+        docs_dict[source] = [
+            Document(
+                id=uuid.uuid4().hex,
+                content=f"Chunk {j} của {source} " * 30,
+                meta={"source": source, "category": "text", "trace": f"Trang {j}"},
+                embedding=vectors[j].tolist(),
+            )
+            for j in range(n_chunks)
+        ]
+    return docs_dict
+
+
+def _manager(args, index: str) -> QdrantManager:
+    store = QdrantDocumentStore(
+        location=None if args.url else ":memory:",
+        url=args.url,
+        index=index,
+        embedding_dim=args.dim,
+        recreate_index=True,
+        hnsw_config={"m": 16, "ef_construct": 64},
+        write_batch_size=128,
+        payload_fields_to_index=[
+            {"field_name": "meta.source", "field_schema": {"type": "keyword"}},
+        ],
+    )
+    store.count_documents()  # khởi tạo client + collection
+    manifest = FileManifest(Path(tempfile.mkdtemp()) / "manifest.json", index)
+    return QdrantManager(store, manifest=manifest)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=200)
+    ap.add_argument("--chunks", type=int, default=100)
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--url", default=None)
+    ap.add_argument("--parallel", type=int, default=config.BULK_UPLOAD_PARALLEL)
+    args = ap.parse_args()
+    config.BULK_UPLOAD_PARALLEL = args.parallel
+
+    docs_dict = _make_docs(args.files, args.chunks, args.dim)
+    total = args.files * args.chunks
+    print(f"{args.files} files x {args.chunks} chunks = {total} points, dim {args.dim}")
+
+    index = f"bench_bulk_{uuid.uuid4().hex[:8]}"
+    manager = _manager(args, index)
+    t0 = time.perf_counter()
+    for source, docs in docs_dict.items():
+        manager.add_chunks({source: docs})
+    manager._wait_until_indexed(config.BULK_OPTIMIZE_TIMEOUT)
+    elapsed = time.perf_counter() - t0
+    print(
+        f"{'cũ (write_documents)':<24} {elapsed:8.1f}s  {total / elapsed:9.0f} points/s  "
+        f"{manager._points_count()} points"
+    )
+    if args.url:
+        manager.client.delete_collection(index)
+
+    index = f"bench_bulk_{uuid.uuid4().hex[:8]}"
+    manager = _manager(args, index)
+    with manager.bulk_load():
+        for source, docs in docs_dict.items():
+            manager.add_chunks({source: docs})
+    s = manager.bulk_stats
+    print(
+        f"{'mới (bulk_load)':<24} {s['load_seconds'] + s['index_seconds']:8.1f}s  "
+        f"{s['points_per_sec']:9.0f} points/s  {manager._points_count()} points "
+        f"(upload {s['upload_points_per_sec']:.0f} points/s, build index {s['index_seconds']:.1f}s)"
+    )
+    if args.url:
+        manager.client.delete_collection(index)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+So sánh chunker theo token (TokenChunker) và DocumentSplitter cũ (350 từ, tách câu NLTK):
+- chunks/s khi chunk cả corpus (TokenChunker với nhiều số thread khác nhau).
+- Phân bố số token mỗi chunk (min/p50/p95/max, tỉ lệ vượt ngân sách) đo bằng cùng tokenizer.
+
+Corpus: các file .txt/.md trong --folder, hoặc corpus tiếng Việt tổng hợp nếu không truyền.
+Chạy: python benchmarks/bench_chunker.py [--folder data] [--docs 50] [--max-tokens 512]
+"""
+
+from pathlib import Path
+import argparse
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from haystack import Document
+
+import config
+from processing._chunker import TokenChunker
+from utils.tokens import TokenCounter
+
+_WORDS = (
+    "kinh tế vĩ mô Việt Nam tăng trưởng lạm phát tỷ giá ngân hàng nhà nước "
+    "đầu tư công xuất khẩu nhập khẩu doanh nghiệp thị trường chứng khoán "
+    "đô thị hóa dân số lao động việc làm thu nhập bình quân chính sách tiền tệ"
+).split()
+
+
+def _synthetic_docs(n_docs: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+
+    def sentence() -> str:
+        words = rng.choices(_WORDS, k=rng.randint(6, 40))
+        if rng.random() < 0.2:
+            words.insert(
+                rng.randint(0, len(words)), f"{rng.randint(1, 99)}.{rng.randint(0, 9)}%"
+            )
+        return " ".join(words).capitalize() + rng.choice([".", ".", ".", "!", "?"])
+
+    docs = []
+    for _ in range(n_docs):
+        paragraphs = [
+            " ".join(sentence() for _ in range(rng.randint(2, 10)))
+            for _ in range(rng.randint(20, 120))
+        ]
+        docs.append(
+            Document(content="\n\n".join(paragraphs), meta={"category": "text"})
+        )
+    return docs
+
+
+def _folder_docs(folder: Path) -> list:
+    docs = []
+    for path in sorted(folder.rglob("*")):
+        if path.suffix.lower() in (".txt", ".md"):
+            text = path.read_text(encoding="utf-8", errors="ignore")
+            docs.append(Document(content=text, meta={"category": "text"}))
+    return docs
+
+
+def _distribution(name, elapsed, chunks, counter, max_tokens):
+    sizes = sorted(counter.count_many([c.content for c in chunks]))
+    p95 = sizes[int(len(sizes) * 0.95) - 1] if sizes else 0
+    over = sum(n > max_tokens for n in sizes)
+    print(
+        f"{name:<24} {elapsed:7.2f}s {len(chunks) / elapsed:9.0f} chunks/s  "
+        f"{len(chunks):6d} chunks  tokens min {sizes[0]} p50 {statistics.median(sizes):.0f} "
+        f"p95 {p95} max {sizes[-1]}  vượt {max_tokens}: {over / len(sizes):.1%}"
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--folder", type=Path, default=None)
+    ap.add_argument("--docs", type=int, default=50)
+    ap.add_argument("--max-tokens", type=int, default=config.CHUNK_MAX_TOKENS)
+    ap.add_argument("--overlap", type=int, default=config.CHUNK_OVERLAP_TOKENS)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    ap.add_argument(
+        "--skip-legacy", action="store_true", help="không chạy DocumentSplitter"
+    )
+    args = ap.parse_args()
+
+    docs = _folder_docs(args.folder) if args.folder else _synthetic_docs(args.docs)
+    total_chars = sum(len(d.content) for d in docs)
+    counter = TokenCounter(config.EMBEDDING_MODEL)
+    print(
+        f"{len(docs)} documents, {total_chars / 1e6:.1f}M ký tự, "
+        f"tokenizer {'tiktoken' if counter.exact else 'ước lượng'}"
+    )
+
+    if not args.skip_legacy:
+        from haystack.components.preprocessors import DocumentSplitter
+
+        splitter = DocumentSplitter(
+            split_by="word",
+            split_length=350,
+            split_overlap=45,
+            respect_sentence_boundary=True,
+        )
+        splitter.warm_up()
+        t0 = time.perf_counter()
+        chunks = splitter.run(documents=docs)["documents"]
+        _distribution(
+            "DocumentSplitter (word)",
+            time.perf_counter() - t0,
+            chunks,
+            counter,
+            args.max_tokens,
+        )
+
+    for n in args.workers:
+        chunker = TokenChunker(
+            max_tokens=args.max_tokens, overlap_tokens=args.overlap, workers=n
+        )
+        t0 = time.perf_counter()
+        chunks = chunker.run(docs)["documents"]
+        _distribution(
+            f"TokenChunker workers={n}",
+            time.perf_counter() - t0,
+            chunks,
+            counter,
+            args.max_tokens,
+        )
+
+
+if __name__ == "__main__":
+    main()
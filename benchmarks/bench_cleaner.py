@@ -0,0 +1,168 @@
+"""
+So sánh stage làm sạch + validate trước khi embed:
+- Cũ: lọc rỗng -> DocumentCleaner của Haystack (tách bảng/không bảng, tạo Document mới)
+  -> _validate_documents cũ (tạo Document mới lần nữa).
+- Mới: DocumentCleanerWrapper (1 lượt) -> _validate_documents; chỉ tạo Document mới cho chunk
+  có nội dung thay đổi.
+Đo thời gian / 10k chunks, số Document được tạo thêm, bộ nhớ cấp phát (tracemalloc: peak,
+số block còn sống) và kiểm tra nội dung đầu ra 2 bản giống nhau.
+
+Chạy: python benchmarks/bench_cleaner.py [--chunks 10000] [--repeat 3]
+"""
+
+from pathlib import Path
+import argparse
+import copy
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from haystack import Document
+from haystack.components.preprocessors import DocumentCleaner
+
+from processing._cleaner import DocumentCleanerWrapper
+from processing.embedder import _validate_documents
+
+_WORDS = (
+    "kinh tế vĩ mô Việt Nam tăng trưởng lạm phát tỷ giá ngân hàng nhà nước "
+    "đầu tư công xuất khẩu nhập khẩu doanh nghiệp thị trường chứng khoán"
+).split()
+
+
+# ---------------- bản cũ (giống code trước đây) ----------------
+def legacy_clean(cleaner: DocumentCleaner, documents):
+    valid_docs = [doc for doc in documents if doc.content and str(doc.content).strip()]
+    cleaned_docs = []
+    other_docs = []
+    table_positions = {}
+    for i, d in enumerate(valid_docs):
+        if d.meta.get("category") == "table":
+            table_positions[i] = d
+        else:
+            other_docs.append(d)
+    cleaned_iter = iter(cleaner.run(documents=other_docs)["documents"])
+    for i in range(len(valid_docs)):
+        if i in table_positions:
+            cleaned_docs.append(table_positions[i])
+        else:
+            try:
+                cleaned_docs.append(next(cleaned_iter))
+            except StopIteration:
+                pass
+    return cleaned_docs
+
+
+def legacy_validate(documents):
+    valid_docs = []
+    for doc in documents:
+        if not isinstance(doc, Document):
+            continue
+        if not doc.content or not str(doc.content).strip():
+            continue
+        content_str = str(doc.content).strip()
+        if len(content_str) > 0:
+            valid_docs.append(Document(content=content_str, meta=doc.meta))
+    return valid_docs
+
+
+# ---------------- dữ liệu ----------------
+def make_docs(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    docs = []
+    for i in range(n):
+        r = rng.random()
+        if r < 0.1:
+            rows = [
+                " | ".join(rng.choices(_WORDS, k=4)) for _ in range(rng.randint(2, 15))
+            ]
+            docs.append(
+                Document(content="\n".join(rows), meta={"category": "table", "i": i})
+            )
+            continue
+        text = " ".join(rng.choices(_WORDS, k=rng.randint(40, 300)))
+        if r < 0.3:  # một phần text còn khoảng trắng thừa / dòng trống
+            text = text.replace(" tế ", "  tế\n\n ", 3) + "  \n"
+        elif r < 0.32:
+            text = "   \n "
+        docs.append(Document(content=text, meta={"category": "text", "i": i}))
+    return docs
+
+
+class _CountDocuments:
+    """Đếm số Document được khởi tạo trong khối with."""
+
+    def __enter__(self):
+        self.count = 0
+        self._init = Document.__init__
+        counter = self
+
+        def init(doc, *args, **kwargs):
+            counter.count += 1
+            counter._init(doc, *args, **kwargs)
+
+        Document.__init__ = init
+        return self
+
+    def __exit__(self, *exc):
+        Document.__init__ = self._init
+
+
+def _measure(name, fn, docs, repeat, n):
+    times = []
+    for _ in range(repeat):
+        batch = copy.deepcopy(docs)
+        t0 = time.perf_counter()
+        fn(batch)
+        times.append(time.perf_counter() - t0)
+    batch = copy.deepcopy(docs)
+    with _CountDocuments() as counted:
+        tracemalloc.start()
+        out = fn(batch)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    per_10k = min(times) * 10_000 / n
+    print(
+        f"{name:<5} {per_10k * 1000:8.1f} ms/10k chunks  Document mới {counted.count:7d}  "
+        f"peak {peak / 1e6:7.2f} MB  giữ lại {current / 1e6:7.2f} MB"
+    )
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=10_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    docs = make_docs(args.chunks)
+    cleaner = DocumentCleaner(
+        remove_empty_lines=True,
+        remove_extra_whitespaces=True,
+        remove_repeated_substrings=False,
+        keep_id=True,
+    )
+    wrapper = DocumentCleanerWrapper()
+    print(f"{args.chunks} chunks (10% bảng, ~20% có khoảng trắng thừa)")
+    old = _measure(
+        "cũ",
+        lambda d: legacy_validate(legacy_clean(cleaner, d)),
+        docs,
+        args.repeat,
+        args.chunks,
+    )
+    new = _measure(
+        "mới",
+        lambda d: _validate_documents(wrapper.run(d)),
+        docs,
+        args.repeat,
+        args.chunks,
+    )
+    same = [d.content for d in old] == [d.content for d in new]
+    print(f"Nội dung giống nhau: {same} ({len(old)} / {len(new)} documents)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+So sánh xóa nhiều file khỏi Qdrant:
+- Cũ: mỗi file gọi delete_file cũ = scroll limit=1 + scroll toàn bộ chunks thành Document
+  (chỉ để log số lượng) + 1 request delete.
+- Mới: QdrantManager.delete_files = count API mỗi file + 1 request delete MatchAny cho cả batch
+  (và count=False: bỏ qua đếm).
+
+Mặc định chạy Qdrant in-memory (qdrant-client local mode); --url để đo trên server thật
+(tạo collection tạm, xóa sau khi chạy).
+Chạy: python benchmarks/bench_delete_files.py [--files 300] [--chunks 40] [--url http://localhost:6333]
+"""
+
+from pathlib import Path
+import argparse
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from haystack import Document
+from haystack_integrations.document_stores.qdrant import QdrantDocumentStore
+from qdrant_client.http import models
+from qdrant_client.http.models import FieldCondition, Filter, MatchValue
+
+from storage.file_manifest import FileManifest
+from storage.qdrant_store_manager import QdrantManager
+
+_DIM = 64
+
+
+def _populate(manager: QdrantManager, n_files: int, n_chunks: int) -> list:
+    sources = [f"/data/file_{i:04d}.pdf" for i in range(n_files)]
+    rng = random.Random(0)
+    points = []
+    for source in sources:
+        for j in range(n_chunks):
+            points.append(
+                models.PointStruct(
+                    id=str(uuid.uuid4()),
+                    vector=[rng.random() for _ in range(_DIM)],
+                    payload={
+                        "id": uuid.uuid4().hex,
+                        "content": f"Chunk {j} của {source} " * 20,
+                        "meta": {"source": source, "trace": f"Trang {j}"},
+                    },
+                )
+            )
+    for i in range(0, len(points), 1000):
+        manager.client.upsert(manager.store.index, points[i : i + 1000], wait=True)
+    return sources
+
+
+# ---------------- bản cũ (giống code trước đây) ----------------
+def legacy_delete_file(manager: QdrantManager, file_source: str) -> int:
+    flt = Filter(
+        must=[FieldCondition(key="meta.source", match=MatchValue(value=file_source))]
+    )
+
+    def scroll_all(limit=100):
+        documents, offset = [], None
+        while True:
+            points, offset = manager.client.scroll(
+                collection_name=manager.store.index,
+                scroll_filter=flt,
+                limit=limit,
+                offset=offset,
+            )
+            for p in points:
+                payload = p.payload or {}
+                documents.append(
+                    Document(content=payload.get("content", ""), meta=payload)
+                )
+            if offset is None or limit == 1:
+                return documents
+
+    if not scroll_all(limit=1):
+        return 0
+    total = len(scroll_all())
+    manager.client.delete(
+        collection_name=manager.store.index,
+        points_selector=models.FilterSelector(filter=flt),
+    )
+    return total
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=300)
+    ap.add_argument("--chunks", type=int, default=40)
+    ap.add_argument("--url", default=None)
+    args = ap.parse_args()
+
+    index = f"bench_delete_{uuid.uuid4().hex[:8]}"
+    store = QdrantDocumentStore(
+        location=None if args.url else ":memory:",
+        url=args.url,
+        index=index,
+        embedding_dim=_DIM,
+        recreate_index=True,
+    )
+    store.count_documents()  # khởi tạo client + collection
+    manifest = FileManifest(Path(tempfile.mkdtemp()) / "manifest.json", index)
+    manager = QdrantManager(store, manifest=manifest)
+    total = args.files * args.chunks
+    print(f"{args.files} files x {args.chunks} chunks = {total} points")
+
+    def run(name, fn):
+        sources = _populate(manager, args.files, args.chunks)
+        t0 = time.perf_counter()
+        deleted = fn(sources)
+        elapsed = time.perf_counter() - t0
+        left = manager.client.count(index, exact=True).count
+        print(
+            f"{name:<28} {elapsed:7.2f}s  {args.files / elapsed:8.0f} files/s  "
+            f"đã đếm {deleted} chunks, còn lại {left}"
+        )
+        return elapsed
+
+    base = run(
+        "cũ (delete_file từng file)",
+        lambda srcs: sum(legacy_delete_file(manager, s) for s in srcs),
+    )
+    new = run(
+        "mới (delete_files, count)",
+        lambda srcs: sum(manager.delete_files(srcs).values()),
+    )
+    fast = run(
+        "mới (delete_files, no count)",
+        lambda srcs: manager.delete_files(srcs, count=False) and "-",
+    )
+    print(f"Tăng tốc: x{base / new:.1f} (đếm), x{base / fast:.1f} (không đếm)")
+    if args.url:
+        manager.client.delete_collection(index)
+
+
+if __name__ == "__main__":
+    main()
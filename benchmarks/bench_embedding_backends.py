@@ -0,0 +1,84 @@
+"""
+Benchmark backend embedding (processing/embedding_backends.py):
+- fastembed: model ONNX chạy local trên CPU, so sánh số worker song song.
+- openai: chạy với fake server (benchmarks/fake_embedding_server.py) để có mốc so sánh
+  độ trễ câu hỏi khi phải đi qua mạng (--latency).
+
+Chạy: python benchmarks/bench_embedding_backends.py [--texts 512] [--workers 1 2 4]
+"""
+
+from pathlib import Path
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import config
+from benchmarks.fake_embedding_server import FakeEmbeddingServer
+
+
+def _query_latency(backend, queries):
+    samples = []
+    for q in queries:
+        t0 = time.perf_counter()
+        backend.embed_query(q)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--texts", type=int, default=512)
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--model", default=config.LOCAL_EMBEDDING_MODEL)
+    ap.add_argument("--batch-size", type=int, default=config.LOCAL_EMBEDDING_BATCH_SIZE)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--latency", type=float, default=0.15, help="độ trễ fake API (s)")
+    args = ap.parse_args()
+
+    from processing.embedding_backends import FastEmbedBackend, OpenAIBackend
+    import processing.embedding_dispatcher as dispatcher_module
+
+    texts = [
+        f"Đoạn {i}: báo cáo tăng trưởng kinh tế quý {i % 4 + 1} của Việt Nam. " * 4
+        for i in range(args.texts)
+    ]
+    queries = [f"Tăng trưởng GDP quý {i % 4 + 1}?" for i in range(args.queries)]
+
+    print(f"{args.texts} texts, {args.queries} câu hỏi, model local {args.model}")
+    for n in args.workers:
+        backend = FastEmbedBackend(
+            args.model,
+            batch_size=args.batch_size,
+            max_workers=n,
+            cache_dir=config.LOCAL_EMBEDDING_CACHE_DIR,
+        )
+        backend.embed(texts[: args.batch_size])  # warm-up
+        t0 = time.perf_counter()
+        vectors = backend.embed(texts)
+        elapsed = time.perf_counter() - t0
+        print(
+            f"fastembed workers={n:<2} {args.texts / elapsed:8.0f} texts/s  "
+            f"query p50 {_query_latency(backend, queries):6.1f} ms  "
+            f"dim={backend.dimension}  lỗi={sum(v is None for v in vectors)}"
+        )
+        backend.close()
+
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    server = FakeEmbeddingServer(dim=1536, latency=args.latency).start()
+    config.EMBEDDING_BASE_URL = server.base_url
+    dispatcher_module._dispatcher = None
+    backend = OpenAIBackend(config.EMBEDDING_MODEL)
+    print(
+        f"openai (fake, latency {args.latency}s)  "
+        f"query p50 {_query_latency(backend, queries[:10]):6.1f} ms"
+    )
+    backend.close()
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark EmbeddingDispatcher với fake server (benchmarks/fake_embedding_server.py):
+- So sánh throughput 1 batch/lần (giống OpenAIDocumentEmbedder cũ) và N batch song song.
+- Batch đóng gói theo token (--batch-tokens); --fail-rate: 500 ngẫu nhiên (được retry, không chia đôi batch).
+- Kiểm tra thứ tự kết quả, số request bị 429 và Retry-After được tôn trọng.
+
+Chạy: python benchmarks/bench_embedding_dispatcher.py [--texts 2000] [--latency 0.2] [--batch-tokens 2000]
+"""
+
+from pathlib import Path
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.fake_embedding_server import FakeEmbeddingServer, fake_vector
+from processing.embedding_dispatcher import EmbeddingDispatcher
+
+
+def _run(server, texts, in_flight, batch_tokens, rpm, dim):
+    dispatcher = EmbeddingDispatcher(
+        model="fake-embedding",
+        base_url=server.base_url,
+        api_key="fake",
+        max_in_flight=in_flight,
+        requests_per_minute=rpm,
+        tokens_per_minute=0,
+        max_retries=10,
+        max_batch_tokens=batch_tokens,
+    )
+    server.requests = server.rejected = server.max_concurrent = 0
+    t0 = time.perf_counter()
+    vectors = dispatcher.embed(texts)
+    elapsed = time.perf_counter() - t0
+    dispatcher.close()
+    ordered = all(
+        v is None or abs(v[0] - fake_vector(t, dim)[0]) < 1e-6
+        for t, v in zip(texts, vectors)
+    )
+    return elapsed, ordered, sum(v is None for v in vectors)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--texts", type=int, default=2000)
+    ap.add_argument("--batch-tokens", type=int, default=2000)
+    ap.add_argument("--latency", type=float, default=0.2)
+    ap.add_argument("--dim", type=int, default=256)
+    ap.add_argument(
+        "--server-rpm", type=int, default=0, help="giới hạn của server (429)"
+    )
+    ap.add_argument("--client-rpm", type=int, default=0, help="giới hạn của client")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="tỉ lệ 500 ngẫu nhiên")
+    ap.add_argument("--in-flight", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = ap.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    server = FakeEmbeddingServer(
+        dim=args.dim,
+        latency=args.latency,
+        rpm=args.server_rpm,
+        fail_rate=args.fail_rate,
+    ).start()
+    texts = [f"Đoạn văn số {i}: kinh tế vĩ mô Việt Nam " * 5 for i in range(args.texts)]
+    print(
+        f"{args.texts} texts, batch ≤{args.batch_tokens} tokens, latency {args.latency}s, "
+        f"server rpm {args.server_rpm or '∞'}, client rpm {args.client_rpm or '∞'}"
+    )
+    base = None
+    for n in args.in_flight:
+        elapsed, ordered, failed = _run(
+            server, texts, n, args.batch_tokens, args.client_rpm, args.dim
+        )
+        base = base or elapsed
+        print(
+            f"in_flight={n:<3} {elapsed:6.2f}s  {args.texts / elapsed:8.0f} texts/s  "
+            f"x{base / elapsed:.1f}  đúng thứ tự={ordered}  lỗi={failed}  "
+            f"429={server.rejected}  đồng thời tối đa={server.max_concurrent}"
+        )
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+So sánh export chunks của 1 file lớn khỏi Qdrant:
+- Cũ: get_all_chunks cũ = scroll toàn bộ payload (cả meta.table_html), offset cộng dồn theo
+  limit thay vì next_page_offset, gom hết vào 1 list.
+- Mới: QdrantManager.iter_chunks (theo con trỏ server, chọn field, tải trước trang).
+Đo thời gian, peak bộ nhớ (tracemalloc) và kiểm tra số chunk / id trả về đúng.
+
+Mặc định chạy Qdrant in-memory; --url để đo trên server thật (collection tạm, xóa sau khi chạy).
+Chạy: python benchmarks/bench_export_chunks.py [--chunks 20000] [--page-size 256] [--url http://localhost:6333]
+"""
+
+from pathlib import Path
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from haystack import Document
+from haystack_integrations.document_stores.qdrant import QdrantDocumentStore
+from qdrant_client.http import models
+
+from storage.file_manifest import FileManifest
+from storage.qdrant_store_manager import QdrantManager
+
+_DIM = 64
+_SOURCE = "/data/big_report.pdf"
+
+
+def _populate(manager: QdrantManager, n_chunks: int) -> None:
+    table_html = "<table>" + "<tr><td>ô</td><td>giá trị</td></tr>" * 200 + "</table>"
+    points = []
+    for j in range(n_chunks):
+        is_table = j % 5 == 0
+        points.append(
+            models.PointStruct(
+                id=str(uuid.uuid4()),
+                vector=[0.1] * _DIM,
+                payload={
+                    "id": f"chunk-{j:07d}",
+                    "content": f"Chunk {j} " * 60,
+                    "meta": {
+                        "source": _SOURCE,
+                        "category": "table" if is_table else "text",
+                        "trace": f"Trang {j // 10}",
+                        **({"table_html": table_html} if is_table else {}),
+                    },
+                },
+            )
+        )
+        if len(points) == 1000:
+            manager.client.upsert(manager.store.index, points, wait=True)
+            points = []
+    if points:
+        manager.client.upsert(manager.store.index, points, wait=True)
+
+
+# ---------------- bản cũ (giống code trước đây) ----------------
+def legacy_get_all_chunks(manager: QdrantManager, limit: int, max_pages: int):
+    documents = []
+    next_offset = 0
+    for _ in range(max_pages):  # bản cũ không dừng đúng nếu offset không phải id point
+        try:
+            points, _ = manager.client.scroll(
+                collection_name=manager.store.index,
+                scroll_filter=manager._source_filter(_SOURCE),
+                limit=limit,
+                offset=next_offset,
+            )
+        except Exception as e:
+            print(f"  bản cũ lỗi ở offset={next_offset}: {type(e).__name__}")
+            break
+        if not points:
+            break
+        for p in points:
+            payload = p.payload or {}
+            documents.append(Document(content=payload.get("content", ""), meta=payload))
+        next_offset += limit
+    return documents
+
+
+def _measure(name, fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{name:<36} {elapsed:7.2f}s  {result['n'] / elapsed:9.0f} chunks/s  "
+        f"peak {peak / 1e6:8.1f} MB  {result['n']} chunks, id duy nhất {result['unique']}"
+    )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=20_000)
+    ap.add_argument("--page-size", type=int, default=256)
+    ap.add_argument("--url", default=None)
+    args = ap.parse_args()
+
+    index = f"bench_export_{uuid.uuid4().hex[:8]}"
+    store = QdrantDocumentStore(
+        location=None if args.url else ":memory:",
+        url=args.url,
+        index=index,
+        embedding_dim=_DIM,
+        recreate_index=True,
+    )
+    store.count_documents()  # khởi tạo client + collection
+    manifest = FileManifest(Path(tempfile.mkdtemp()) / "manifest.json", index)
+    manager = QdrantManager(store, manifest=manifest)
+    _populate(manager, args.chunks)
+    print(f"{args.chunks} chunks (20% bảng có table_html ~7KB), page {args.page_size}")
+
+    def legacy():
+        docs = legacy_get_all_chunks(
+            manager, args.page_size, args.chunks // args.page_size + 2
+        )
+        return {"n": len(docs), "unique": len({d.meta.get("id") for d in docs})}
+
+    def streamed(**kwargs):
+        def run():
+            n, ids = 0, set()
+            for doc in manager.iter_chunks(_SOURCE, page_size=args.page_size, **kwargs):
+                n += 1
+                ids.add(doc if kwargs.get("ids_only") else doc.id)
+            return {"n": n, "unique": len(ids)}
+
+        return run
+
+    _measure("cũ (get_all_chunks, list)", legacy)
+    _measure("iter_chunks (toàn bộ payload)", streamed(prefetch=0))
+    _measure("iter_chunks (toàn bộ, prefetch=2)", streamed(prefetch=2))
+    _measure(
+        "iter_chunks (bỏ meta.table_html)",
+        streamed(exclude=["meta.table_html"], prefetch=2),
+    )
+    _measure(
+        "iter_chunks (content + meta.source)",
+        streamed(fields=["id", "content", "meta.source"], prefetch=2),
+    )
+    _measure("iter_chunks (ids_only)", streamed(ids_only=True, prefetch=2))
+    if args.url:
+        manager.client.delete_collection(index)
+
+
+if __name__ == "__main__":
+    main()
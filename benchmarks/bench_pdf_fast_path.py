@@ -0,0 +1,69 @@
+"""
+So sánh parse PDF: toàn bộ qua Docling và đường tắt text layer (PdfParser(text_fast_path=True)).
+- In thời gian tổng của 2 chế độ và số Document mỗi loại.
+- In đường đi (text/docling), lý do và thời gian của từng trang ở chế độ đường tắt.
+Không dùng conversion cache để đo đúng thời gian convert.
+
+Chạy: python benchmarks/bench_pdf_fast_path.py file1.pdf [file2.pdf ...] [--no-images]
+"""
+
+from collections import Counter
+from pathlib import Path
+import argparse
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from parsers._converter_registry import warm_up
+from parsers._docling_pdf_parser import PdfParser
+
+
+def _run(pdf_path: Path, fast: bool, extract_images: bool, images_root: Path):
+    parser = PdfParser(
+        images_root=images_root,
+        extract_images=extract_images,
+        text_fast_path=fast,
+    )
+    t0 = time.perf_counter()
+    docs = parser.parse(pdf_path)
+    elapsed = time.perf_counter() - t0
+    return elapsed, docs, parser.last_page_report
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("pdfs", nargs="+", type=Path)
+    ap.add_argument("--no-images", action="store_true", help="bỏ qua trích ảnh")
+    args = ap.parse_args()
+
+    print("Warm-up Docling...")
+    warm_up()
+    images_root = Path(tempfile.mkdtemp(prefix="bench_images_"))
+
+    for pdf_path in args.pdfs:
+        print("=" * 80)
+        print(pdf_path.name)
+        t_full, docs_full, _ = _run(pdf_path, False, not args.no_images, images_root)
+        t_fast, docs_fast, report = _run(
+            pdf_path, True, not args.no_images, images_root
+        )
+        for p in report:
+            print(
+                f"  Trang {p['page']:>4}: {p['path']:<7} {p['seconds'] * 1000:>8.1f}ms"
+                f"  chars={p['chars']:<6} {p['reason']}"
+            )
+        n_text = sum(1 for p in report if p["path"] == "text")
+        print(f"  Trang qua text layer: {n_text}/{len(report)}")
+        print(
+            f"  Docling toàn bộ: {t_full:.2f}s {dict(Counter(d.meta['category'] for d in docs_full))}"
+        )
+        print(
+            f"  Đường tắt      : {t_fast:.2f}s {dict(Counter(d.meta['category'] for d in docs_fast))}"
+        )
+        print(f"  Tăng tốc: x{t_full / t_fast:.1f}" if t_fast else "")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+So sánh chuẩn hóa text + cửa sổ câu: bản cũ (copy trong từng parser) và utils.text.
+- Corpus tiếng Việt tổng hợp: đoạn văn có xuống dòng, gạch nối cuối dòng, soft-hyphen, khoảng trắng thừa.
+- Đo riêng normalize và toàn bộ _push_text (normalize + tách câu + giữ N câu gần nhất).
+- Kiểm tra kết quả 2 bản giống nhau (trừ khác biệt đã biết: tab/nbsp đơn lẻ được đổi thành dấu cách).
+
+Chạy: python benchmarks/bench_text_normalizer.py [--items 200000] [--repeat 3]
+"""
+
+from collections import defaultdict
+from pathlib import Path
+import argparse
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.text import SentenceWindow, normalize_text
+
+_WORDS = (
+    "kinh tế vĩ mô Việt Nam tăng trưởng lạm phát tỷ giá ngân hàng nhà nước "
+    "đầu tư công xuất khẩu nhập khẩu doanh nghiệp thị trường chứng khoán "
+    "đô thị hóa dân số lao động việc làm thu nhập bình quân chính sách tiền tệ "
+    "hạ tầng giao thông năng lượng tái tạo chuyển đổi số trí tuệ nhân tạo"
+).split()
+
+# ---------------- bản cũ (giống hệt code trong các parser trước đây) ----------------
+_SENT_SPLIT = re.compile(r"(?<=[\.!?])\s+(?=[A-ZÀ-Ỵ])|(?<=[\.!\?])\s+(?=\d+)|\n{2,}")
+
+
+def legacy_normalize(t: str) -> str:
+    if not t:
+        return ""
+    t = re.sub(r"-\s*\n", "", t)
+    t = t.replace("\u00ad", "")
+    t = re.sub(r"\s*\n\s*", " ", t)
+    t = re.sub(r"\s{2,}", " ", t)
+    return t.strip()
+
+
+def legacy_split_sentences(text: str):
+    sents = [s.strip() for s in _SENT_SPLIT.split(text or "") if s.strip()]
+    return sents or [ln.strip() for ln in (text or "").splitlines() if ln.strip()]
+
+
+def legacy_push(key, raw, texts, buffers, max_sentences=6):
+    text = legacy_normalize(str(raw) or "")
+    if not text:
+        return
+    texts.setdefault(key, []).append(text)
+    for s in legacy_split_sentences(text):
+        if s:
+            buffers.setdefault(key, []).append(s)
+    if len(buffers.get(key, [])) > max_sentences:
+        buffers[key] = buffers[key][-max_sentences:]
+
+
+def new_push(key, raw, texts, windows):
+    text = normalize_text(str(raw) or "")
+    if not text:
+        return
+    texts.setdefault(key, []).append(text)
+    windows[key].push(text)
+
+
+# ---------------- corpus ----------------
+def _sentence(rng: random.Random) -> str:
+    words = rng.choices(_WORDS, k=rng.randint(6, 20))
+    words[0] = words[0].capitalize()
+    if rng.random() < 0.2:
+        words.append(str(rng.randint(1990, 2030)))
+    return " ".join(words) + rng.choice([".", ".", ".", "?", "!"])
+
+
+def build_corpus(n_items: int, seed: int = 42):
+    rng = random.Random(seed)
+    items = []
+    for _ in range(n_items):
+        text = " ".join(_sentence(rng) for _ in range(rng.randint(1, 5)))
+        chars = list(text)
+        # chèn xuống dòng / gạch nối cuối dòng / soft-hyphen / khoảng trắng thừa
+        for i in range(len(chars) - 1, 0, -1):
+            if chars[i] == " ":
+                r = rng.random()
+                if r < 0.08:
+                    chars[i] = "\n"
+                elif r < 0.10:
+                    chars[i] = "   "
+                elif r < 0.11:
+                    chars[i] = " \n  "
+            elif chars[i].isalpha() and rng.random() < 0.004:
+                chars.insert(i, rng.choice(["-\n", "\u00ad"]))
+        items.append("".join(chars))
+    return items
+
+
+def _bench(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=200_000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    corpus = build_corpus(args.items)
+    total_mb = sum(len(t.encode("utf-8")) for t in corpus) / 1e6
+    print(f"Corpus: {len(corpus)} text items, {total_mb:.1f} MB")
+
+    mismatches = sum(1 for t in corpus if legacy_normalize(t) != normalize_text(t))
+    print(f"Khác biệt normalize: {mismatches}/{len(corpus)}")
+
+    t_old = _bench(lambda: [legacy_normalize(t) for t in corpus], args.repeat)
+    t_new = _bench(lambda: [normalize_text(t) for t in corpus], args.repeat)
+    print(
+        f"normalize   cũ={t_old:.3f}s  mới={t_new:.3f}s  x{t_old / t_new:.2f}"
+        f"  ({total_mb / t_new:.1f} MB/s)"
+    )
+
+    keys = [i // 20 for i in range(len(corpus))]  # ~20 text item mỗi trang/mục
+
+    def run_old():
+        texts, buffers = {}, {}
+        for key, raw in zip(keys, corpus):
+            legacy_push(key, raw, texts, buffers)
+        return buffers
+
+    def run_new():
+        texts, windows = {}, defaultdict(lambda: SentenceWindow(6))
+        for key, raw in zip(keys, corpus):
+            new_push(key, raw, texts, windows)
+        return windows
+
+    old_buf, new_buf = run_old(), run_new()
+    same_ctx = all(
+        " ".join(old_buf[k][-3:]).strip() == new_buf[k].context(3) for k in old_buf
+    )
+    print(f"Context 3 câu giống nhau: {same_ctx}")
+
+    t_old = _bench(run_old, args.repeat)
+    t_new = _bench(run_new, args.repeat)
+    print(f"_push_text  cũ={t_old:.3f}s  mới={t_new:.3f}s  x{t_old / t_new:.2f}")
+
+
+if __name__ == "__main__":
+    main()
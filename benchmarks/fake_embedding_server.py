@@ -0,0 +1,175 @@
+"""
+Fake server OpenAI-compatible cho POST /v1/embeddings (test/benchmark, không gọi API thật):
+- Vector xác định theo nội dung (hash) => kiểm tra được thứ tự kết quả phía client.
+- latency: độ trễ mỗi request; rpm: vượt quá số request/phút -> 429 kèm Retry-After.
+- fail_rate: tỉ lệ request trả 500 ngẫu nhiên.
+
+Chạy riêng: python benchmarks/fake_embedding_server.py --port 8765 --latency 0.2 --rpm 600
+Client: OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=fake
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+import argparse
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+
+
+def fake_vector(text: str, dim: int) -> List[float]:
+    """Vector xác định theo text (cùng hàm được client dùng để kiểm tra)."""
+    out: List[float] = []
+    counter = 0
+    while len(out) < dim:
+        digest = hashlib.sha256(f"{counter}:{text}".encode("utf-8")).digest()
+        for (value,) in struct.iter_unpack("<I", digest):
+            out.append(value / 2**32 - 0.5)
+        counter += 1
+    return out[:dim]
+
+
+class FakeEmbeddingServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        dim: int = 1536,
+        latency: float = 0.1,
+        rpm: int = 0,
+        fail_rate: float = 0.0,
+    ) -> None:
+        self.dim = dim
+        self.latency = latency
+        self.rpm = rpm
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self.rejected = 0
+        self.max_concurrent = 0
+        self._concurrent = 0
+        self._window: List[float] = []
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _admit(self) -> float:
+        """0 nếu nhận request, ngược lại số giây client phải chờ (Retry-After)."""
+        if self.rpm <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            self._window = [t for t in self._window if now - t < 60.0]
+            if len(self._window) >= self.rpm:
+                return max(0.05, 60.0 - (now - self._window[0]))
+            self._window.append(now)
+        return 0.0
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):  # không in log từng request
+                pass
+
+            def _send(self, status: int, body: dict, headers=None) -> None:
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                wait = server._admit()
+                if wait:
+                    with server._lock:
+                        server.rejected += 1
+                    self._send(
+                        429,
+                        {"error": {"message": "rate limit", "type": "rate_limit"}},
+                        {"Retry-After": f"{wait:.2f}"},
+                    )
+                    return
+                with server._lock:
+                    server.requests += 1
+                    server._concurrent += 1
+                    server.max_concurrent = max(
+                        server.max_concurrent, server._concurrent
+                    )
+                try:
+                    time.sleep(server.latency)
+                    if random.random() < server.fail_rate:
+                        self._send(500, {"error": {"message": "fake failure"}})
+                        return
+                    texts = payload.get("input", [])
+                    if isinstance(texts, str):
+                        texts = [texts]
+                    dim = payload.get("dimensions") or server.dim
+                    data = [
+                        {
+                            "object": "embedding",
+                            "index": i,
+                            "embedding": fake_vector(t, dim),
+                        }
+                        for i, t in enumerate(texts)
+                    ]
+                    # Đảo thứ tự để kiểm tra client sắp xếp theo index
+                    data.reverse()
+                    self._send(
+                        200,
+                        {
+                            "object": "list",
+                            "data": data,
+                            "model": payload.get("model", "fake"),
+                            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+                        },
+                    )
+                finally:
+                    with server._lock:
+                        server._concurrent -= 1
+
+        return Handler
+
+    def start(self) -> "FakeEmbeddingServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--latency", type=float, default=0.1)
+    ap.add_argument("--rpm", type=int, default=0)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    args = ap.parse_args()
+    server = FakeEmbeddingServer(
+        args.host, args.port, args.dim, args.latency, args.rpm, args.fail_rate
+    )
+    print(f"Fake embedding server: {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
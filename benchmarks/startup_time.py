@@ -0,0 +1,90 @@
+"""
+Đo thời gian khởi động theo từng subsystem:
+- Import: mỗi module được import trong 1 interpreter mới (đo chi phí import tích lũy, không bị cache).
+- Khởi tạo: dựng từng service/thành phần trong 1 interpreter mới (cần Qdrant + OPENAI_API_KEY).
+
+Chạy: python benchmarks/startup_time.py
+"""
+
+from pathlib import Path
+import json
+import subprocess
+import sys
+
+ROOT = Path(__file__).parent.parent
+
+IMPORTS = [
+    ("config", "config"),
+    ("logger", "utils.logger"),
+    ("gradio", "gradio"),
+    ("UI (gradio_func)", "UI.gradio_func"),
+    ("UI (gradio_ui)", "UI.gradio_ui"),
+    ("vector store", "storage.vector_store"),
+    ("query manager", "storage.qdrant_query_manager"),
+    ("RAG agent", "agent.rag_agent"),
+    ("RAG service (chat)", "services.rag_service"),
+    ("DB service", "services.db_service"),
+    ("chunker (NLTK)", "processing._chunker"),
+    ("parsers (Docling)", "parsers.router_parser"),
+    ("ingestion (DocToEmbed)", "processing.files_to_embed"),
+]
+
+INITS = [
+    ("RAGService()", "from services.rag_service import RAGService", "RAGService()"),
+    ("DBService()", "from services.db_service import DBService", "DBService()"),
+    (
+        "DBService().processor",
+        "from services.db_service import DBService; s = DBService()",
+        "s.processor",
+    ),
+    (
+        "warm_up Docling",
+        "from services.db_service import DBService; s = DBService(); s.processor",
+        "s.warm_up()",
+    ),
+]
+
+_SNIPPET = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+{setup}
+t0 = time.perf_counter()
+{stmt}
+t1 = time.perf_counter()
+mods = sorted(m for m in sys.modules if m.split('.')[0] in ('docling', 'nltk', 'torch'))
+print(json.dumps({{"seconds": t1 - t0, "heavy": sorted({{m.split('.')[0] for m in mods}})}}))
+"""
+
+
+def _run(setup: str, stmt: str) -> dict:
+    code = _SNIPPET.format(root=str(ROOT), setup=setup, stmt=stmt)
+    proc = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True
+    )
+    last = proc.stdout.strip().splitlines()[-1:] or [""]
+    try:
+        return json.loads(last[0])
+    except Exception:
+        err = (proc.stderr.strip().splitlines() or ["unknown error"])[-1]
+        return {"error": err}
+
+
+def _print_row(name: str, res: dict) -> None:
+    if "error" in res:
+        print(f"{name:<28} {'ERROR':>10}  {res['error'][:80]}")
+    else:
+        heavy = ",".join(res["heavy"]) or "-"
+        print(f"{name:<28} {res['seconds'] * 1000:>8.0f}ms  heavy modules: {heavy}")
+
+
+def main() -> None:
+    print("== Import (interpreter mới cho mỗi dòng) ==")
+    for name, module in IMPORTS:
+        _print_row(name, _run("", f"import {module}"))
+    print("\n== Khởi tạo (không tính thời gian import ở phần setup) ==")
+    for name, setup, stmt in INITS:
+        _print_row(name, _run(setup, stmt))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Đường dẫn thư mục data
@@ -6,7 +7,10 @@ DATA_PATH = BASE_PATH / "data"
 IMAGES_PATH = BASE_PATH / "images"
 
 # Models
+# Backend embedding: "openai" (API) hoặc "fastembed" (model ONNX chạy local trên CPU)
+EMBEDDING_BACKEND = os.getenv("RAG_EMBEDDING_BACKEND", "openai")
 EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIM = None  # None = theo model; đặt số để rút gọn vector (model OpenAI v3)
 LLM_MODEL = "gpt-4o-mini"
 
 
@@ -14,3 +18,117 @@ LLM_MODEL = "gpt-4o-mini"
 VECTOR_DB_URL = "http://localhost:6333"
 VECTOR_DB_COLLECTION = "Document"
 RECREATE_INDEX = True  # Ghi đè
+
+# Parse song song (RouterParser)
+PARSER_WORKERS = 1  # số worker process parse file; 1 = parse tuần tự
+PARSER_WORKER_THREADS = 1  # số thread torch/OMP cho mỗi worker (tránh oversubscription)
+
+# PDF lớn: convert theo từng khoảng trang rồi gộp kết quả
+PDF_SHARD_PAGES = 50  # số trang mỗi shard; 0 = tắt
+PDF_SHARD_MIN_PAGES = 200  # chỉ shard PDF có từ số trang này trở lên
+PDF_SHARD_WORKERS = 4  # số process convert shard song song; 1 = tuần tự
+# Trang có text layer dùng được (không ảnh, ít đường vẽ) lấy text trực tiếp, bỏ qua Docling.
+# Trang text không có Document "table": bảng kẻ viền (nhiều đường vẽ) và bảng không viền
+# (>= 3 dòng có cột thẳng hàng) được đẩy sang Docling; bảng lạ hơn vẫn có thể bị đọc thành text.
+PDF_TEXT_FAST_PATH = False
+
+# Cache kết quả convert của Docling (theo hash nội dung file + phiên bản pipeline)
+CACHE_PATH = BASE_PATH / ".cache"
+CONVERSION_CACHE_ENABLED = True
+CONVERSION_CACHE_PATH = CACHE_PATH / "docling"
+CONVERSION_CACHE_MAX_BYTES = 2 * 1024**3  # 2GB, vượt quá thì evict LRU
+
+# Gửi embedding song song, giới hạn theo rate limit của API
+EMBEDDING_BASE_URL = os.getenv("OPENAI_BASE_URL")  # None = API OpenAI mặc định
+EMBEDDING_MAX_IN_FLIGHT = 4  # số batch gửi đồng thời
+EMBEDDING_RPM = 3000  # requests/phút (0 = không giới hạn)
+EMBEDDING_TPM = 1_000_000  # tokens/phút (0 = không giới hạn)
+EMBEDDING_MAX_RETRIES = 5
+EMBEDDING_TIMEOUT = 120  # giây mỗi request
+# Đóng gói batch theo số token thật (tiktoken), giới hạn của embeddings API
+EMBEDDING_MAX_BATCH_INPUTS = 2048  # số text tối đa mỗi request
+EMBEDDING_MAX_BATCH_TOKENS = 240_000  # tổng token tối đa mỗi request (API: 300k)
+EMBEDDING_MAX_INPUT_TOKENS = 8191  # text dài hơn bị cắt trước khi gửi
+
+# Cache embedding trên đĩa (key = hash nội dung + model + dimension)
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_PATH = CACHE_PATH / "embeddings.sqlite"
+EMBEDDING_CACHE_MAX_BYTES = 1024**3  # 1GB, vượt quá thì evict LRU
+
+# Cache embedding câu hỏi (chat): LRU + TTL trong RAM, tùy chọn thêm tầng đĩa dùng chung
+QUERY_EMBEDDING_CACHE_ENABLED = True
+QUERY_EMBEDDING_CACHE_SIZE = 1024  # số câu hỏi giữ trong RAM
+QUERY_EMBEDDING_CACHE_TTL = 3600  # giây; <= 0 = không hết hạn
+# True: câu hỏi chỉ khác hoa/thường dùng chung 1 vector (hit nhiều hơn, nhưng "AI" và "ai",
+# tên riêng viết thường... nhận cùng vector dù model phân biệt hoa/thường)
+QUERY_EMBEDDING_CACHE_CASEFOLD = True
+QUERY_EMBEDDING_DISK_CACHE = (
+    False  # lưu thêm vào EMBEDDING_CACHE_PATH, bảng riêng (chia sẻ giữa các process)
+)
+QUERY_EMBEDDING_DISK_MAX_BYTES = 64 * 1024**2  # giới hạn riêng của bảng câu hỏi
+
+# Backend embedding local (EMBEDDING_BACKEND = "fastembed")
+LOCAL_EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+LOCAL_EMBEDDING_BATCH_SIZE = 64  # số text mỗi lần inference
+LOCAL_EMBEDDING_WORKERS = 2  # số batch inference song song
+LOCAL_EMBEDDING_THREADS = None  # thread onnxruntime mỗi batch; None = chia đều số core
+LOCAL_EMBEDDING_CACHE_DIR = CACHE_PATH / "fastembed"  # nơi tải model ONNX
+
+# Chia chunk: "token" = theo số token của model embedding (regex tách câu, chạy song song);
+# "word" = DocumentSplitter của Haystack (350 từ, tách câu bằng NLTK)
+CHUNKER = "token"
+CHUNK_MAX_TOKENS = 512
+CHUNK_OVERLAP_TOKENS = 64
+CHUNK_WORKERS = 4  # số thread chunk documents song song
+
+# Khử chunk trùng/gần trùng trước khi embed (MinHash + LSH)
+DEDUP_ENABLED = True
+DEDUP_THRESHOLD = 0.9  # Jaccard ước lượng tối thiểu để coi là gần trùng
+# Gộp cả giữa các file (chỉ trong 1 lần ingest nhiều file; xóa file gốc của chunk giữ lại
+# sẽ làm mất nội dung của file kia) -> mặc định chỉ gộp trong cùng file
+DEDUP_CROSS_FILE = False
+
+# Rebuild incremental: chỉ xử lý file mới/đổi nội dung dựa trên manifest
+INCREMENTAL_REBUILD = True
+MANIFEST_PATH = CACHE_PATH / "manifest.json"
+MANIFEST_SAVE_INTERVAL = (
+    5.0  # giây; ingest nhiều file chỉ ghi manifest ra đĩa theo chu kỳ
+)
+
+# Rebuild toàn bộ không downtime (blue/green): build vào collection mới
+# "<VECTOR_DB_COLLECTION>_v<ms>" rồi chuyển alias VECTOR_DB_COLLECTION sang (atomic);
+# chat vẫn truy vấn bản cũ đầy đủ trong lúc build, bản cũ bị xóa sau khi chuyển
+BLUE_GREEN_REBUILD = True
+KEEP_OLD_COLLECTIONS = 0  # số collection cũ giữ lại để rollback
+
+# Rebuild toàn bộ dạng bulk load: tắt index HNSW trong lúc ghi (indexing_threshold=0),
+# upload song song không chờ (wait=False), xong thì bật lại index và chờ optimizer
+BULK_LOAD_REBUILD = True
+BULK_UPLOAD_PARALLEL = 4  # số process upload (qdrant-client upload_points)
+BULK_UPLOAD_BATCH_SIZE = 256  # số points mỗi request
+BULK_FLUSH_POINTS = 8192  # gom đủ ngần này points (từ nhiều file) mới upload 1 lượt
+BULK_OPTIMIZE_TIMEOUT = 1800  # giây chờ optimizer build xong index sau khi load
+
+# Docling converter dùng chung cho mọi parser trong process
+PREWARM_CONVERTERS = True  # load trước model Docling ở nền khi khởi động UI
+
+# Chế độ chỉ chat: không import/dựng stack parsing, tắt upload/xóa/rebuild trên UI
+QUERY_ONLY = os.getenv("RAG_QUERY_ONLY", "0") == "1"
+
+# Ingest dạng pipeline (parse → chunk → embed → ghi DB chồng lấn, queue giới hạn)
+STREAMING_INGEST = True
+INGEST_QUEUE_SIZE = 4  # số file tối đa chờ giữa 2 stage
+
+# Theo dõi DATA_PATH: file thêm/sửa/xóa (ví dụ từ job sync) tự động được ingest incremental
+WATCH_DATA_FOLDER = os.getenv("RAG_WATCH_DATA", "0") == "1"
+WATCH_POLL_SECONDS = 2.0  # chu kỳ quét thư mục
+WATCH_DEBOUNCE_SECONDS = 5.0  # file phải đứng yên bấy lâu mới được xử lý
+WATCH_BATCH_SIZE = 16  # số file tối đa mỗi batch add/update/delete
+WATCH_QUEUE_SIZE = 8  # số batch tối đa chờ xử lý (các batch chạy lần lượt)
+
+# Trích xuất ảnh từ tài liệu (ghi ở nền, khử trùng lặp theo nội dung ảnh)
+IMAGE_EXTRACTION = True  # False: bỏ qua ảnh (ingest chỉ lấy text/bảng)
+IMAGE_FORMAT = "PNG"  # PNG | WEBP | JPEG
+IMAGE_SCALE = 1.0  # images_scale của pipeline PDF (Docling render ảnh ở tỉ lệ này)
+IMAGE_QUALITY = 85  # chất lượng cho WEBP/JPEG
+IMAGE_WRITER_WORKERS = 2  # số thread ghi ảnh
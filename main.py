@@ -1,6 +1,11 @@
-from UI.gradio_ui import demo
-
 if __name__ == "__main__":
+    # Import bên trong guard: worker process (spawn) của parser sẽ import lại main
+    # dưới tên __mp_main__, không được dựng lại UI/services ở đó.
+    from UI.gradio_ui import demo
+    from UI.gradio_func import prewarm_ingestion, start_data_watcher
+
+    prewarm_ingestion()
+    start_data_watcher()
     try:
         demo.launch()
     except Exception as e:
@@ -0,0 +1,125 @@
+from __future__ import annotations
+from pathlib import Path
+from typing import Callable, Optional
+from importlib import metadata
+import hashlib
+import os
+import sys
+import uuid
+
+# Thêm thư mục cha vào path để có thể import utils
+sys.path.append(str(Path(__file__).parent.parent))
+
+from docling_core.types.doc import DoclingDocument
+from utils.hashing import file_sha256
+
+
+def _package_version(name: str) -> str:
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+class ConversionCache:
+    """
+    Cache trên đĩa cho kết quả convert của Docling (DoclingDocument đã serialize JSON):
+    - Key = hash(nội dung file) + pipeline_tag của parser + version docling/docling-core.
+      => file không đổi nội dung thì không phải chạy lại layout analysis.
+    - Giới hạn dung lượng max_bytes, evict theo LRU (mtime được "touch" mỗi lần hit).
+    - Ghi atomic (file tạm + os.replace) nên nhiều worker process có thể dùng chung thư mục.
+    """
+
+    def __init__(self, cache_dir: str | Path, max_bytes: int = 2 * 1024**3) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = int(max_bytes)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._versions = (
+            f"docling={_package_version('docling')};"
+            f"docling-core={_package_version('docling-core')}"
+        )
+
+    def _key(self, path: Path, pipeline_tag: str) -> str:
+        seed = f"{file_sha256(path)}:{pipeline_tag}:{self._versions}"
+        return hashlib.sha256(seed.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[DoclingDocument]:
+        entry = self._entry_path(key)
+        try:
+            data = entry.read_text(encoding="utf-8")
+        except OSError:
+            return None
+        try:
+            doc = DoclingDocument.model_validate_json(data)
+        except Exception:
+            # Entry hỏng (ghi dở, khác schema...) -> bỏ đi, coi như miss
+            entry.unlink(missing_ok=True)
+            return None
+        try:
+            os.utime(entry)  # đánh dấu vừa dùng (LRU)
+        except OSError:
+            pass
+        return doc
+
+    def put(self, key: str, doc: DoclingDocument) -> None:
+        entry = self._entry_path(key)
+        tmp = entry.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        try:
+            tmp.write_text(doc.model_dump_json(), encoding="utf-8")
+            os.replace(tmp, entry)
+        except Exception:
+            tmp.unlink(missing_ok=True)
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        total = 0
+        for p in self.cache_dir.glob("*.json"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+            total += st.st_size
+        if total <= self.max_bytes:
+            return
+        # Cũ nhất (ít dùng gần đây nhất) bị xóa trước
+        for _mtime, size, p in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            try:
+                p.unlink()
+                total -= size
+            except OSError:
+                continue
+
+    def get_or_convert(
+        self,
+        path: str | Path,
+        pipeline_tag: str,
+        convert_fn: Callable[[], DoclingDocument],
+    ) -> DoclingDocument:
+        """
+        Trả về DoclingDocument của file: lấy từ cache nếu có, ngược lại gọi convert_fn rồi lưu cache.
+        """
+        path = Path(path)
+        key = self._key(path, pipeline_tag)
+        doc = self.get(key)
+        if doc is not None:
+            print(f"Conversion cache hit: {path.name} ({pipeline_tag})")
+            return doc
+        doc = convert_fn()
+        self.put(key, doc)
+        return doc
+
+    def convert(
+        self, converter, path: str | Path, pipeline_tag: str
+    ) -> DoclingDocument:
+        """Convert cả file bằng converter, dùng cache nếu có."""
+        return self.get_or_convert(
+            path, pipeline_tag, lambda: converter.convert(Path(path)).document
+        )
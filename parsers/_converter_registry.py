@@ -0,0 +1,75 @@
+"""
+Registry DocumentConverter dùng chung cho mọi parser trong 1 process.
+- Chỉ có 1 DocumentConverter/process => 1 bản model layout trong RAM.
+- Pipeline của từng định dạng được Docling tạo ở lần convert đầu tiên rồi cache lại,
+  các lần upload/rebuild sau dùng lại, không load lại model.
+- warm_up(): dựng trước pipeline (ví dụ lúc khởi động app) để request đầu tiên không phải chờ.
+- configure(): tỉ lệ render ảnh (images_scale) và bật/tắt ảnh picture của pipeline PDF; ảnh được
+  Docling render đúng kích thước ngay từ đầu thay vì render full-size rồi resize lại.
+"""
+
+from __future__ import annotations
+from typing import Iterable, Optional, Tuple
+import threading
+
+# Docling
+from docling.document_converter import DocumentConverter, PdfFormatOption
+from docling.datamodel.base_models import InputFormat
+from docling.datamodel.pipeline_options import PdfPipelineOptions
+
+SUPPORTED_FORMATS = (InputFormat.PDF, InputFormat.DOCX, InputFormat.MD)
+
+_lock = threading.Lock()
+_converter: Optional[DocumentConverter] = None
+# Tuỳ chọn ảnh của pipeline PDF (đổi qua configure())
+_images_scale: float = 1.0
+_picture_images: bool = True
+
+
+def configure(
+    images_scale: Optional[float] = None, picture_images: Optional[bool] = None
+) -> None:
+    """
+    Đặt tỉ lệ render ảnh và bật/tắt ảnh picture cho pipeline PDF.
+    Tuỳ chọn đổi khác lần trước -> bỏ converter cũ, lần get_converter() sau dựng lại.
+    """
+    global _converter, _images_scale, _picture_images
+    with _lock:
+        scale = _images_scale if images_scale is None else float(images_scale)
+        pictures = _picture_images if picture_images is None else bool(picture_images)
+        if (scale, pictures) != (_images_scale, _picture_images):
+            _images_scale, _picture_images = scale, pictures
+            _converter = None
+
+
+def image_options() -> Tuple[float, bool]:
+    """(images_scale, picture_images) hiện tại — để truyền sang worker process."""
+    return _images_scale, _picture_images
+
+
+def get_converter() -> DocumentConverter:
+    """Trả về DocumentConverter dùng chung (tạo ở lần gọi đầu tiên)."""
+    global _converter
+    converter = _converter
+    if converter is None:
+        with _lock:
+            if _converter is None:
+                pdf_options = PdfPipelineOptions(
+                    images_scale=_images_scale,
+                    generate_picture_images=_picture_images,
+                )
+                _converter = DocumentConverter(
+                    allowed_formats=list(SUPPORTED_FORMATS),
+                    format_options={
+                        InputFormat.PDF: PdfFormatOption(pipeline_options=pdf_options)
+                    },
+                )
+            converter = _converter
+    return converter
+
+
+def warm_up(formats: Iterable[InputFormat] = SUPPORTED_FORMATS) -> None:
+    """Khởi tạo trước pipeline (và load model) cho các định dạng."""
+    converter = get_converter()
+    for fmt in formats:
+        converter.initialize_pipeline(fmt)
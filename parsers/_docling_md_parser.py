@@ -1,13 +1,17 @@
 from __future__ import annotations
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
-import uuid
-import re
 from collections import defaultdict
 
 # Haystack 2.x
 from haystack import Document
 
+from utils.hashing import file_document_id
+from utils.text import SentenceWindow, normalize_text
+from parsers._conversion_cache import ConversionCache
+from parsers._converter_registry import get_converter
+from parsers._image_writer import ImageWriter
+
 # Docling cho Markdown
 from docling.document_converter import DocumentConverter
 from docling_core.types.doc import TextItem, SectionHeaderItem, TableItem, PictureItem
@@ -22,6 +26,7 @@ class MdParser:
     - Text: gộp theo heading (H1/H2/…); nếu không có heading -> fallback theo N đoạn.
     - Table: content = <context trước> + Markdown; meta.table_html giữ HTML gốc.
     - Image: lưu ảnh vào images_root/<filename_wo_ext>/img_{i}.png; content = context trước; meta.filepath.
+      Ảnh được ghi ở nền bằng ImageWriter (khử trùng lặp theo nội dung); extract_images=False bỏ qua ảnh.
     - Metadata: category, source, filename, document_id, trace = "Mục {heading_path}".
     """
 
@@ -31,38 +36,40 @@ class MdParser:
         context_sentences: int = 3,
         buffer_max_sentences: int = 6,
         fallback_n_paragraphs: int = 10,
+        conversion_cache: Optional[ConversionCache] = None,
+        converter: Optional[DocumentConverter] = None,
+        image_writer: Optional[ImageWriter] = None,
+        extract_images: bool = True,
     ) -> None:
         self.images_root = Path(images_root)
         self.context_sentences = int(context_sentences)
         self.buffer_max_sentences = int(buffer_max_sentences)
         self.fallback_n_paragraphs = int(fallback_n_paragraphs)
-        self.converter = DocumentConverter()
+        self.conversion_cache = conversion_cache
+        self._converter = converter
+        self.extract_images = bool(extract_images)
+        self.image_writer = image_writer or (ImageWriter() if extract_images else None)
 
     # --- các hàm helper trong class ---
-    _SENT_SPLIT = re.compile(
-        r"(?<=[\.!?])\s+(?=[A-ZÀ-Ỵ])|(?<=[\.!\?])\s+(?=\d+)|\n{2,}"
-    )
-
     @staticmethod
-    def _normalize_text(t: str) -> str:
-        if not t:
-            return ""
-        t = re.sub(r"-\s*\n", "", t)
-        t = t.replace("\u00ad", "")
-        t = re.sub(r"\s*\n\s*", " ", t)
-        t = re.sub(r"\s{2,}", " ", t)
-        return t.strip()
+    def _file_document_id(path: Path) -> str:
+        return file_document_id(path)
 
-    @staticmethod
-    def _split_sentences(text: str) -> List[str]:
-        sents = [s.strip() for s in MdParser._SENT_SPLIT.split(text or "") if s.strip()]
-        return sents or [ln.strip() for ln in (text or "").splitlines() if ln.strip()]
+    @property
+    def converter(self) -> DocumentConverter:
+        # Mặc định dùng converter chung của process (tạo lazy ở lần convert đầu tiên)
+        return self._converter or get_converter()
 
-    @staticmethod
-    def _file_document_id(path: Path) -> str:
-        st = path.stat()
-        seed = f"{path.resolve()}:{st.st_size}:{st.st_mtime_ns}"
-        return str(uuid.uuid5(uuid.NAMESPACE_URL, seed))
+    # Tag mô tả cấu hình pipeline, nằm trong key của conversion cache
+    _PIPELINE_TAG = "md:default"
+
+    def _convert(self, path: Path):
+        """Convert bằng Docling, dùng conversion cache nếu được cấu hình."""
+        if self.conversion_cache is not None:
+            return self.conversion_cache.convert(
+                self.converter, path, self._PIPELINE_TAG
+            )
+        return self.converter.convert(path).document
 
     @staticmethod
     def _heading_level(el: SectionHeaderItem) -> int:
@@ -82,26 +89,25 @@ class MdParser:
     def _heading_path(stack: List[Tuple[int, str]]) -> str:
         return " > ".join(h[1] for h in stack) if stack else "ROOT"
 
-    def _context(self, key: str, buffers: Dict[str, List[str]]) -> str:
-        buf = buffers.get(key, [])
-        return " ".join(buf[-self.context_sentences :]).strip()
+    def _context(self, key: str, buffers: Dict[str, SentenceWindow]) -> str:
+        buf = buffers.get(key)
+        return buf.context(self.context_sentences) if buf is not None else ""
+
+    def _new_window(self) -> SentenceWindow:
+        return SentenceWindow(self.buffer_max_sentences)
 
     def _push_text(
         self,
         key: str,
         raw_text: str,
         texts: Dict[str, List[str]],
-        buffers: Dict[str, List[str]],
+        buffers: Dict[str, SentenceWindow],
     ) -> None:
-        text = self._normalize_text(str(raw_text) or "")
+        text = normalize_text(str(raw_text) or "")
         if not text:
             return
         texts.setdefault(key, []).append(text)
-        for s in self._split_sentences(text):
-            if s:
-                buffers.setdefault(key, []).append(s)
-        if len(buffers.get(key, [])) > self.buffer_max_sentences:
-            buffers[key] = buffers[key][-self.buffer_max_sentences :]
+        buffers[key].push(text)
 
     @staticmethod
     def _export_table(el, d) -> tuple[str, str]:
@@ -122,12 +128,11 @@ class MdParser:
 
         images_dir = self.images_root / fname_wo
 
-        conv_res = self.converter.convert(md_path)
-        d = conv_res.document
+        d = self._convert(md_path)
 
         heading_stack: List[Tuple[int, str]] = []
         section_texts: Dict[str, List[str]] = defaultdict(list)
-        section_buffers: Dict[str, List[str]] = defaultdict(list)
+        section_buffers: Dict[str, SentenceWindow] = defaultdict(self._new_window)
         docs: List[Document] = []
         img_counter = 0
         found_any_heading = False
@@ -198,38 +203,36 @@ class MdParser:
                 continue
 
             if isinstance(el, PictureItem):
+                if not self.extract_images:
+                    continue
                 try:
                     pil = el.get_image(d)
                 except Exception:
                     pil = None
                 if pil is None:
                     continue
-                images_dir.mkdir(parents=True, exist_ok=True)
                 next_idx = img_counter + 1
-                img_name = f"img_{img_counter}.png"
-                img_path = images_dir / img_name
-                try:
-                    pil.save(img_path, "PNG")
-                except Exception:
-                    continue
+                # Ghi ở nền; ảnh trùng nội dung trả về đường dẫn của bản đã ghi
+                filepath, _ = self.image_writer.submit(
+                    pil, images_dir / f"img_{img_counter}"
+                )
                 img_counter = next_idx
                 ctx = self._context(key, section_buffers)
 
                 # Chỉ tạo document ảnh nếu có nội dung có ý nghĩa
                 if ctx and ctx.strip():
-                    docs.append(
-                        Document(
-                            content=ctx,
-                            meta={
-                                "category": "image",
-                                "source": source,
-                                "filename": filename,
-                                "document_id": document_id,
-                                "trace": f"Mục {key}",
-                                "filepath": str(img_path.resolve()),
-                            },
-                        )
+                    image_doc = Document(
+                        content=ctx,
+                        meta={
+                            "category": "image",
+                            "source": source,
+                            "filename": filename,
+                            "document_id": document_id,
+                            "trace": f"Mục {key}",
+                            "filepath": filepath,
+                        },
                     )
+                    docs.append(image_doc)
                 continue
 
         if found_any_heading:
@@ -266,6 +269,7 @@ class MdParser:
                         )
                     )
 
+        # Không chờ ảnh ghi xong: pipeline gọi image_writer.drop_failed() ở bước chunk
         return docs
 
 
@@ -1,17 +1,24 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import List, Dict, Optional
-import uuid
+from typing import List, Dict, Optional, Tuple
 import re
+import tempfile
+import time
 from collections import defaultdict
 
 # Haystack 2.x
 from haystack import Document
 
+from utils.hashing import file_document_id
+from utils.text import SentenceWindow, normalize_text
+from parsers._conversion_cache import ConversionCache
+from parsers import _converter_registry
+from parsers._converter_registry import get_converter
+from parsers._image_writer import ImageWriter
+
 # Docling
-from docling.document_converter import DocumentConverter, PdfFormatOption
-from docling.datamodel.base_models import InputFormat
-from docling.datamodel.pipeline_options import PdfPipelineOptions, TesseractOcrOptions
+from docling.document_converter import DocumentConverter
+from docling_core.types.doc import DoclingDocument
 from docling_core.types.doc.document import (
     TextItem,
     SectionHeaderItem,
@@ -26,7 +33,12 @@ class PdfParser:
     - Text: gộp theo MỖI TRANG -> 1 Document (category="text").
     - Table: content = <văn cảnh ngay trước> + Markdown; HTML gốc vào meta.table_html.
     - Image: lưu ảnh vào images/<filename_wo_ext>/..., content = <văn cảnh ngay trước>; meta.filepath.
+      Ảnh được ghi ở nền bằng ImageWriter (khử trùng lặp theo nội dung); extract_images=False bỏ qua ảnh.
     - Metadata: category, source, filename, document_id, trace="Trang {page}" (ảnh thêm filepath).
+    - PDF lớn: shard_pages > 0 -> convert theo từng khoảng trang (song song với shard_workers process).
+    - text_fast_path=True: phân loại từng trang bằng pypdfium2; trang có text layer dùng được
+      (không ảnh, ít đường vẽ) lấy text trực tiếp, chỉ trang scan/layout phức tạp mới qua Docling.
+      Báo cáo đường đi + thời gian từng trang nằm trong last_page_report.
     """
 
     # -------------------------
@@ -37,52 +49,78 @@ class PdfParser:
         images_root: str | Path = "images",
         context_sentences: int = 3,
         buffer_max_sentences: int = 6,
-        image_scale: float = 2.0,
+        image_scale: Optional[float] = None,
+        conversion_cache: Optional[ConversionCache] = None,
+        converter: Optional[DocumentConverter] = None,
+        shard_pages: int = 0,
+        shard_min_pages: int = 0,
+        shard_workers: int = 1,
+        shard_worker_threads: int = 1,
+        image_writer: Optional[ImageWriter] = None,
+        extract_images: bool = True,
+        text_fast_path: bool = False,
+        fast_path_min_chars: int = 20,
+        fast_path_max_paths: int = 50,
     ) -> None:
         self.images_root = Path(images_root)
         self.context_sentences = int(context_sentences)
         self.buffer_max_sentences = int(buffer_max_sentences)
-        self.image_scale = float(image_scale)
-        self.converter = self._make_converter()
+        # Tỉ lệ render ảnh của Docling (None: giữ cấu hình hiện tại của _converter_registry)
+        if image_scale is not None:
+            _converter_registry.configure(images_scale=image_scale)
+        self.extract_images = bool(extract_images)
+        self.image_writer = image_writer or (ImageWriter() if extract_images else None)
+        self.conversion_cache = conversion_cache
+        self._converter = converter
+        # Shard PDF lớn theo khoảng trang (shard_pages <= 0: tắt)
+        self.shard_pages = int(shard_pages)
+        self.shard_min_pages = int(shard_min_pages)
+        self.shard_workers = max(1, int(shard_workers))
+        self.shard_worker_threads = max(1, int(shard_worker_threads))
+        # Pool convert shard: tạo lazy ở PDF lớn đầu tiên, dùng lại cho các file sau (close())
+        self._shard_pool = None
+        # Đường tắt text layer cho PDF born-digital
+        self.text_fast_path = bool(text_fast_path)
+        self.fast_path_min_chars = int(fast_path_min_chars)
+        self.fast_path_max_paths = int(fast_path_max_paths)
+        self.last_page_report: List[Dict] = []
 
     # Các hàm helper (giảm trùng lặp)
-    _SENT_SPLIT = re.compile(
-        r"(?<=[\.!?])\s+(?=[A-ZÀ-Ỵ])|(?<=[\.!\?])\s+(?=\d+)|\n{2,}"
-    )
-
     @staticmethod
-    def _split_sentences(text: str) -> List[str]:
-        sents = [
-            s.strip() for s in PdfParser._SENT_SPLIT.split(text or "") if s.strip()
-        ]
-        return sents or [ln.strip() for ln in (text or "").splitlines() if ln.strip()]
+    def _file_document_id(path: Path) -> str:
+        return file_document_id(path)
 
-    @staticmethod
-    def _normalize_text(t: str) -> str:
-        if not t:
-            return ""
-        t = re.sub(r"-\s*\n", "", t)
-        t = t.replace("\u00ad", "")
-        t = re.sub(r"\s*\n\s*", " ", t)
-        t = re.sub(r"\s{2,}", " ", t)
-        return t.strip()
-
-    def _make_converter(self) -> DocumentConverter:
-        # Sử dụng DocumentConverter với PDF format nhưng không cần pipeline options
-        return DocumentConverter(format_options={InputFormat.PDF: PdfFormatOption()})
+    @property
+    def converter(self) -> DocumentConverter:
+        # Mặc định dùng converter chung của process (tạo lazy ở lần convert đầu tiên)
+        return self._converter or get_converter()
 
-    @staticmethod
-    def _file_document_id(path: Path) -> str:
-        st = path.stat()
-        seed = f"{path.resolve()}:{st.st_size}:{st.st_mtime_ns}"
-        return str(uuid.uuid5(uuid.NAMESPACE_URL, seed))
+    # Tag mô tả cấu hình pipeline, nằm trong key của conversion cache
+    _PIPELINE_TAG = "pdf:default"
+
+    @property
+    def pipeline_tag(self) -> str:
+        # Tuỳ chọn ảnh đổi kết quả convert (ảnh picture nhúng trong DoclingDocument)
+        scale, pictures = _converter_registry.image_options()
+        return f"{self._PIPELINE_TAG}:images={scale:g}:{int(pictures)}"
+
+    def _convert(self, path: Path):
+        """Convert bằng Docling, dùng conversion cache nếu được cấu hình."""
+        if self.conversion_cache is not None:
+            return self.conversion_cache.convert(
+                self.converter, path, self.pipeline_tag
+            )
+        return self.converter.convert(path).document
 
     @staticmethod
-    def _resolve_page_no(el, current_page: Optional[int] = None) -> int:
+    def _resolve_page_no(
+        el, current_page: Optional[int] = None, page_offset: int = 0
+    ) -> int:
         """
         Best-effort lấy số trang cho element Docling.
         - el.prov thường là LIST các ProvenanceItem => dùng prov[0].page_no
         - Nếu không có, fallback về current_page
+        - page_offset: số trang đứng trước shard (khi convert theo khoảng trang)
         """
         prov = getattr(el, "prov", None)
         page: Optional[int] = None
@@ -97,12 +135,15 @@ class PdfParser:
             if isinstance(p, (int, float)):
                 page = int(p)
         if page is not None:
-            return page + 1 if page == 0 else page
-        return int(current_page) if current_page is not None else 1
+            return (page + 1 if page == 0 else page) + page_offset
+        return int(current_page) if current_page is not None else 1 + page_offset
+
+    def _context(self, page_no: int, page_buffers: Dict[int, SentenceWindow]) -> str:
+        buf = page_buffers.get(page_no)
+        return buf.context(self.context_sentences) if buf is not None else ""
 
-    def _context(self, page_no: int, page_buffers: Dict[int, List[str]]) -> str:
-        buf = page_buffers.get(page_no, [])
-        return " ".join(buf[-self.context_sentences :]).strip()
+    def _new_window(self) -> SentenceWindow:
+        return SentenceWindow(self.buffer_max_sentences)
 
     @staticmethod
     def _export_table(el, doc) -> tuple[str, str]:
@@ -113,70 +154,368 @@ class PdfParser:
         html = el.export_to_html(doc=doc)
         return md, html
 
-    @staticmethod
     def _save_picture(
-        el, doc, page_no: int, images_dir: Path, picture_counters: Dict[int, int]
-    ) -> Optional[str]:
+        self, el, doc, page_no: int, images_dir: Path, picture_counters: Dict[int, int]
+    ):
+        """Đưa ảnh vào image_writer, trả về (filepath, future) hoặc None nếu không lấy được ảnh."""
         try:
             pil = el.get_image(doc)  # PIL.Image
-            if pil is None:
-                return None
-            # Chỉ tạo thư mục khi thực sự có ảnh
-            images_dir.mkdir(parents=True, exist_ok=True)
-            # Chỉ tăng counter sau khi chắc chắn sẽ lưu
-            idx = picture_counters.get(page_no, 0) + 1
-            img_name = f"page_{page_no}_img_{idx}.png"
-            img_path = images_dir / img_name
-            pil.save(img_path, "PNG")
-            picture_counters[page_no] = idx  # cập nhật sau khi lưu OK
-
-            return str(img_path.resolve())
         except Exception:
             return None
+        if pil is None:
+            return None
+        idx = picture_counters.get(page_no, 0) + 1
+        picture_counters[page_no] = idx
+        # Ghi ở nền; ảnh trùng nội dung trả về đường dẫn của bản đã ghi
+        return self.image_writer.submit(pil, images_dir / f"page_{page_no}_img_{idx}")
 
     def _push_text(
         self,
         page_no: int,
         raw_text: str,
         page_texts: Dict[int, List[str]],
-        page_buffers: Dict[int, List[str]],
+        page_buffers: Dict[int, SentenceWindow],
     ) -> None:
-        text = self._normalize_text(str(raw_text) or "")
+        text = normalize_text(str(raw_text) or "")
         if not text:
             return
         page_texts.setdefault(page_no, []).append(text)
-        for s in self._split_sentences(text):
-            if s:
-                page_buffers.setdefault(page_no, []).append(s)
-        if len(page_buffers.get(page_no, [])) > self.buffer_max_sentences:
-            page_buffers[page_no] = page_buffers[page_no][-self.buffer_max_sentences :]
+        page_buffers[page_no].push(text)
 
-    # Public API
-    def parse(self, pdf_path: str | Path) -> List[Document]:
+    # ---- convert theo khoảng trang (PDF lớn) ----
+    @staticmethod
+    def _page_count(pdf_path: Path) -> int:
+        try:
+            import pypdfium2 as pdfium
+
+            pdf = pdfium.PdfDocument(str(pdf_path))
+            try:
+                return len(pdf)
+            finally:
+                pdf.close()
+        except Exception:
+            return 0
+
+    def _page_ranges(self, pdf_path: Path) -> List[Tuple[int, int]]:
+        """Chia PDF thành các khoảng trang [start, end] (1-based) nếu đủ lớn để shard."""
+        if self.shard_pages <= 0:
+            return []
+        n_pages = self._page_count(pdf_path)
+        if n_pages < max(self.shard_min_pages, self.shard_pages + 1):
+            return []
+        return [
+            (start, min(start + self.shard_pages - 1, n_pages))
+            for start in range(1, n_pages + 1, self.shard_pages)
+        ]
+
+    def _convert_range(self, pdf_path: Path, start: int, end: int):
         """
-        Đọc PDF sạch và trả về danh sách haystack.Document:
-            - category="text"  : nội dung cả trang (đã gom)
-            - category="table" : context trước + Markdown; meta.table_html giữ HTML gốc
-            - category="image" : context trước; meta.filepath trỏ tới ảnh đã lưu
+        Convert các trang [start, end] của PDF: tách ra file PDF tạm bằng pypdfium2
+        rồi convert như 1 file bình thường (page_no trong kết quả bắt đầu từ 1).
         """
-        pdf_path = Path(pdf_path)
-        source = str(pdf_path.resolve())
-        filename = pdf_path.name
-        fname_wo = pdf_path.stem
-        document_id = self._file_document_id(pdf_path)
-        images_dir = self.images_root / fname_wo
-        conv_res = self.converter.convert(pdf_path)
-        d = conv_res.document
-        # Trạng thái tích luỹ
-        page_texts: Dict[int, List[str]] = defaultdict(list)
-        page_buffers: Dict[int, List[str]] = defaultdict(list)
-        picture_counters: Dict[int, int] = defaultdict(int)
-        docs: List[Document] = []
-        current_page: Optional[int] = None
-        # Duyệt theo reading order
+        import pypdfium2 as pdfium
+
+        def _convert():
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                part_path = Path(tmp_dir) / f"{pdf_path.stem}__p{start}-{end}.pdf"
+                src = pdfium.PdfDocument(str(pdf_path))
+                part = pdfium.PdfDocument.new()
+                try:
+                    part.import_pages(src, pages=list(range(start - 1, end)))
+                    part.save(str(part_path))
+                finally:
+                    part.close()
+                    src.close()
+                return self.converter.convert(part_path).document
+
+        if self.conversion_cache is not None:
+            return self.conversion_cache.get_or_convert(
+                pdf_path, f"{self.pipeline_tag}:pages={start}-{end}", _convert
+            )
+        return _convert()
+
+    def _iter_shards(self, pdf_path: Path):
+        """
+        Yield (DoclingDocument, page_offset) theo thứ tự trang.
+        PDF nhỏ -> 1 shard là cả file. PDF lớn -> mỗi khoảng trang 1 shard,
+        convert song song bằng shard_workers process nếu > 1.
+        """
+        ranges = self._page_ranges(pdf_path)
+        if not ranges:
+            yield self._convert(pdf_path), 0
+            return
+        print(f"Convert {pdf_path.name} theo {len(ranges)} khoảng trang")
+        yield from self._iter_ranges(pdf_path, ranges)
+
+    def _iter_ranges(self, pdf_path: Path, ranges: List[Tuple[int, int]]):
+        """Convert các khoảng trang [start, end], yield (DoclingDocument, page_offset) theo thứ tự."""
+        if self.shard_workers <= 1 or len(ranges) <= 1:
+            for start, end in ranges:
+                yield self._convert_range(pdf_path, start, end), start - 1
+            return
+
+        from concurrent.futures.process import BrokenProcessPool
+        from parsers import _parallel
+
+        executor = self._get_shard_pool()
+        futures = [
+            executor.submit(_parallel.convert_pdf_range, str(pdf_path), start, end)
+            for start, end in ranges
+        ]
+        try:
+            for (start, _end), future in zip(ranges, futures):
+                yield DoclingDocument.model_validate_json(future.result()), start - 1
+        except BrokenProcessPool:
+            # Worker chết (thường do hết RAM): bỏ pool hỏng, lần sau tạo lại
+            self._shard_pool = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _get_shard_pool(self):
+        """
+        Process pool convert shard, giữ lại giữa các file để worker không load lại model.
+        Initializer chỉ dựng pipeline PDF (không dựng RouterParser/pipeline DOCX, MD).
+        """
+        if self._shard_pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            import multiprocessing as mp
+            from parsers import _parallel
+
+            cache = self.conversion_cache
+            self._shard_pool = ProcessPoolExecutor(
+                max_workers=self.shard_workers,
+                mp_context=mp.get_context("spawn"),
+                initializer=_parallel.init_pdf_shard_worker,
+                initargs=(
+                    str(self.images_root),
+                    self.shard_worker_threads,
+                    str(cache.cache_dir) if cache is not None else None,
+                    cache.max_bytes if cache is not None else 0,
+                    _converter_registry.image_options(),
+                ),
+            )
+        return self._shard_pool
+
+    def close(self) -> None:
+        """Tắt pool convert shard (nếu đã tạo)."""
+        if self._shard_pool is not None:
+            self._shard_pool.shutdown(wait=True, cancel_futures=True)
+            self._shard_pool = None
+
+    # ---- đường tắt text layer (PDF born-digital) ----
+    # Ranh giới đoạn trong text của pdfium: dòng trống hoặc dòng kết thúc bằng dấu câu
+    _PARA_BREAK = re.compile(r"\n\s*\n|(?<=[\.!?:])[ \t]*\n")
+    # Bảng không kẻ viền: >= _TABLE_MIN_ROWS dòng liền nhau có >= 2 cột thẳng hàng (lệch <= _COLUMN_TOL pt)
+    _TABLE_MIN_ROWS = 3
+    _COLUMN_TOL = 3.0
+
+    @classmethod
+    def _has_aligned_columns(cls, textpage) -> bool:
+        """
+        Phát hiện bảng không viền từ các rect text của pdfium (rect bị tách ở khoảng trống giữa cột).
+        Gom rect theo dòng, tìm chuỗi dòng liền nhau có chung >= 2 mép trái cột.
+        Layout 2 cột cũng bị coi là bảng -> đi Docling (chậm hơn nhưng không mất bảng).
+        """
+        n = textpage.count_rects()
+        if n < cls._TABLE_MIN_ROWS * 2:
+            return False
+        rects = sorted(
+            (textpage.get_rect(i) for i in range(n)), key=lambda r: (-r[3], r[0])
+        )
+        # Dòng = các rect có tâm dọc gần nhau; mỗi dòng giữ danh sách mép trái
+        lines: List[Tuple[float, List[float]]] = []
+        for left, bottom, _right, top in rects:
+            center = (top + bottom) / 2
+            if lines and abs(lines[-1][0] - center) <= cls._COLUMN_TOL:
+                lines[-1][1].append(left)
+            else:
+                lines.append((center, [left]))
+
+        def shared(columns: List[float], lefts: List[float]) -> List[float]:
+            return [
+                x for x in columns if any(abs(x - y) <= cls._COLUMN_TOL for y in lefts)
+            ]
+
+        columns: List[float] = []
+        rows = 0
+        for _center, lefts in lines:
+            if len(lefts) < 2:
+                columns, rows = [], 0
+                continue
+            kept = shared(columns, lefts) if rows else []
+            if len(kept) >= 2:
+                columns, rows = kept, rows + 1
+            else:
+                columns, rows = lefts, 1
+            if rows >= cls._TABLE_MIN_ROWS:
+                return True
+        return False
+
+    def _classify_pages(self, pdf_path: Path) -> List[Dict]:
+        """
+        Phân loại từng trang: "text" nếu text layer dùng được, ngược lại "docling".
+        Trang có bảng (kẻ viền -> nhiều đường vẽ, không viền -> cột text thẳng hàng) đi Docling
+        để không mất Document "table". Trang "text" giữ luôn text đã trích (không phải đọc lại).
+        """
+        import pypdfium2 as pdfium
+        import pypdfium2.raw as pdfium_c
+
+        pages: List[Dict] = []
+        pdf = pdfium.PdfDocument(str(pdf_path))
+        try:
+            for i in range(len(pdf)):
+                t0 = time.perf_counter()
+                page = pdf[i]
+                try:
+                    n_images = n_paths = 0
+                    for obj in page.get_objects():
+                        if obj.type == pdfium_c.FPDF_PAGEOBJ_IMAGE:
+                            n_images += 1
+                        elif obj.type == pdfium_c.FPDF_PAGEOBJ_PATH:
+                            n_paths += 1
+                    textpage = page.get_textpage()
+                    try:
+                        text = textpage.get_text_range()
+                        has_table = self._has_aligned_columns(textpage)
+                    finally:
+                        textpage.close()
+                finally:
+                    page.close()
+
+                n_chars = len(text.strip())
+                if n_chars < self.fast_path_min_chars and (n_images or n_paths):
+                    # Nội dung nằm trong ảnh/đường vẽ (trang scan, font bị outline) -> cần OCR
+                    reason = "ít/không có text layer"
+                elif text.count("\ufffd") > 0.05 * n_chars:
+                    reason = "text layer lỗi font"
+                elif n_images and self.extract_images:
+                    reason = f"{n_images} ảnh"
+                elif n_paths > self.fast_path_max_paths:
+                    reason = f"layout phức tạp ({n_paths} đường vẽ)"
+                elif has_table:
+                    reason = "bảng không kẻ viền (cột thẳng hàng)"
+                else:
+                    reason = ""
+                pages.append(
+                    {
+                        "page": i + 1,
+                        "path": "docling" if reason else "text",
+                        "reason": reason,
+                        "chars": n_chars,
+                        "seconds": time.perf_counter() - t0,
+                        "text": None if reason else text,
+                    }
+                )
+        finally:
+            pdf.close()
+        return pages
+
+    def _segments(self, pages: List[Dict]) -> List[Tuple[str, int, int]]:
+        """
+        Gom các trang liên tiếp cùng đường đi thành (path, start, end).
+        Đoạn Docling dài được chia tiếp theo shard_pages.
+        """
+        segments: List[Tuple[str, int, int]] = []
+        for p in pages:
+            if segments and segments[-1][0] == p["path"]:
+                segments[-1] = (p["path"], segments[-1][1], p["page"])
+            else:
+                segments.append((p["path"], p["page"], p["page"]))
+        if self.shard_pages <= 0:
+            return segments
+        split: List[Tuple[str, int, int]] = []
+        for path, start, end in segments:
+            if path != "docling":
+                split.append((path, start, end))
+                continue
+            for s in range(start, end + 1, self.shard_pages):
+                split.append((path, s, min(s + self.shard_pages - 1, end)))
+        return split
+
+    def _push_page_text(self, page_no: int, text: str, state: Dict) -> None:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        for para in self._PARA_BREAK.split(text):
+            self._push_text(page_no, para, state["page_texts"], state["page_buffers"])
+
+    def _parse_fast_path(
+        self,
+        pdf_path: Path,
+        state: Dict,
+        source: str,
+        filename: str,
+        document_id: str,
+        images_dir: Path,
+    ) -> bool:
+        """
+        Parse theo từng trang với đường tắt text layer. Trả về False nếu không áp dụng được
+        (không đọc được PDF bằng pypdfium2 hoặc không có trang nào đi đường text).
+        """
+        t_start = time.perf_counter()
+        try:
+            pages = self._classify_pages(pdf_path)
+        except Exception as e:
+            print(f"Không phân loại được trang của {pdf_path.name}: {e}")
+            return False
+        if not any(p["path"] == "text" for p in pages):
+            self.last_page_report = [
+                {k: v for k, v in p.items() if k != "text"} for p in pages
+            ]
+            return False
+
+        segments = self._segments(pages)
+        heavy = self._iter_ranges(
+            pdf_path, [(s, e) for path, s, e in segments if path == "docling"]
+        )
+        for path, start, end in segments:
+            if path == "text":
+                for p in pages[start - 1 : end]:
+                    t0 = time.perf_counter()
+                    state["current_page"] = p["page"]
+                    self._push_page_text(p["page"], p["text"], state)
+                    p["seconds"] += time.perf_counter() - t0
+                continue
+            t0 = time.perf_counter()
+            d, page_offset = next(heavy)
+            self._consume(
+                d, page_offset, state, source, filename, document_id, images_dir
+            )
+            # Thời gian Docling chia đều cho các trang trong khoảng
+            per_page = (time.perf_counter() - t0) / (end - start + 1)
+            for p in pages[start - 1 : end]:
+                p["seconds"] += per_page
+
+        self.last_page_report = [
+            {k: v for k, v in p.items() if k != "text"} for p in pages
+        ]
+        n_text = sum(1 for p in pages if p["path"] == "text")
+        print(
+            f"{pdf_path.name}: {n_text}/{len(pages)} trang lấy từ text layer, "
+            f"{len(pages) - n_text} trang qua Docling "
+            f"({time.perf_counter() - t_start:.2f}s)"
+        )
+        return True
+
+    def _consume(
+        self,
+        d,
+        page_offset: int,
+        state: Dict,
+        source: str,
+        filename: str,
+        document_id: str,
+        images_dir: Path,
+    ) -> None:
+        """Duyệt element của 1 DoclingDocument (cả file hoặc 1 shard) theo reading order."""
+        page_texts = state["page_texts"]
+        page_buffers = state["page_buffers"]
+        picture_counters = state["picture_counters"]
+        docs = state["docs"]
         for el, _lvl in d.iterate_items():
-            page_no = self._resolve_page_no(el, current_page)
-            current_page = page_no
+            page_no = self._resolve_page_no(el, state["current_page"], page_offset)
+            state["current_page"] = page_no
 
             # TEXT
             if isinstance(el, (TextItem, SectionHeaderItem)) or getattr(
@@ -207,28 +546,65 @@ class PdfParser:
 
             # IMAGE
             elif isinstance(el, PictureItem):
-                filepath = self._save_picture(
-                    el, d, page_no, images_dir, picture_counters
-                )
-                if not filepath:
+                if not self.extract_images:
+                    continue
+                saved = self._save_picture(el, d, page_no, images_dir, picture_counters)
+                if saved is None:
                     continue
+                filepath, _ = saved
                 ctx = self._context(page_no, page_buffers)
                 # Chỉ tạo document ảnh nếu có nội dung có ý nghĩa
                 if ctx and ctx.strip():
-                    docs.append(
-                        Document(
-                            content=ctx,
-                            meta={
-                                "category": "image",
-                                "source": source,
-                                "filename": filename,
-                                "document_id": document_id,
-                                "trace": f"Trang {page_no}",
-                                "filepath": filepath,
-                            },
-                        )
+                    image_doc = Document(
+                        content=ctx,
+                        meta={
+                            "category": "image",
+                            "source": source,
+                            "filename": filename,
+                            "document_id": document_id,
+                            "trace": f"Trang {page_no}",
+                            "filepath": filepath,
+                        },
                     )
+                    docs.append(image_doc)
+
+    # Public API
+    def parse(self, pdf_path: str | Path) -> List[Document]:
+        """
+        Đọc PDF sạch và trả về danh sách haystack.Document:
+            - category="text"  : nội dung cả trang (đã gom)
+            - category="table" : context trước + Markdown; meta.table_html giữ HTML gốc
+            - category="image" : context trước; meta.filepath trỏ tới ảnh đã lưu
+        PDF lớn (>= shard_min_pages) được convert theo từng khoảng trang rồi gộp lại,
+        kết quả (trace, page_texts, số thứ tự ảnh) giống hệt khi convert cả file.
+        """
+        pdf_path = Path(pdf_path)
+        source = str(pdf_path.resolve())
+        filename = pdf_path.name
+        fname_wo = pdf_path.stem
+        document_id = self._file_document_id(pdf_path)
+        images_dir = self.images_root / fname_wo
+        self.last_page_report = []
+        # Trạng thái tích luỹ (dùng chung giữa các shard)
+        state = {
+            "page_texts": defaultdict(list),
+            "page_buffers": defaultdict(self._new_window),
+            "picture_counters": defaultdict(int),
+            "docs": [],
+            "current_page": None,
+        }
+        fast = self.text_fast_path and self._parse_fast_path(
+            pdf_path, state, source, filename, document_id, images_dir
+        )
+        if not fast:
+            # Duyệt theo reading order, shard sau nối tiếp shard trước
+            for d, page_offset in self._iter_shards(pdf_path):
+                self._consume(
+                    d, page_offset, state, source, filename, document_id, images_dir
+                )
 
+        page_texts: Dict[int, List[str]] = state["page_texts"]
+        docs: List[Document] = state["docs"]
         # 1 Document "text" cho mỗi trang
         for page_no in sorted(page_texts.keys()):
             full_page_text = "\n\n".join(page_texts[page_no]).strip()
@@ -247,6 +623,7 @@ class PdfParser:
                 )
             )
 
+        # Không chờ ảnh ghi xong: pipeline gọi image_writer.drop_failed() ở bước chunk
         return docs
 
 
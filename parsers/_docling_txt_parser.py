@@ -1,12 +1,17 @@
 from __future__ import annotations
 from pathlib import Path
-from typing import List
-import uuid
+from typing import Iterator, List, Optional
+import codecs
 import re
 
 # Haystack 2.x
 from haystack import Document
 
+from utils.hashing import file_document_id
+from utils.text import normalize_text
+
+_UTF8 = ("utf-8-sig", "utf-8")
+
 
 class TxtParser:
     """
@@ -14,6 +19,10 @@ class TxtParser:
     - Gộp text theo khối (N đoạn hoặc max ký tự).
     - Không có table/image.
     - Metadata: category="text", source, filename, document_id, trace="Khối {i}".
+    - Đọc streaming: dò encoding trên sample_bytes đầu file, rồi đọc từng đoạn read_chunk_chars
+      ký tự với decode strict; byte lỗi ở phần sau => đọc lại với encoding ứng viên tiếp theo.
+      RAM không phụ thuộc kích thước file. iter_parse() yield từng khối, RAM chỉ giữ khối
+      đang gom (~group_max_chars).
     """
 
     def __init__(
@@ -21,6 +30,8 @@ class TxtParser:
         group_max_paragraphs: int = 10,
         group_max_chars: int = 4000,
         encoding_candidates: List[str] | None = None,
+        sample_bytes: int = 64 * 1024,
+        read_chunk_chars: int = 1024 * 1024,
     ) -> None:
         self.group_max_paragraphs = int(group_max_paragraphs)
         self.group_max_chars = int(group_max_chars)
@@ -31,96 +42,158 @@ class TxtParser:
             "cp1258",
             "latin-1",
         ]
+        self.sample_bytes = max(4, int(sample_bytes))
+        self.read_chunk_chars = max(1024, int(read_chunk_chars))
 
     # --- các hàm helper (đưa vào class) ---
     _PARA_SPLIT = re.compile(r"\n\s*\n+", flags=re.MULTILINE)
-    _SENT_SPLIT = re.compile(
-        r"(?<=[\.!?])\s+(?=[A-ZÀ-Ỵ])|(?<=[\.!\?])\s+(?=\d+)|\n{2,}"
-    )
-
-    @staticmethod
-    def _normalize_text(t: str) -> str:
-        if not t:
-            return ""
-        t = re.sub(r"-\s*\n", "", t)
-        t = t.replace("\u00ad", "")
-        t = re.sub(r"\s*\n\s*", " ", t)
-        t = re.sub(r"\s{2,}", " ", t)
-        return t.strip()
 
     @staticmethod
     def _file_document_id(path: Path) -> str:
-        st = path.stat()
-        seed = f"{path.resolve()}:{st.st_size}:{st.st_mtime_ns}"
-        return str(uuid.uuid5(uuid.NAMESPACE_URL, seed))
-
-    def _read_text(self, path: Path) -> str:
-        last_err = None
-        for enc in self.encoding_candidates:
+        return file_document_id(path)
+
+    def _detect_encoding(
+        self, path: Path, candidates: Optional[List[str]] = None
+    ) -> Optional[str]:
+        """
+        Dò encoding trên phần đầu file (sample_bytes): encoding đầu tiên trong danh sách
+        decode được sample. None nếu không encoding nào hợp.
+        """
+        with open(path, "rb") as f:
+            sample = f.read(self.sample_bytes)
+        # Sample ngắn hơn sample_bytes nghĩa là đã đọc hết file
+        final = len(sample) < self.sample_bytes
+        for enc in self.encoding_candidates if candidates is None else candidates:
             try:
-                return path.read_text(encoding=enc)
-            except Exception as e:
-                last_err = e
-        # cuối cùng đọc binary rồi decode lỗi bỏ qua
-        data = path.read_bytes()
-        try:
-            return data.decode("utf-8", errors="ignore")
-        except Exception:
-            if last_err:
-                raise last_err
-            return data.decode(errors="ignore")
-
-    # --- public API ---
-    def parse(self, txt_path: str | Path) -> List[Document]:
-        txt_path = Path(txt_path)
-        source = str(txt_path.resolve())
-        filename = txt_path.name
-        document_id = self._file_document_id(txt_path)
-
-        raw = self._read_text(txt_path)
-        # tách đoạn — coi 1+ dòng trống là ranh giới
-        paras = [
-            self._normalize_text(p)
-            for p in self._PARA_SPLIT.split(raw)
-            if self._normalize_text(p)
-        ]
-        if not paras:
-            return []
-
-        docs: List[Document] = []
-        bucket, bucket_chars, bucket_idx = [], 0, 0
-
-        def flush():
+                # Decoder tăng dần: ký tự nhiều byte bị cắt ở cuối sample không bị coi là lỗi
+                codecs.getincrementaldecoder(enc)(errors="strict").decode(
+                    sample, final=final
+                )
+                return enc
+            except (UnicodeError, LookupError):
+                continue
+        return None
+
+    def _iter_paragraphs(
+        self, path: Path, encoding: str, errors: str = "strict"
+    ) -> Iterator[str]:
+        """
+        Yield từng đoạn (chưa chuẩn hóa), đọc file theo từng phần (decoder tăng dần của
+        TextIOWrapper). errors="strict": byte lỗi sau phần sample => UnicodeDecodeError.
+        """
+        # Đoạn quá dài (không có dòng trống) bị cắt ở khoảng trắng để RAM không phình
+        max_pending = max(self.group_max_chars, self.read_chunk_chars)
+        pending = ""
+        with open(path, encoding=encoding, errors=errors) as f:
+            while True:
+                chunk = f.read(self.read_chunk_chars)
+                if not chunk:
+                    break
+                parts = self._PARA_SPLIT.split(pending + chunk)
+                # Phần cuối có thể chưa hết đoạn -> giữ lại chờ chunk sau
+                pending = parts.pop()
+                yield from parts
+                if len(pending) > max_pending:
+                    cut = max(pending.rfind(" "), pending.rfind("\n"))
+                    if cut > 0:
+                        yield pending[:cut]
+                        pending = pending[cut:]
+        if pending:
+            yield pending
+
+    def _iter_blocks(
+        self, path: Path, meta: dict, encoding: str, errors: str = "strict"
+    ) -> Iterator[Document]:
+        """Gom đoạn thành các Document "Khối {i}"."""
+        bucket: List[str] = []
+        bucket_chars, bucket_idx = 0, 0
+
+        def flush() -> Optional[Document]:
             nonlocal bucket, bucket_chars, bucket_idx
             if not bucket:
-                return
+                return None
             content = "\n\n".join(bucket).strip()
+            doc = None
             if content:
-                docs.append(
-                    Document(
-                        content=content,
-                        meta={
-                            "category": "text",
-                            "source": source,
-                            "filename": filename,
-                            "document_id": document_id,
-                            "trace": f"Khối {bucket_idx + 1}",
-                        },
-                    )
+                doc = Document(
+                    content=content,
+                    meta={**meta, "trace": f"Khối {bucket_idx + 1}"},
                 )
             bucket, bucket_chars = [], 0
             bucket_idx += 1
+            return doc
 
-        for p in paras:
+        for raw in self._iter_paragraphs(path, encoding, errors):
+            p = normalize_text(raw)
+            if not p:
+                continue
             if (len(bucket) >= self.group_max_paragraphs) or (
                 bucket_chars + len(p) > self.group_max_chars
             ):
-                flush()
+                doc = flush()
+                if doc is not None:
+                    yield doc
             bucket.append(p)
             bucket_chars += len(p)
 
-        flush()
-        return docs
+        doc = flush()
+        if doc is not None:
+            yield doc
+
+    # --- public API ---
+    def iter_parse(self, txt_path: str | Path) -> Iterator[Document]:
+        """
+        Yield lần lượt các Document "Khối {i}" của file.
+        Encoding dò trên sample, rồi decode strict trong lúc đọc (1 lượt đọc file). Chỉ khi gặp
+        UnicodeDecodeError mới đọc lại từ đầu với encoding tiếp theo hợp với sample; các khối
+        đã yield trước đó (thường giống hệt, vd phần đầu toàn ASCII) được bỏ qua.
+        """
+        txt_path = Path(txt_path)
+        meta = {
+            "category": "text",
+            "source": str(txt_path.resolve()),
+            "filename": txt_path.name,
+            "document_id": self._file_document_id(txt_path),
+        }
+        # hash nội dung các khối đã yield (để không yield lại khi đọc lại bằng encoding khác)
+        emitted: List[int] = []
+        candidates = list(self.encoding_candidates)
+        while True:
+            encoding = self._detect_encoding(txt_path, candidates)
+            if encoding is None:
+                # Cách cuối: không encoding nào decode được -> bỏ byte lỗi, báo rõ
+                print(
+                    f"Cảnh báo: không encoding nào trong {self.encoding_candidates} decode được "
+                    f"{txt_path.name}, đọc utf-8 và bỏ qua byte lỗi (có thể mất ký tự)"
+                )
+                blocks = self._iter_blocks(txt_path, meta, "utf-8", errors="ignore")
+            else:
+                blocks = self._iter_blocks(txt_path, meta, encoding)
+            try:
+                for i, doc in enumerate(blocks):
+                    if i < len(emitted):
+                        if hash(doc.content) != emitted[i]:
+                            print(
+                                f"Cảnh báo: {txt_path.name} khối {i + 1} đã trả về với "
+                                f"encoding sai, thêm bản đọc lại bằng {encoding}"
+                            )
+                            yield doc
+                        continue
+                    emitted.append(hash(doc.content))
+                    yield doc
+                return
+            except UnicodeDecodeError as e:
+                print(
+                    f"{txt_path.name}: không decode được bằng {encoding} ({e.reason}), "
+                    "đọc lại bằng encoding tiếp theo"
+                )
+                candidates = candidates[candidates.index(encoding) + 1 :]
+                if encoding in _UTF8:
+                    # utf-8-sig và utf-8 chỉ khác nhau ở BOM: lỗi với 1 bản thì bản kia cũng lỗi
+                    candidates = [c for c in candidates if c not in _UTF8]
+
+    def parse(self, txt_path: str | Path) -> List[Document]:
+        return list(self.iter_parse(txt_path))
 
 
 if __name__ == "__main__":
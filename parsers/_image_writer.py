@@ -0,0 +1,108 @@
+"""
+Ghi ảnh trích xuất từ tài liệu ở nền (thread pool), vòng lặp parse không phải chờ encode/ghi file.
+- Khử trùng lặp theo hash nội dung ảnh trong cùng thư mục ảnh của 1 tài liệu: ảnh giống hệt
+  (logo, header lặp mỗi trang) chỉ được ghi 1 lần, các lần sau trả về đường dẫn của bản đã ghi.
+- Định dạng (PNG/WEBP/JPEG) và chất lượng cấu hình được. Tỉ lệ ảnh do Docling render sẵn
+  (images_scale trong _converter_registry), ở đây không resize lại.
+- parse() chỉ submit rồi trả về; việc chờ ghi xong + bỏ Document ảnh ghi lỗi (drop_failed) làm ở
+  bước sau của pipeline (trước khi chunk/embed), nên parse file kế tiếp không phải chờ ghi ảnh.
+"""
+
+from __future__ import annotations
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import threading
+
+_EXTENSIONS = {"PNG": ".png", "WEBP": ".webp", "JPEG": ".jpg"}
+
+
+class ImageWriter:
+    def __init__(
+        self,
+        image_format: str = "PNG",
+        quality: int = 85,
+        max_workers: int = 2,
+    ) -> None:
+        self.image_format = image_format.upper()
+        if self.image_format == "JPG":
+            self.image_format = "JPEG"
+        if self.image_format not in _EXTENSIONS:
+            raise ValueError(f"Unsupported image format: {image_format}")
+        self.extension = _EXTENSIONS[self.image_format]
+        self.quality = int(quality)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, int(max_workers)), thread_name_prefix="image-writer"
+        )
+        self._lock = threading.Lock()
+        # (thư mục, hash nội dung) -> (đường dẫn đã ghi, future của lần ghi đó)
+        self._written: Dict[Tuple[str, str], Tuple[str, Future]] = {}
+        # đường dẫn -> key đang ghi ở đó (để bỏ key cũ khi file bị ghi đè, ví dụ parse lại)
+        self._by_path: Dict[str, Tuple[str, str]] = {}
+
+    @staticmethod
+    def _content_hash(pil) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{pil.mode}:{pil.size}".encode("utf-8"))
+        h.update(pil.tobytes())
+        return h.hexdigest()
+
+    def _write(self, pil, img_path: Path) -> bool:
+        try:
+            if self.image_format == "JPEG" and pil.mode not in ("RGB", "L"):
+                pil = pil.convert("RGB")
+            img_path.parent.mkdir(parents=True, exist_ok=True)
+            if self.image_format == "PNG":
+                pil.save(img_path, "PNG")
+            else:
+                pil.save(img_path, self.image_format, quality=self.quality)
+            return True
+        except Exception as e:
+            print(f"Lỗi khi lưu ảnh {img_path}: {e}")
+            return False
+
+    def submit(self, pil, path_without_ext: Path) -> Tuple[str, Future]:
+        """
+        Đưa ảnh vào hàng đợi ghi. Trả về (đường dẫn tuyệt đối, future -> bool ghi thành công).
+        Ảnh trùng nội dung với ảnh đã ghi trước đó -> trả về đường dẫn cũ, không ghi lại.
+        """
+        img_path = Path(f"{path_without_ext}{self.extension}").resolve()
+        key = (str(img_path.parent), self._content_hash(pil))
+        with self._lock:
+            existing = self._written.get(key)
+            if existing is not None:
+                path, future = existing
+                # Bản cũ vẫn còn (hoặc đang ghi) -> dùng lại
+                if not future.done() or (future.result() and Path(path).exists()):
+                    return path, future
+            stale_key = self._by_path.get(str(img_path))
+            if stale_key is not None and stale_key != key:
+                self._written.pop(stale_key, None)
+            future = self._executor.submit(self._write, pil, img_path)
+            self._written[key] = (str(img_path), future)
+            self._by_path[str(img_path)] = key
+            return str(img_path), future
+
+    def _future_for(self, path: str) -> Optional[Future]:
+        with self._lock:
+            key = self._by_path.get(path)
+            entry = self._written.get(key) if key is not None else None
+        return entry[1] if entry is not None else None
+
+    def drop_failed(self, docs: List) -> List:
+        """
+        Chờ các ảnh mà docs trỏ tới (meta.filepath) ghi xong, bỏ các Document ảnh ghi lỗi.
+        Document không có ảnh do writer này ghi được giữ nguyên.
+        """
+        kept = []
+        for doc in docs:
+            path = (doc.meta or {}).get("filepath")
+            future = self._future_for(path) if path else None
+            if future is not None and not future.result():
+                continue
+            kept.append(doc)
+        return kept
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
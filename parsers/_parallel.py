@@ -0,0 +1,126 @@
+"""
+Helper chạy trong worker process của RouterParser (parse song song nhiều file).
+- Mỗi worker giữ 1 RouterParser riêng (parsers + model Docling đã warm-up).
+- Giới hạn số thread torch/OMP trong mỗi worker để tránh oversubscription.
+Lưu ý: module này không import Docling ở top-level để biến môi trường thread
+được set TRƯỚC khi torch/OpenMP khởi tạo.
+"""
+
+from __future__ import annotations
+from pathlib import Path
+from typing import List, Optional, Tuple
+import os
+
+# Haystack 2.x
+from haystack import Document
+
+_THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+
+# RouterParser riêng của worker hiện tại (khởi tạo 1 lần trong init_worker)
+_worker_router = None
+# PdfParser của worker convert shard PDF (khởi tạo 1 lần trong init_pdf_shard_worker)
+_worker_pdf_parser = None
+
+
+def limit_threads(num_threads: int) -> None:
+    """Giới hạn số thread của torch/OMP/BLAS trong process hiện tại."""
+    n = str(max(1, int(num_threads)))
+    for var in _THREAD_ENV_VARS:
+        os.environ[var] = n
+    try:
+        import torch
+
+        torch.set_num_threads(int(n))
+    except Exception:
+        pass
+
+
+def init_worker(
+    images_root: str,
+    num_threads: int,
+    cache_dir: Optional[str] = None,
+    cache_max_bytes: int = 0,
+    pdf_shard_pages: int = 0,
+    pdf_shard_min_pages: int = 0,
+    image_options: Optional[dict] = None,
+    pdf_text_fast_path: bool = False,
+) -> None:
+    """Initializer của ProcessPoolExecutor: cap thread rồi dựng parser 1 lần."""
+    global _worker_router
+    limit_threads(num_threads)
+    from parsers.router_parser import RouterParser
+    from parsers._conversion_cache import ConversionCache
+
+    cache = ConversionCache(cache_dir, cache_max_bytes) if cache_dir else None
+    # Trong worker: shard PDF lớn tuần tự (không mở thêm pool lồng nhau)
+    _worker_router = RouterParser(
+        images_root=Path(images_root),
+        workers=1,
+        conversion_cache=cache,
+        pdf_shard_pages=pdf_shard_pages,
+        pdf_shard_min_pages=pdf_shard_min_pages,
+        pdf_text_fast_path=pdf_text_fast_path,
+        **(image_options or {}),
+    )
+    _worker_router.warm_up()
+
+
+def init_pdf_shard_worker(
+    images_root: str,
+    num_threads: int,
+    cache_dir: Optional[str] = None,
+    cache_max_bytes: int = 0,
+    image_options: Optional[Tuple[float, bool]] = None,
+) -> None:
+    """
+    Initializer nhẹ cho pool convert shard PDF: chỉ dựng PdfParser và pipeline PDF của Docling
+    (không load pipeline DOCX/MD, không thread ghi ảnh — ảnh được xử lý ở process chính).
+    image_options: (images_scale, picture_images) của process chính, để ảnh picture nhúng trong
+    shard render giống hệt khi convert cả file.
+    """
+    global _worker_pdf_parser
+    limit_threads(num_threads)
+    from docling.datamodel.base_models import InputFormat
+    from parsers import _converter_registry
+    from parsers._conversion_cache import ConversionCache
+    from parsers._docling_pdf_parser import PdfParser
+
+    if image_options is not None:
+        _converter_registry.configure(*image_options)
+    cache = ConversionCache(cache_dir, cache_max_bytes) if cache_dir else None
+    _worker_pdf_parser = PdfParser(
+        images_root=Path(images_root), conversion_cache=cache, extract_images=False
+    )
+    _converter_registry.warm_up([InputFormat.PDF])
+
+
+def parse_file(file_path: str) -> Tuple[str, Optional[List[Document]], Optional[str]]:
+    """
+    Parse 1 file trong worker.
+    Trả về (file_path, docs, error) — lỗi được bắt theo từng file để không làm hỏng cả pool.
+    """
+    try:
+        if _worker_router is None:
+            raise RuntimeError("Worker chưa được khởi tạo (init_worker)")
+        docs = _worker_router.convert_file(Path(file_path))
+        # Ảnh do writer của worker ghi -> chờ + bỏ ảnh lỗi ngay trong worker
+        return file_path, _worker_router.drop_failed_images(docs), None
+    except Exception as e:
+        return file_path, None, str(e)
+
+
+def convert_pdf_range(file_path: str, start: int, end: int) -> str:
+    """
+    Convert các trang [start, end] của 1 PDF trong worker.
+    Trả về DoclingDocument dạng JSON (gửi về process chính rồi validate lại).
+    """
+    if _worker_pdf_parser is None:
+        raise RuntimeError("Worker chưa được khởi tạo (init_pdf_shard_worker)")
+    doc = _worker_pdf_parser._convert_range(Path(file_path), start, end)
+    return doc.model_dump_json()
@@ -1,5 +1,9 @@
 from pathlib import Path
-from typing import List
+from typing import Deque, Iterator, List, Optional, Tuple
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing as mp
 import sys
 
 # Thêm thư mục cha vào path để có thể import parsers package
@@ -10,20 +14,103 @@ from parsers._docling_docx_parser import DocxParser
 from parsers._docling_pdf_parser import PdfParser
 from parsers._docling_md_parser import MdParser
 from parsers._docling_txt_parser import TxtParser
+from parsers._conversion_cache import ConversionCache
+from parsers._image_writer import ImageWriter
+from parsers import _parallel, _converter_registry
 
 
 class RouterParser:
     """
     RouterParser:
         - Gọi parser tương ứng cho từng loại file
+        - workers > 1: parse song song nhiều file bằng process pool, mỗi worker
+          giữ bộ parser riêng (đã warm-up) và bị giới hạn worker_threads thread torch/OMP
+        - conversion_cache: cache kết quả Docling theo nội dung file (dùng chung cho mọi parser)
+        - pdf_shard_*: PDF lớn được convert theo từng khoảng trang (song song nếu pdf_shard_workers > 1)
+        - pdf_text_fast_path: trang PDF có text layer dùng được không chạy qua Docling
+        - image_*: ảnh được ghi ở nền bởi 1 ImageWriter dùng chung; extract_images=False bỏ qua ảnh.
+          image_scale là images_scale của pipeline PDF (Docling render sẵn đúng tỉ lệ).
+          parse không chờ ảnh ghi xong; gọi drop_failed_images() trước khi chunk/embed
+        - Các parser Docling dùng chung 1 DocumentConverter của process (_converter_registry),
+          nên tạo nhiều RouterParser không load lại model
     """
 
-    def __init__(self, images_root: Path):
-        self.doc_parser = DocxParser(images_root=images_root)
-        self.pdf_parser = PdfParser(images_root=images_root)
-        self.md_parser = MdParser(images_root=images_root)
+    def __init__(
+        self,
+        images_root: Path,
+        workers: int = 1,
+        worker_threads: int = 1,
+        conversion_cache: Optional[ConversionCache] = None,
+        pdf_shard_pages: int = 0,
+        pdf_shard_min_pages: int = 0,
+        pdf_shard_workers: int = 1,
+        pdf_text_fast_path: bool = False,
+        extract_images: bool = True,
+        image_format: str = "PNG",
+        image_scale: float = 1.0,
+        image_quality: int = 85,
+        image_writer_workers: int = 2,
+    ):
+        self.images_root = Path(images_root)
+        self.workers = max(1, int(workers))
+        self.worker_threads = max(1, int(worker_threads))
+        self.conversion_cache = conversion_cache
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Cấu hình ảnh (truyền nguyên cho worker process)
+        self.image_options = {
+            "extract_images": bool(extract_images),
+            "image_format": image_format,
+            "image_scale": float(image_scale),
+            "image_quality": int(image_quality),
+            "image_writer_workers": int(image_writer_workers),
+        }
+        _converter_registry.configure(
+            images_scale=image_scale, picture_images=extract_images
+        )
+        self.image_writer = (
+            ImageWriter(
+                image_format=image_format,
+                quality=image_quality,
+                max_workers=image_writer_workers,
+            )
+            if extract_images
+            else None
+        )
+        image_kwargs = {
+            "image_writer": self.image_writer,
+            "extract_images": extract_images,
+        }
+        self.doc_parser = DocxParser(
+            images_root=images_root, conversion_cache=conversion_cache, **image_kwargs
+        )
+        self.pdf_shard_pages = int(pdf_shard_pages)
+        self.pdf_shard_min_pages = int(pdf_shard_min_pages)
+        self.pdf_text_fast_path = bool(pdf_text_fast_path)
+        self.pdf_parser = PdfParser(
+            images_root=images_root,
+            conversion_cache=conversion_cache,
+            shard_pages=pdf_shard_pages,
+            shard_min_pages=pdf_shard_min_pages,
+            shard_workers=pdf_shard_workers,
+            shard_worker_threads=worker_threads,
+            text_fast_path=pdf_text_fast_path,
+            **image_kwargs,
+        )
+        self.md_parser = MdParser(
+            images_root=images_root, conversion_cache=conversion_cache, **image_kwargs
+        )
         self.txt_parser = TxtParser()
 
+    def warm_up(self) -> None:
+        """Dựng trước pipeline Docling (load model) để lần parse đầu tiên không phải chờ."""
+        _converter_registry.warm_up()
+
+    def drop_failed_images(self, docs: List[Document]) -> List[Document]:
+        """Chờ ảnh của docs ghi xong, bỏ các Document ảnh mà file ảnh ghi lỗi."""
+        if self.image_writer is None:
+            return docs
+        return self.image_writer.drop_failed(docs)
+
     def convert_file(self, file_path: Path) -> List[Document]:
         ext = file_path.suffix.lower()
         if ext == ".docx":
@@ -41,25 +128,109 @@ class RouterParser:
         else:
             raise ValueError(f"Unsupported file type: {ext}")
 
-    def parse_folder(self, folder_path: Path) -> List[Document]:
-        result_list: List[Document] = []
-        for file_path in folder_path.iterdir():
+    # ---- process pool ----
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Pool được giữ lại giữa các lần gọi để worker không phải load lại model Docling.
+        # Dùng "spawn" để worker không kế thừa state torch/thread của process chính.
+        if self._executor is None:
+            cache = self.conversion_cache
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=mp.get_context("spawn"),
+                initializer=_parallel.init_worker,
+                initargs=(
+                    str(self.images_root),
+                    self.worker_threads,
+                    str(cache.cache_dir) if cache is not None else None,
+                    cache.max_bytes if cache is not None else 0,
+                    self.pdf_shard_pages,
+                    self.pdf_shard_min_pages,
+                    self.image_options,
+                    self.pdf_text_fast_path,
+                ),
+            )
+        return self._executor
+
+    def close(self) -> None:
+        """Tắt process pool (nếu có), pool convert shard PDF và thread ghi ảnh."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        self.pdf_parser.close()
+        if self.image_writer is not None:
+            self.image_writer.shutdown()
+
+    @staticmethod
+    def _unwrap(file_path: Path, future) -> List[Document]:
+        try:
+            _, docs, error = future.result()
+        except BrokenProcessPool as e:
+            docs, error = None, f"worker process bị dừng đột ngột: {e}"
+        except Exception as e:
+            docs, error = None, str(e)
+        if error is not None:
+            print(f"Lỗi khi parse file {file_path.name}: {error}")
+        return docs or []
+
+    def _iter_parallel(
+        self, files: List[Path]
+    ) -> Iterator[Tuple[Path, List[Document]]]:
+        executor = self._get_executor()
+        # Giới hạn số file đang chờ để kết quả parse không dồn hết vào RAM
+        max_pending = self.workers * 2
+        pending: Deque[Tuple[Path, Future, ProcessPoolExecutor]] = deque()
+        files_iter = iter(files)
+        while True:
+            while len(pending) < max_pending:
+                file_path = next(files_iter, None)
+                if file_path is None:
+                    break
+                print(f"Parsing file (worker): {file_path}")
+                future = executor.submit(_parallel.parse_file, str(file_path))
+                pending.append((file_path, future, executor))
+            if not pending:
+                return
+            file_path, future, used_executor = pending.popleft()
+            docs = self._unwrap(file_path, future)
+            if used_executor is executor and isinstance(
+                future.exception(), BrokenProcessPool
+            ):
+                # Worker chết (OOM, segfault...) -> bỏ pool hỏng, tạo lại cho các file sau
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                executor = self._get_executor()
+            yield file_path, docs
+
+    def iter_parse_files(
+        self, list_file: List[Path]
+    ) -> Iterator[Tuple[Path, List[Document]]]:
+        """
+        Parse lần lượt từng file, yield (file_path, docs) theo thứ tự đầu vào.
+        File lỗi -> list rỗng (lỗi của file nào chỉ ảnh hưởng file đó).
+        """
+        files = list(list_file)
+        if self.workers > 1 and len(files) > 1:
+            yield from self._iter_parallel(files)
+            return
+        for file_path in files:
             try:
                 print(f"Parsing file: {file_path}")
-                result_list.extend(self.convert_file(file_path))
+                docs = self.convert_file(file_path)
             except Exception as e:
                 print(f"Lỗi khi parse file {file_path.name}: {e}")
-        return result_list
+                docs = []
+            yield file_path, docs
+
+    def parse_files(self, list_file: List[Path]) -> List[List[Document]]:
+        """Parse danh sách file, trả về kết quả nhóm theo từng file (cùng thứ tự đầu vào)."""
+        return [docs for _, docs in self.iter_parse_files(list_file)]
+
+    def parse_folder(self, folder_path: Path) -> List[Document]:
+        files = [p for p in folder_path.iterdir() if p.is_file()]
+        return [doc for docs in self.parse_files(files) for doc in docs]
 
     def parse_list_file(self, list_file: List[Path]) -> List[Document]:
-        result_list: List[Document] = []
-        for file_path in list_file:
-            try:
-                print(f"Parsing file: {file_path}")
-                result_list.extend(self.convert_file(file_path))
-            except Exception as e:
-                print(f"Lỗi khi parse file {file_path.name}: {e}")
-        return result_list
+        return [doc for docs in self.parse_files(list_file) for doc in docs]
 
 
 # ----------------- Test nhanh -----------------
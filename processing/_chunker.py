@@ -1,17 +1,130 @@
-from typing import List, Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Any, Tuple
 from haystack import Document
 from haystack.components.preprocessors import DocumentSplitter
+from utils.text import sentence_spans, word_spans
+from utils.tokens import TokenCounter
+from processing.embedding_backends import get_embedding_backend
+import config
+
+
+class TokenChunker:
+    """
+    Chia text theo ngân sách token của model embedding (thay cho đếm từ + NLTK):
+    - Tách câu bằng regex đã compile (utils.text.sentence_spans), đếm token cả lô bằng
+      tokenizer của backend embedding (tiktoken, hoặc tokenizer HF của model local).
+    - Gom câu liên tiếp đến tối đa max_tokens; chunk sau lặp lại các câu cuối của chunk trước
+      (tối đa overlap_tokens). Câu dài hơn max_tokens được tách theo từ.
+    - Nội dung chunk là đoạn cắt từ text gốc (giữ nguyên xuống dòng).
+    - Nhiều document được chunk song song trên workers thread.
+    API giống DocumentSplitter: warm_up(), run(documents) -> {"documents": [...]}.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 512,
+        overlap_tokens: int = 64,
+        model: str = config.EMBEDDING_MODEL,
+        workers: int = 4,
+        tokens: Optional[Any] = None,
+    ):
+        self.max_tokens = max(1, int(max_tokens))
+        self.overlap_tokens = max(0, min(int(overlap_tokens), self.max_tokens // 2))
+        self.workers = max(1, int(workers))
+        # tokens: bộ đếm token của backend embedding (mặc định tiktoken theo model)
+        self.tokens = tokens if tokens is not None else TokenCounter(model)
+
+    def warm_up(self) -> None:
+        pass
+
+    def _units(self, text: str) -> List[Tuple[int, int, int]]:
+        """Các đơn vị (start, end, số token) để gom chunk: câu, hoặc từ nếu câu quá dài."""
+        spans = sentence_spans(text)
+        counts = self.tokens.count_many([text[a:b] for a, b in spans])
+        units: List[Tuple[int, int, int]] = []
+        for (a, b), n in zip(spans, counts):
+            if n <= self.max_tokens:
+                units.append((a, b, n))
+                continue
+            words = word_spans(text, a, b)
+            word_counts = self.tokens.count_many([text[x:y] for x, y in words])
+            for (x, y), m in zip(words, word_counts):
+                if m <= self.max_tokens:
+                    units.append((x, y, m))
+                    continue
+                # 1 "từ" quá dài (chuỗi base64, URL...) -> cắt theo token, đúng ranh giới ký tự
+                pos = x
+                for piece in self.tokens.split(text[x:y], self.max_tokens):
+                    units.append((pos, pos + len(piece), self.tokens.count(piece)))
+                    pos += len(piece)
+        return units
+
+    def split_text(self, text: str) -> List[Tuple[str, int]]:
+        """Chia text thành các (chunk, số token)."""
+        units = self._units(text)
+        chunks: List[Tuple[str, int]] = []
+        i = 0
+        while i < len(units):
+            j, total = i, 0
+            while j < len(units) and (j == i or total + units[j][2] <= self.max_tokens):
+                total += units[j][2]
+                j += 1
+            content = text[units[i][0] : units[j - 1][1]]
+            n_tokens = self.tokens.count(content)
+            # Tổng token từng câu chỉ xấp xỉ token của cả đoạn -> kiểm tra lại
+            while n_tokens > self.max_tokens and j - i > 1:
+                j -= 1
+                content = text[units[i][0] : units[j - 1][1]]
+                n_tokens = self.tokens.count(content)
+            chunks.append((content, n_tokens))
+            if j >= len(units):
+                break
+            # Overlap: lùi lại các câu cuối, nhưng luôn tiến ít nhất 1 đơn vị
+            k, overlap = j, 0
+            while k - 1 > i and overlap + units[k - 1][2] <= self.overlap_tokens:
+                k -= 1
+                overlap += units[k][2]
+            i = k
+        return chunks
+
+    def _chunk_document(self, doc: Document) -> List[Document]:
+        if not doc.content:
+            return []
+        result = []
+        for split_id, (content, n_tokens) in enumerate(self.split_text(doc.content)):
+            meta = doc.meta.copy()
+            meta.update(source_id=doc.id, split_id=split_id, token_count=n_tokens)
+            result.append(Document(content=content, meta=meta))
+        return result
+
+    def run(self, documents: List[Document]) -> Dict[str, List[Document]]:
+        if self.workers > 1 and len(documents) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                parts = list(executor.map(self._chunk_document, documents))
+        else:
+            parts = [self._chunk_document(doc) for doc in documents]
+        return {"documents": [chunk for part in parts for chunk in part]}
 
 
 class DocumentChunkerWrapper:
-    def __init__(self, chunker: Optional[DocumentSplitter] = None):
+    def __init__(self, chunker: Optional[Any] = None):
         if chunker is None:
-            self.chunker = DocumentSplitter(
-                split_by="word",
-                split_length=350,
-                split_overlap=45,
-                respect_sentence_boundary=True,
-            )
+            if config.CHUNKER == "token":
+                # Đếm token bằng tokenizer của backend đang dùng, chunk không vượt giới hạn model
+                backend = get_embedding_backend()
+                self.chunker = TokenChunker(
+                    max_tokens=min(config.CHUNK_MAX_TOKENS, backend.max_input_tokens),
+                    overlap_tokens=config.CHUNK_OVERLAP_TOKENS,
+                    workers=config.CHUNK_WORKERS,
+                    tokens=backend.token_counter(),
+                )
+            else:
+                self.chunker = DocumentSplitter(
+                    split_by="word",
+                    split_length=350,
+                    split_overlap=45,
+                    respect_sentence_boundary=True,
+                )
             self.chunker.warm_up()
         else:
             self.chunker = chunker
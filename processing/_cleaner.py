@@ -1,43 +1,69 @@
-from typing import List, Optional, Dict, Any
+from dataclasses import replace
+from typing import List, Optional
 from haystack import Document
-from haystack.components.preprocessors import DocumentCleaner
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Giống DocumentCleaner(remove_extra_whitespaces=True, remove_empty_lines=True) của Haystack
+_EXTRA_WHITESPACE = re.compile(r"\s\s+")
+
+
+def clean_text(text: str) -> str:
+    """
+    Gom khoảng trắng thừa (>= 2 ký tự trắng -> 1 dấu cách) rồi bỏ dòng trống, theo từng trang (\\f).
+    Text đã sạch (đa số, vì parser đã normalize) được trả về nguyên object, không tạo chuỗi mới.
+    """
+    if "\f" in text:
+        return "\f".join(clean_text(page) for page in text.split("\f"))
+    text = _EXTRA_WHITESPACE.sub(" ", text).strip()
+    if "\n" in text:
+        text = "\n".join(line for line in text.split("\n") if line.strip())
+    return text
 
 
 class DocumentCleanerWrapper:
     """
-    Wrapper cho DocumentCleaner của Haystack.
-    Giữ nguyên bảng (category='table'), chỉ làm sạch các loại tài liệu khác.
+    Làm sạch + kiểm tra documents trong 1 lượt; chỉ tạo Document mới (dataclasses.replace, giữ id)
+    cho document có nội dung thay đổi, còn lại trả về nguyên object:
+    - Bỏ object không phải Document và document rỗng (kể cả rỗng sau khi làm sạch).
+    - Bảng (category='table') giữ nguyên nội dung, các loại khác được làm sạch khoảng trắng.
+    - Giữ nguyên id và thứ tự documents.
     """
 
-    def __init__(self, cleaner: Optional[DocumentCleaner] = None):
-        if cleaner is None:
-            self.cleaner = DocumentCleaner(
-                remove_empty_lines=True,
-                remove_extra_whitespaces=True,
-                remove_repeated_substrings=False,
-                keep_id=True,
-            )
-        else:
-            self.cleaner = cleaner
-
-    def run(self, documents: List[Document]) -> List[Document]:  # <-- SỬA LẠI SIGNATURE
+    def __init__(self, cleaner: Optional[object] = None):
+        # Tham số cleaner giữ để tương thích: truyền component Haystack thì dùng lại nó
+        self.cleaner = cleaner
+
+    def run(self, documents: List[Document]) -> List[Document]:
         """Làm sạch văn bản, giữ nguyên bảng, bảo toàn thứ tự tài liệu."""
+        if self.cleaner is not None:
+            return self._run_component(documents)
         cleaned_docs = []
-        other_docs = []
-        table_positions = {}
-        for i, d in enumerate(documents):
-            if d.meta.get("category") == "table":
-                table_positions[i] = d
-            else:
-                other_docs.append(d)
-        cleaned_result = self.cleaner.run(documents=other_docs)
-        cleaned_iter = iter(cleaned_result["documents"])
-        for i in range(len(documents)):
-            if i in table_positions:
-                cleaned_docs.append(table_positions[i])
-            else:
-                try:
-                    cleaned_docs.append(next(cleaned_iter))
-                except StopIteration:
-                    pass
+        for doc in documents:
+            if not isinstance(doc, Document):
+                logger.warning(f"Skipping non-Document object: {type(doc)}")
+                continue
+            content = doc.content
+            if not content:
+                continue
+            if doc.meta.get("category") != "table":
+                cleaned = clean_text(content)
+                if not cleaned:
+                    continue
+                if cleaned is not content:
+                    doc = replace(doc, content=cleaned)
+            elif not content.strip():
+                continue
+            cleaned_docs.append(doc)
         return cleaned_docs
+
+    def _run_component(self, documents: List[Document]) -> List[Document]:
+        """Chạy cleaner Haystack tùy chỉnh cho các document không phải bảng."""
+        other_docs = [d for d in documents if d.meta.get("category") != "table"]
+        cleaned_iter = iter(self.cleaner.run(documents=other_docs)["documents"])
+        return [
+            d if d.meta.get("category") == "table" else next(cleaned_iter)
+            for d in documents
+        ]
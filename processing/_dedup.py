@@ -0,0 +1,232 @@
+from collections import Counter, defaultdict
+from dataclasses import replace
+from typing import Dict, List, Optional, Set, Tuple
+import logging
+import zlib
+
+import numpy as np
+from haystack import Document
+
+logger = logging.getLogger(__name__)
+
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_PRIME = np.uint64(4294967311)  # số nguyên tố nhỏ nhất > 2^32
+
+
+class NearDuplicateFilter:
+    """
+    Khử chunk gần trùng trước khi embed (MinHash + LSH), chạy trên danh sách chunks của 1 lần gọi:
+    - Trùng y hệt nội dung (sau khi gom khoảng trắng): bỏ ngay, không cần MinHash.
+    - Gần trùng: Jaccard ước lượng trên shingle shingle_words từ >= threshold; LSH chia chữ ký
+      num_perm thành bands dải để chỉ so các cặp ứng viên. Chỉ so chunk cùng category.
+    - Ảnh (category="image") có nội dung (văn cảnh) nằm trọn trong 1 chunk text cùng file:
+      bỏ document ảnh, đường dẫn ảnh được thêm vào meta["images"] của chunk text đó.
+    - Chunk giữ lại có meta["duplicates"] = [{document_id, source, trace}] của các chunk bị gộp.
+      Document đầu vào không bị sửa: chunk có thêm duplicates/images là bản copy (replace).
+    - cross_file=False: chỉ gộp trong cùng file (document_id); True: gộp cả giữa các file
+      (xóa/cập nhật file gốc của chunk giữ lại sẽ làm mất nội dung của file kia).
+    - stats: số chunk bỏ, token và dung lượng index tiết kiệm được (cộng dồn, reset_stats()).
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        num_perm: int = 128,
+        bands: int = 16,
+        shingle_words: int = 5,
+        cross_file: bool = False,
+        embedding_dim: int = 1536,
+        seed: int = 1,
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm phải chia hết cho bands")
+        self.threshold = float(threshold)
+        self.num_perm = int(num_perm)
+        self.bands = int(bands)
+        self.rows = self.num_perm // self.bands
+        self.shingle_words = max(1, int(shingle_words))
+        self.cross_file = cross_file
+        self.embedding_dim = int(embedding_dim)
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2**32, size=self.num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2**32, size=self.num_perm, dtype=np.uint64)
+        self.stats: Counter = Counter()
+
+    # ---- MinHash ----
+    def _signature(self, words: List[str]) -> np.ndarray:
+        k = self.shingle_words
+        if len(words) <= k:
+            shingles = {" ".join(words)}
+        else:
+            shingles = {" ".join(words[i : i + k]) for i in range(len(words) - k + 1)}
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        # (a*x + b) mod p cho mọi hoán vị cùng lúc: ma trận (num_perm, số shingle)
+        perm = (np.outer(self._a, hashes) + self._b[:, None]) % _PRIME & _MAX_HASH
+        return perm.min(axis=1)
+
+    def _bands(self, signature: np.ndarray) -> List[bytes]:
+        r = self.rows
+        return [
+            bytes([i]) + signature[i * r : (i + 1) * r].tobytes()
+            for i in range(self.bands)
+        ]
+
+    # ---- helpers ----
+    def _scope(self, doc: Document) -> Tuple[str, Optional[str]]:
+        file_key = None if self.cross_file else doc.meta.get("document_id")
+        return doc.meta.get("category") or "text", file_key
+
+    @staticmethod
+    def _added(added: Dict[int, Dict[str, List]], doc: Document) -> Dict[str, List]:
+        return added.setdefault(id(doc), {"duplicates": [], "images": []})
+
+    @classmethod
+    def _images_of(cls, doc: Document, added: Dict[int, Dict[str, List]]) -> List:
+        """Ảnh của doc: meta.filepath + meta["images"] + ảnh đã gộp vào doc trong lần chạy này."""
+        paths = list(doc.meta.get("images", []))
+        if doc.meta.get("filepath"):
+            paths.insert(0, doc.meta["filepath"])
+        if id(doc) in added:
+            paths.extend(added[id(doc)]["images"])
+        return paths
+
+    @classmethod
+    def _merge(
+        cls,
+        survivor: Document,
+        duplicate: Document,
+        added: Dict[int, Dict[str, List]],
+    ) -> None:
+        extra = cls._added(added, survivor)
+        extra["duplicates"].append(
+            {
+                "document_id": duplicate.meta.get("document_id"),
+                "source": duplicate.meta.get("source"),
+                "trace": duplicate.meta.get("trace"),
+            }
+        )
+        extra["images"].extend(cls._images_of(duplicate, added))
+
+    @staticmethod
+    def _with_added(doc: Document, extra: Optional[Dict[str, List]]) -> Document:
+        if not extra or not any(extra.values()):
+            return doc
+        meta = dict(doc.meta)
+        for key, values in extra.items():
+            if values:
+                meta[key] = [*doc.meta.get(key, []), *values]
+        return replace(doc, meta=meta)
+
+    def _count_removed(self, doc: Document, kind: str) -> None:
+        self.stats[kind] += 1
+        content = doc.content or ""
+        self.stats["tokens_saved"] += (
+            doc.meta.get("token_count") or len(content) // 3 + 1
+        )
+        # vector float32 + payload (content + meta) ước lượng
+        self.stats["bytes_saved"] += (
+            self.embedding_dim * 4 + len(content.encode("utf-8")) + 256
+        )
+
+    # ---- public API ----
+    def run(self, documents: List[Document]) -> List[Document]:
+        """Trả về danh sách chunk đã khử trùng (giữ thứ tự, không sửa documents đầu vào)."""
+        self.stats["chunks"] += len(documents)
+        kept: List[Document] = []
+        # id(chunk giữ lại) -> duplicates/images gộp thêm, áp vào bản copy ở cuối
+        added: Dict[int, Dict[str, List]] = {}
+        exact: Dict[tuple, Document] = {}
+        buckets: Dict[tuple, List[Tuple[Document, np.ndarray]]] = defaultdict(list)
+        images: List[Tuple[Document, str]] = []
+
+        for doc in documents:
+            words = (doc.content or "").split()
+            if not words:
+                kept.append(doc)
+                continue
+            scope = self._scope(doc)
+            normalized = " ".join(words)
+            survivor = exact.get((scope, normalized))
+            if survivor is not None:
+                self._merge(survivor, doc, added)
+                self._count_removed(doc, "exact_duplicates")
+                continue
+            if scope[0] == "image":
+                exact[(scope, normalized)] = doc
+                images.append((doc, normalized))
+                kept.append(doc)
+                continue
+            signature = self._signature(words)
+            keys = [(scope, band) for band in self._bands(signature)]
+            survivor = None
+            for key in keys:
+                for candidate, candidate_sig in buckets.get(key, ()):
+                    if np.mean(candidate_sig == signature) >= self.threshold:
+                        survivor = candidate
+                        break
+                if survivor is not None:
+                    break
+            if survivor is not None:
+                self._merge(survivor, doc, added)
+                self._count_removed(doc, "near_duplicates")
+                continue
+            exact[(scope, normalized)] = doc
+            for key in keys:
+                buckets[key].append((doc, signature))
+            kept.append(doc)
+
+        if images:
+            merged = self._merge_images(images, kept, added)
+            kept = [doc for doc in kept if id(doc) not in merged]
+        return [self._with_added(doc, added.get(id(doc))) for doc in kept]
+
+    def _merge_images(
+        self,
+        images: List[Tuple[Document, str]],
+        kept: List[Document],
+        added: Dict[int, Dict[str, List]],
+    ) -> Set[int]:
+        """Gộp ảnh có văn cảnh nằm trong chunk text cùng file; trả về id() các ảnh đã gộp."""
+        texts_by_file: Dict[Optional[str], List[Tuple[Document, str]]] = defaultdict(
+            list
+        )
+        for doc in kept:
+            if doc.meta.get("category") == "text" and doc.content:
+                texts_by_file[doc.meta.get("document_id")].append(
+                    (doc, " ".join(doc.content.split()))
+                )
+        merged: Set[int] = set()
+        for image, context in images:
+            target = next(
+                (
+                    doc
+                    for doc, text in texts_by_file.get(
+                        image.meta.get("document_id"), ()
+                    )
+                    if context in text
+                ),
+                None,
+            )
+            if target is None or not image.meta.get("filepath"):
+                continue
+            self._added(added, target)["images"].extend(self._images_of(image, added))
+            merged.add(id(image))
+            self._count_removed(image, "images_merged")
+        return merged
+
+    def reset_stats(self) -> None:
+        self.stats.clear()
+
+    def summary(self) -> str:
+        s = self.stats
+        removed = s["exact_duplicates"] + s["near_duplicates"] + s["images_merged"]
+        return (
+            f"bỏ {removed}/{s['chunks']} chunks (trùng {s['exact_duplicates']}, "
+            f"gần trùng {s['near_duplicates']}, ảnh gộp {s['images_merged']}), "
+            f"tiết kiệm ~{s['tokens_saved']} tokens embedding, "
+            f"~{s['bytes_saved'] / 1e6:.1f} MB index"
+        )
@@ -1,7 +1,7 @@
-from haystack.components.embedders import OpenAIDocumentEmbedder, OpenAITextEmbedder
+from dataclasses import replace
 from haystack import Document
 from dotenv import load_dotenv
-import config
+from processing.embedding_backends import get_embedding_backend
 import logging
 
 load_dotenv()
@@ -9,66 +9,36 @@ logger = logging.getLogger(__name__)
 
 
 def _validate_documents(documents):
-    """Validate documents before embedding to prevent API errors"""
+    """Validate documents before embedding to prevent API errors (copies only changed documents)"""
     valid_docs = []
     for doc in documents:
         if not isinstance(doc, Document):
             logger.warning(f"Skipping non-Document object: {type(doc)}")
             continue
-        if not doc.content or not str(doc.content).strip():
+        content = doc.content
+        if not isinstance(content, str):
+            content = "" if content is None else str(content)
+        content_str = content.strip()
+        if not content_str:
             logger.warning(
                 f"Skipping document with empty content: {doc.meta.get('filename', 'unknown')}"
             )
             continue
-        # Đảm bảo content là string hợp lệ
-        try:
-            content_str = str(doc.content).strip()
-            if len(content_str) > 0:
-                # Tạo document sạch với content đã được xác thực
-                clean_doc = Document(content=content_str, meta=doc.meta)
-                valid_docs.append(clean_doc)
-            else:
-                logger.warning(
-                    f"Skipping document with empty content after cleaning: {doc.meta.get('filename', 'unknown')}"
-                )
-        except Exception as e:
-            logger.error(
-                f"Error processing document {doc.meta.get('filename', 'unknown')}: {e}"
-            )
-            continue
+        if content_str is not doc.content:
+            # Chỉ tạo Document mới khi cần; giữ id (id chunk ổn định gán lúc chunk, dùng để diff khi update)
+            doc = replace(doc, content=content_str)
+        valid_docs.append(doc)
     logger.info(f"Validated {len(valid_docs)}/{len(documents)} documents for embedding")
     return valid_docs
 
 
-def get_document_embedder(batch_size: int = 10):
-    """Lấy component để tạo embedding cho Haystack Document với batch size tùy chỉnh."""
-    embedder = OpenAIDocumentEmbedder(
-        model=config.EMBEDDING_MODEL,
-        batch_size=batch_size,
-        progress_bar=False,  # Tắt để tránh spam logs
-        max_retries=3,
-        timeout=120,  # Tăng timeout cho files lớn
-    )
-    return embedder
-
-
-def get_text_embedder():
-    """Lấy component để tạo embedding cho câu hỏi (dạng text)."""
-    embedder = OpenAITextEmbedder(
-        model=config.EMBEDDING_MODEL,
-    )
-    return embedder
-
-
-def safe_embed_documents(documents, batch_size: int = 10):
+def safe_embed_documents(documents):
     """Safely embed documents with validation and error handling"""
     if not documents:
         logger.warning("No documents provided for embedding")
         return []
 
-    logger.info(
-        f"Starting embedding process for {len(documents)} documents with batch_size={batch_size}"
-    )
+    logger.info(f"Starting embedding process for {len(documents)} documents")
 
     # Xác thực documents trước
     valid_docs = _validate_documents(documents)
@@ -77,28 +47,29 @@ def safe_embed_documents(documents, batch_size: int = 10):
         return []
 
     try:
-        logger.info(f"Calling OpenAI embedding API for {len(valid_docs)} documents")
-        embedder = get_document_embedder(batch_size=batch_size)
-        result = embedder.run(documents=valid_docs)
-        embedded_docs = result.get("documents", [])
-        logger.info(f"Successfully embedded {len(embedded_docs)} documents")
-
-        # Log một số chi tiết về documents đã được embed
-        if embedded_docs:
-            first_doc = embedded_docs[0]
-            logger.debug(
-                f"First embedded document: {first_doc.meta.get('filename', 'unknown')} - content length: {len(first_doc.content) if first_doc.content else 0}"
-            )
-
-        return embedded_docs
+        logger.info(f"Calling embedding API for {len(valid_docs)} documents")
+        # Backend theo config (OpenAI API hoặc model local); kết quả giữ đúng
+        # thứ tự đầu vào (None = document không embed được)
+        vectors = get_embedding_backend().embed([doc.content for doc in valid_docs])
     except Exception as e:
         logger.error(f"Embedding failed with error: {e}")
         logger.error(f"Error type: {type(e).__name__}")
+        return []
 
-        # Thử với batch size nhỏ hơn làm fallback
-        if batch_size > 1:
-            logger.info(f"Retrying with batch_size=1")
-            return safe_embed_documents(valid_docs, batch_size=1)
+    embedded_docs = []
+    for doc, vector in zip(valid_docs, vectors):
+        if vector is not None:
+            embedded_docs.append(replace(doc, embedding=vector))
+    logger.info(
+        f"Successfully embedded {len(embedded_docs)}/{len(valid_docs)} documents"
+    )
 
+    # Log một số chi tiết về documents đã được embed
+    if embedded_docs:
+        first_doc = embedded_docs[0]
+        logger.debug(
+            f"First embedded document: {first_doc.meta.get('filename', 'unknown')} - content length: {len(first_doc.content) if first_doc.content else 0}"
+        )
+    else:
         logger.error("All embedding attempts failed")
-        return []
+    return embedded_docs
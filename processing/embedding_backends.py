@@ -0,0 +1,201 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Sequence
+import logging
+import os
+import threading
+
+import config
+from utils.tokens import HFTokenCounter, TokenCounter
+
+logger = logging.getLogger(__name__)
+
+# Số chiều mặc định của các model OpenAI (khi không cấu hình EMBEDDING_DIM)
+_OPENAI_DIMS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+
+
+class EmbeddingBackend(ABC):
+    """
+    Interface chung cho các backend embedding:
+    - embed(texts): vector cho documents, đúng thứ tự đầu vào (None nếu text đó lỗi).
+    - embed_query(text): vector cho câu hỏi.
+    - model/dimension: dùng cho key embedding cache và cấu hình collection Qdrant.
+    - token_counter()/max_input_tokens: tokenizer và số token tối đa mỗi text của model
+      (TokenChunker chia chunk theo đúng tokenizer của backend đang dùng).
+    """
+
+    name = "base"
+    model: str
+    dimension: int
+    max_input_tokens: int
+
+    @abstractmethod
+    def embed(self, texts: Sequence[str]) -> List[Optional[List[float]]]: ...
+
+    @abstractmethod
+    def embed_query(self, text: str) -> List[float]: ...
+
+    @abstractmethod
+    def token_counter(self): ...
+
+    def close(self) -> None:
+        pass
+
+
+class OpenAIBackend(EmbeddingBackend):
+    """Embedding qua OpenAI-compatible API (EmbeddingDispatcher: batch theo token, song song)."""
+
+    name = "openai"
+
+    def __init__(self, model: str, dimension: Optional[int] = None) -> None:
+        from processing.embedding_dispatcher import get_embedding_dispatcher
+
+        self.model = model
+        self.dispatcher = get_embedding_dispatcher()
+        self.max_input_tokens = self.dispatcher.max_input_tokens
+        if dimension:
+            # Dispatcher gửi kèm tham số dimensions (model v3)
+            self.dimension = int(dimension)
+        elif model in _OPENAI_DIMS:
+            self.dimension = _OPENAI_DIMS[model]
+        else:
+            self.dimension = len(self.embed_query("dimension"))
+
+    def embed(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        return self.dispatcher.embed(texts)
+
+    def token_counter(self) -> TokenCounter:
+        return self.dispatcher.tokens
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.dispatcher.embed([text])[0]
+        if vector is None:
+            raise RuntimeError("Embedding câu hỏi thất bại")
+        return vector
+
+    def close(self) -> None:
+        self.dispatcher.close()
+
+
+class FastEmbedBackend(EmbeddingBackend):
+    """
+    Embedding local trên CPU bằng fastembed (model ONNX đã lượng tử hóa, không gọi mạng):
+    - Documents được chia batch batch_size, chạy song song trên max_workers thread
+      (onnxruntime nhả GIL khi inference), mỗi session dùng threads thread nội bộ.
+    - Model có prefix query/passage (e5...) được fastembed tự xử lý qua
+      query_embed/passage_embed.
+    """
+
+    name = "fastembed"
+
+    def __init__(
+        self,
+        model: str,
+        batch_size: int = 64,
+        max_workers: int = 2,
+        threads: Optional[int] = None,
+        cache_dir: Optional[Path] = None,
+    ) -> None:
+        try:
+            from fastembed import TextEmbedding
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDING_BACKEND='fastembed' cần cài extra local: uv sync --extra local "
+                "(hoặc pip install fastembed)"
+            ) from e
+
+        self.model = model
+        self.batch_size = max(1, int(batch_size))
+        self.max_workers = max(1, int(max_workers))
+        if threads is None:
+            # Chia đều số core cho các thread inference
+            threads = max(1, (os.cpu_count() or 1) // self.max_workers)
+        self._model = TextEmbedding(
+            model_name=model,
+            cache_dir=str(cache_dir) if cache_dir else None,
+            threads=threads,
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="fastembed"
+        )
+        # Tokenizer Hugging Face của model (fastembed gắn vào model ONNX khi load)
+        tokenizer = getattr(getattr(self._model, "model", None), "tokenizer", None)
+        self._tokens = HFTokenCounter(tokenizer) if tokenizer is not None else None
+        truncation = (tokenizer.truncation if tokenizer is not None else None) or {}
+        # Model tự thêm token đặc biệt ([CLS], [SEP]) vào mỗi text
+        self.max_input_tokens = int(truncation.get("max_length") or 512) - 2
+        known = {m["model"]: m["dim"] for m in TextEmbedding.list_supported_models()}
+        self.dimension = known.get(model) or len(self.embed_query("dimension"))
+        logger.info(
+            f"FastEmbed backend: {model} ({self.dimension} chiều), "
+            f"{self.max_workers} worker x {threads} thread"
+        )
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        vectors = self._model.passage_embed(texts, batch_size=len(texts))
+        return [v.tolist() for v in vectors]
+
+    def embed(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        texts = list(texts)
+        futures = [
+            self._executor.submit(self._embed_batch, texts[i : i + self.batch_size])
+            for i in range(0, len(texts), self.batch_size)
+        ]
+        results: List[Optional[List[float]]] = []
+        for future, start in zip(futures, range(0, len(texts), self.batch_size)):
+            try:
+                results.extend(future.result())
+            except Exception as e:
+                n = min(self.batch_size, len(texts) - start)
+                logger.error(f"FastEmbed lỗi với batch {n} texts: {e}")
+                results.extend([None] * n)
+        return results
+
+    def embed_query(self, text: str) -> List[float]:
+        return next(iter(self._model.query_embed(text))).tolist()
+
+    def token_counter(self):
+        if self._tokens is None:
+            # Không lấy được tokenizer của model: chỉ ước lượng (tiktoken không khớp model này)
+            logger.warning(
+                "FastEmbed: không lấy được tokenizer, số token chỉ là ước lượng"
+            )
+            return TokenCounter(None)
+        return self._tokens
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+_lock = threading.Lock()
+_backend: Optional[EmbeddingBackend] = None
+
+
+def get_embedding_backend() -> EmbeddingBackend:
+    """Backend embedding dùng chung theo config.EMBEDDING_BACKEND (tạo ở lần gọi đầu tiên)."""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                if config.EMBEDDING_BACKEND == "openai":
+                    _backend = OpenAIBackend(
+                        config.EMBEDDING_MODEL, dimension=config.EMBEDDING_DIM
+                    )
+                elif config.EMBEDDING_BACKEND == "fastembed":
+                    _backend = FastEmbedBackend(
+                        config.LOCAL_EMBEDDING_MODEL,
+                        batch_size=config.LOCAL_EMBEDDING_BATCH_SIZE,
+                        max_workers=config.LOCAL_EMBEDDING_WORKERS,
+                        threads=config.LOCAL_EMBEDDING_THREADS,
+                        cache_dir=config.LOCAL_EMBEDDING_CACHE_DIR,
+                    )
+                else:
+                    raise ValueError(
+                        f"EMBEDDING_BACKEND không hợp lệ: {config.EMBEDDING_BACKEND}"
+                    )
+    return _backend
@@ -0,0 +1,303 @@
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+from array import array
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """
+    Cache embedding trên đĩa (SQLite), dùng chung giữa các lần ingest/rebuild:
+    - Key = sha256(model + dimension + nội dung) => đổi model/dimension tự động miss.
+    - Vector lưu dạng float32 (4 byte/chiều).
+    - Giới hạn dung lượng max_bytes, evict theo LRU (last_used cập nhật mỗi lần hit).
+    - hits/misses: đếm theo lần chạy (DocToEmbed log rồi reset_stats() sau mỗi lần ingest).
+    - table: mỗi tầng cache 1 bảng riêng (documents: "embeddings", câu hỏi: "query_embeddings")
+      => đếm số entry và evict LRU theo từng bảng, không tầng nào xóa nhầm/đếm nhầm của tầng kia.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        model: str,
+        dimension: int,
+        max_bytes: int = 1024**3,
+        table: str = "embeddings",
+    ) -> None:
+        if not table.isidentifier():
+            raise ValueError(f"Tên bảng không hợp lệ: {table}")
+        self.path = Path(path)
+        self.table = table
+        self.model = model
+        self.dimension = int(dimension)
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Dùng từ nhiều thread (pipeline ingest) -> 1 connection + lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_last_used ON {table}(last_used)"
+        )
+        self._conn.commit()
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()
+        self._count = int(count)
+
+    @property
+    def _entry_bytes(self) -> int:
+        # vector float32 + key hex + overhead của row (ước lượng)
+        return self.dimension * 4 + 64 + 32
+
+    def key(self, text: str) -> str:
+        seed = f"{self.model}:{self.dimension}:{text}"
+        return hashlib.sha256(seed.encode("utf-8")).hexdigest()
+
+    def get_many(self, texts: Sequence[str]) -> Dict[str, List[float]]:
+        """Trả về {text: vector} cho các text có trong cache."""
+        keys = {self.key(t): t for t in set(texts)}
+        found: Dict[str, List[float]] = {}
+        if not keys:
+            return found
+        key_list = list(keys)
+        with self._lock:
+            # SQLite giới hạn số tham số mỗi câu lệnh -> tra theo từng nhóm
+            for i in range(0, len(key_list), 500):
+                part = key_list[i : i + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM {self.table} WHERE key IN ({','.join('?' * len(part))})",
+                    part,
+                ).fetchall()
+                for k, blob in rows:
+                    vec = array("f")
+                    vec.frombytes(blob)
+                    found[keys[k]] = vec.tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    f"UPDATE {self.table} SET last_used = ? WHERE key = ?",
+                    [(now, self.key(t)) for t in found],
+                )
+                self._conn.commit()
+            hit_count = sum(1 for t in texts if t in found)
+            self.hits += hit_count
+            self.misses += len(texts) - hit_count
+        return found
+
+    def put_many(self, items: Iterable[tuple]) -> None:
+        """Lưu các cặp (text, vector)."""
+        now = time.time()
+        rows = [
+            (self.key(text), array("f", vector).tobytes(), now)
+            for text, vector in items
+            if vector is not None and len(vector) == self.dimension
+        ]
+        if not rows:
+            return
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                f"INSERT OR IGNORE INTO {self.table} (key, vector, last_used) VALUES (?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+            self._count += self._conn.total_changes - before
+            self._evict()
+
+    def _evict(self) -> None:
+        max_entries = self.max_bytes // self._entry_bytes
+        if self._count <= max_entries:
+            return
+        # Xóa bớt đến 90% giới hạn để không phải evict ở mỗi lần ghi
+        n_delete = self._count - int(max_entries * 0.9)
+        self._conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f"SELECT key FROM {self.table} ORDER BY last_used ASC LIMIT ?)",
+            (n_delete,),
+        )
+        self._conn.commit()
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        self._count = int(count)
+        logger.info(f"Embedding cache ({self.table}): evict {n_delete} vectors (LRU)")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": self._count,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def normalize_query(query: str, casefold: bool = True) -> str:
+    """
+    Key cho cache câu hỏi: NFC, gom khoảng trắng, bỏ dấu câu cuối; casefold=True thì không phân
+    biệt hoa/thường (câu hỏi chỉ khác hoa/thường dùng chung 1 vector dù model có thể cho
+    vector hơi khác, ví dụ viết tắt/tên riêng "AI" và "ai").
+    """
+    text = unicodedata.normalize("NFC", query or "")
+    if casefold:
+        text = text.casefold()
+    return " ".join(text.split()).rstrip(" ?!.…")
+
+
+class QueryEmbeddingCache:
+    """
+    Cache embedding câu hỏi trong process (LRU + TTL), tùy chọn thêm tầng đĩa dùng chung:
+    - Key = normalize_query(query, casefold) => câu hỏi lặp lại / chỉ khác khoảng trắng, dấu "?"
+      cuối (và hoa-thường nếu casefold=True) không phải gọi lại embedding.
+    - Tối đa max_entries vector trong RAM, mỗi vector sống ttl_seconds (<= 0: không hết hạn).
+    - disk: EmbeddingCache (SQLite) chia sẻ giữa các process/lần chạy; hit ở đĩa được nạp lên RAM.
+    - stats(): hits (RAM), disk_hits, misses, hit_rate.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 3600.0,
+        disk: Optional[EmbeddingCache] = None,
+        casefold: bool = True,
+    ) -> None:
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self.disk = disk
+        self.casefold = bool(casefold)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> (thời điểm lưu, vector)
+        self._entries: "OrderedDict[str, Tuple[float, List[float]]]" = OrderedDict()
+
+    def _get_memory(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, vector = entry
+            if self.ttl_seconds > 0 and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return vector
+
+    def _count(self, counter: str) -> None:
+        # get_or_embed được gọi từ nhiều request đồng thời -> "+= 1" phải nằm trong lock
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _put_memory(self, key: str, vector: List[float]) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_embed(
+        self, query: str, embed: Callable[[str], List[float]]
+    ) -> List[float]:
+        """Vector của query: RAM -> đĩa -> gọi embed(query) rồi lưu lại."""
+        key = normalize_query(query, self.casefold)
+        vector = self._get_memory(key)
+        if vector is not None:
+            self._count("hits")
+            return vector
+        if self.disk is not None:
+            vector = self.disk.get_many([key]).get(key)
+            if vector is not None:
+                self._count("disk_hits")
+                self._put_memory(key, vector)
+                return vector
+        self._count("misses")
+        vector = embed(query)
+        self._put_memory(key, vector)
+        if self.disk is not None:
+            self.disk.put_many([(key, vector)])
+        return vector
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits, disk_hits, misses = self.hits, self.disk_hits, self.misses
+            entries = len(self._entries)
+        total = hits + disk_hits + misses
+        return {
+            "hits": hits,
+            "disk_hits": disk_hits,
+            "misses": misses,
+            "hit_rate": (hits + disk_hits) / total if total else 0.0,
+            "entries": entries,
+        }
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """EmbeddingCache theo config (None nếu tắt)."""
+    if not config.EMBEDDING_CACHE_ENABLED:
+        return None
+    from processing.embedding_backends import get_embedding_backend
+
+    backend = get_embedding_backend()
+    return EmbeddingCache(
+        config.EMBEDDING_CACHE_PATH,
+        model=f"{backend.name}:{backend.model}",
+        dimension=backend.dimension,
+        max_bytes=config.EMBEDDING_CACHE_MAX_BYTES,
+    )
+
+
+def get_query_embedding_cache() -> Optional[QueryEmbeddingCache]:
+    """QueryEmbeddingCache theo config (None nếu tắt)."""
+    if not config.QUERY_EMBEDDING_CACHE_ENABLED:
+        return None
+    disk = None
+    if config.QUERY_EMBEDDING_DISK_CACHE:
+        from processing.embedding_backends import get_embedding_backend
+
+        backend = get_embedding_backend()
+        # Cùng file với cache documents nhưng bảng riêng: đếm/evict LRU và giới hạn dung lượng
+        # tách biệt (vector câu hỏi cũng có thể khác vector passage với model có prefix)
+        disk = EmbeddingCache(
+            config.EMBEDDING_CACHE_PATH,
+            model=f"{backend.name}:{backend.model}",
+            dimension=backend.dimension,
+            max_bytes=config.QUERY_EMBEDDING_DISK_MAX_BYTES,
+            table="query_embeddings",
+        )
+    return QueryEmbeddingCache(
+        max_entries=config.QUERY_EMBEDDING_CACHE_SIZE,
+        ttl_seconds=config.QUERY_EMBEDDING_CACHE_TTL,
+        disk=disk,
+        casefold=config.QUERY_EMBEDDING_CACHE_CASEFOLD,
+    )
@@ -0,0 +1,277 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Sequence, Tuple
+import logging
+import os
+import random
+import threading
+import time
+
+import config
+from utils.tokens import TokenCounter
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Token bucket giới hạn theo phút (thread-safe): nạp lại liên tục rate_per_minute/60 mỗi giây,
+    tối đa rate_per_minute. acquire(n) chờ đến khi đủ n token.
+    """
+
+    def __init__(self, rate_per_minute: float) -> None:
+        self.capacity = float(rate_per_minute)
+        self.rate = self.capacity / 60.0
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0) -> None:
+        if self.capacity <= 0:
+            return  # không giới hạn
+        # 1 request lớn hơn cả bucket vẫn phải đi được (chờ bucket đầy)
+        amount = min(float(amount), self.capacity)
+        with self._cond:
+            while True:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                self._cond.wait((amount - self._tokens) / self.rate)
+
+
+class EmbeddingDispatcher:
+    """
+    Gửi embedding song song qua OpenAI-compatible API:
+    - Batch được đóng gói theo số token thật: tối đa max_batch_inputs text và
+      max_batch_tokens token mỗi request; text dài hơn max_input_tokens bị cắt trước khi gửi.
+    - Tối đa max_in_flight batch đang chờ cùng lúc (thread pool).
+    - Giới hạn tốc độ bằng 2 token bucket: requests/phút và tokens/phút.
+    - 429/5xx/lỗi mạng: retry với backoff; có Retry-After thì chờ đúng thời gian đó
+      và tạm dừng mọi batch khác.
+    - Batch lỗi hẳn được chia đôi và thử lại từng nửa (không gửi lại cả danh sách);
+      chỉ text tự nó lỗi mới nhận None. Kết quả giữ đúng thứ tự đầu vào.
+    - base_url cấu hình được (ví dụ trỏ tới fake server để test/benchmark).
+    """
+
+    def __init__(
+        self,
+        model: str,
+        base_url: Optional[str] = None,
+        api_key: Optional[str] = None,
+        max_in_flight: int = 4,
+        requests_per_minute: float = 3000,
+        tokens_per_minute: float = 1_000_000,
+        max_retries: int = 5,
+        timeout: float = 120.0,
+        dimensions: Optional[int] = None,
+        max_batch_inputs: int = 2048,
+        max_batch_tokens: int = 240_000,
+        max_input_tokens: int = 8191,
+    ) -> None:
+        from openai import OpenAI
+
+        self.model = model
+        self.dimensions = dimensions
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.max_retries = max(0, int(max_retries))
+        self.max_batch_inputs = max(1, int(max_batch_inputs))
+        self.max_batch_tokens = max(1, int(max_batch_tokens))
+        self.max_input_tokens = max(1, int(max_input_tokens))
+        self.tokens = TokenCounter(model)
+        # Retry do dispatcher tự xử lý (để áp dụng Retry-After cho mọi batch)
+        self.client = OpenAI(
+            base_url=base_url,
+            api_key=api_key or os.getenv("OPENAI_API_KEY"),
+            max_retries=0,
+            timeout=timeout,
+        )
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_in_flight, thread_name_prefix="embed"
+        )
+        self._pause_lock = threading.Lock()
+        self._pause_until = 0.0
+
+    # ---- retry / rate limit ----
+    @staticmethod
+    def _retry_after(error) -> Optional[float]:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000.0
+            if headers.get("retry-after"):
+                return float(headers["retry-after"])
+        except (TypeError, ValueError):
+            return None
+        return None
+
+    @staticmethod
+    def _is_retryable(error) -> bool:
+        import openai
+
+        if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+            return True
+        status = getattr(error, "status_code", None)
+        return status in (408, 409, 429) or (status is not None and status >= 500)
+
+    def _pause(self, seconds: float) -> None:
+        with self._pause_lock:
+            self._pause_until = max(self._pause_until, time.monotonic() + seconds)
+
+    def _wait_pause(self) -> None:
+        while True:
+            with self._pause_lock:
+                delay = self._pause_until - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def _embed_batch(self, texts: List[str], n_tokens: int) -> List[List[float]]:
+        kwargs = {"model": self.model, "input": texts, "encoding_format": "float"}
+        if self.dimensions:
+            kwargs["dimensions"] = self.dimensions
+        attempt = 0
+        while True:
+            self._wait_pause()
+            self.request_bucket.acquire(1)
+            self.token_bucket.acquire(n_tokens)
+            try:
+                response = self.client.embeddings.create(**kwargs)
+                data = sorted(response.data, key=lambda d: d.index)
+                if len(data) != len(texts):
+                    raise ValueError(
+                        f"API trả về {len(data)} vectors cho {len(texts)} texts"
+                    )
+                return [d.embedding for d in data]
+            except Exception as e:
+                if attempt >= self.max_retries or not self._is_retryable(e):
+                    raise
+                retry_after = self._retry_after(e)
+                if retry_after is not None:
+                    # Server yêu cầu chờ -> dừng cả các batch khác
+                    self._pause(retry_after)
+                    delay = retry_after
+                else:
+                    delay = min(60.0, 0.5 * 2**attempt) * (1 + random.random() * 0.25)
+                    time.sleep(delay)
+                attempt += 1
+                logger.warning(
+                    f"Embedding batch ({len(texts)} texts) lỗi: {e}. "
+                    f"Thử lại lần {attempt}/{self.max_retries} sau {delay:.1f}s"
+                )
+
+    def _embed_bisect(
+        self, texts: List[str], counts: List[int]
+    ) -> List[Optional[List[float]]]:
+        """
+        Embed 1 batch. Lỗi không retry được (vd 400 vượt context, input hỏng) thì chia đôi để
+        tách text lỗi ra. Lỗi tạm thời (429/5xx/mạng) đã hết retry thì cả batch thất bại
+        (None), không chia đôi — chia đôi lúc API đang sự cố chỉ nhân số request và thời gian chờ.
+        """
+        try:
+            return self._embed_batch(texts, sum(counts))
+        except Exception as e:
+            if self._is_retryable(e):
+                logger.error(
+                    f"Embedding batch ({len(texts)} texts) thất bại sau "
+                    f"{self.max_retries} lần thử lại: {e}"
+                )
+                return [None] * len(texts)
+            if len(texts) == 1:
+                logger.error(f"Embedding thất bại cho 1 text ({counts[0]} tokens): {e}")
+                return [None]
+            logger.warning(
+                f"Embedding batch ({len(texts)} texts) thất bại: {e}. Chia đôi để thử lại"
+            )
+            mid = len(texts) // 2
+            return self._embed_bisect(texts[:mid], counts[:mid]) + self._embed_bisect(
+                texts[mid:], counts[mid:]
+            )
+
+    def _prepare(self, texts: Sequence[str]) -> Tuple[List[str], List[int]]:
+        """Đếm token, cắt text vượt max_input_tokens."""
+        prepared: List[str] = []
+        counts: List[int] = []
+        for text in texts:
+            n = self.tokens.count(text)
+            if n > self.max_input_tokens:
+                logger.warning(
+                    f"Text {n} tokens vượt giới hạn {self.max_input_tokens}, bị cắt bớt"
+                )
+                text = self.tokens.truncate(text, self.max_input_tokens)
+                n = min(self.tokens.count(text), self.max_input_tokens)
+            prepared.append(text)
+            counts.append(n)
+        return prepared, counts
+
+    def _pack(self, counts: List[int]) -> List[Tuple[int, int]]:
+        """Chia [0, len) thành các khoảng liên tiếp, mỗi khoảng vừa 1 request."""
+        batches: List[Tuple[int, int]] = []
+        start, batch_tokens = 0, 0
+        for i, n in enumerate(counts):
+            if i > start and (
+                i - start >= self.max_batch_inputs
+                or batch_tokens + n > self.max_batch_tokens
+            ):
+                batches.append((start, i))
+                start, batch_tokens = i, 0
+            batch_tokens += n
+        if start < len(counts):
+            batches.append((start, len(counts)))
+        return batches
+
+    # ---- public API ----
+    def embed(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Embed danh sách text, trả về vector theo đúng thứ tự (None nếu text đó lỗi)."""
+        prepared, counts = self._prepare(texts)
+        batches = self._pack(counts)
+        logger.info(
+            f"Embedding {len(prepared)} texts ({sum(counts)} tokens) "
+            f"trong {len(batches)} requests"
+        )
+        futures = [
+            self._executor.submit(self._embed_bisect, prepared[a:b], counts[a:b])
+            for a, b in batches
+        ]
+        results: List[Optional[List[float]]] = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+_lock = threading.Lock()
+_dispatcher: Optional[EmbeddingDispatcher] = None
+
+
+def get_embedding_dispatcher() -> EmbeddingDispatcher:
+    """EmbeddingDispatcher dùng chung theo config (tạo ở lần gọi đầu tiên)."""
+    global _dispatcher
+    if _dispatcher is None:
+        with _lock:
+            if _dispatcher is None:
+                _dispatcher = EmbeddingDispatcher(
+                    model=config.EMBEDDING_MODEL,
+                    base_url=config.EMBEDDING_BASE_URL,
+                    max_in_flight=config.EMBEDDING_MAX_IN_FLIGHT,
+                    requests_per_minute=config.EMBEDDING_RPM,
+                    tokens_per_minute=config.EMBEDDING_TPM,
+                    max_retries=config.EMBEDDING_MAX_RETRIES,
+                    timeout=config.EMBEDDING_TIMEOUT,
+                    dimensions=config.EMBEDDING_DIM,
+                    max_batch_inputs=config.EMBEDDING_MAX_BATCH_INPUTS,
+                    max_batch_tokens=config.EMBEDDING_MAX_BATCH_TOKENS,
+                    max_input_tokens=config.EMBEDDING_MAX_INPUT_TOKENS,
+                )
+    return _dispatcher
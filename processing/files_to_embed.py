@@ -6,10 +6,17 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from processing._chunker import DocumentChunkerWrapper
 from processing._cleaner import DocumentCleanerWrapper
+from processing._dedup import NearDuplicateFilter
+from processing.embedding_backends import get_embedding_backend
 from processing.embedder import safe_embed_documents
+from processing.embedding_cache import get_embedding_cache
+from processing.ingest_pipeline import StreamingIngestPipeline
 from parsers.router_parser import RouterParser
+from parsers._conversion_cache import ConversionCache
+from dataclasses import replace
 from haystack import Document
-from typing import List, Dict
+from typing import List, Dict, Callable, Optional
+from utils.hashing import chunk_id
 from utils.logger import setup_colored_logger
 import logging
 import config as cf
@@ -20,99 +27,149 @@ logger = logging.getLogger(__name__)
 
 class DocToEmbed:
     def __init__(self):
-        self.parser = RouterParser(images_root=cf.IMAGES_PATH)
+        self.parser = RouterParser(
+            images_root=cf.IMAGES_PATH,
+            workers=cf.PARSER_WORKERS,
+            worker_threads=cf.PARSER_WORKER_THREADS,
+            pdf_shard_pages=cf.PDF_SHARD_PAGES,
+            pdf_shard_min_pages=cf.PDF_SHARD_MIN_PAGES,
+            pdf_shard_workers=cf.PDF_SHARD_WORKERS,
+            pdf_text_fast_path=cf.PDF_TEXT_FAST_PATH,
+            extract_images=cf.IMAGE_EXTRACTION,
+            image_format=cf.IMAGE_FORMAT,
+            image_scale=cf.IMAGE_SCALE,
+            image_quality=cf.IMAGE_QUALITY,
+            image_writer_workers=cf.IMAGE_WRITER_WORKERS,
+            conversion_cache=(
+                ConversionCache(cf.CONVERSION_CACHE_PATH, cf.CONVERSION_CACHE_MAX_BYTES)
+                if cf.CONVERSION_CACHE_ENABLED
+                else None
+            ),
+        )
         self.cleaner = DocumentCleanerWrapper()
         self.chunker = DocumentChunkerWrapper()
-        # Lưu ý: embedder sẽ được tạo động với kích thước batch thích ứng
-
-    def _get_adaptive_batch_size(self, documents: List[Document]) -> int:
-        """Tự động chọn kích thước batch dựa trên số lượng và kích thước documents"""
-        total_docs = len(documents)
-        if total_docs == 0:
-            return 1
-
-        avg_content_length = (
-            sum(len(doc.content or "") for doc in documents) / total_docs
-        )
-        if total_docs <= 5:
-            return total_docs
-        elif avg_content_length < 500:
-            return min(15, total_docs)
-        elif avg_content_length < 2000:
-            return min(8, total_docs)
-        else:
-            return min(5, total_docs)
-
-    def _try_embed_with_fallback(
-        self, documents: List[Document], initial_batch_size: int
-    ) -> List[Document]:
-        """Thử embedding với các batch nhỏ dần nếu thất bại"""
-        strategies = [
-            ("optimal", initial_batch_size),
-            ("conservative", max(1, initial_batch_size // 2)),
-            ("very_safe", 3),
-            ("individual", 1),
-        ]
-
-        for strategy_name, batch_size in strategies:
-            try:
-                logger.info(
-                    f"Thử chiến lược {strategy_name} với batch_size={batch_size} cho {len(documents)} documents"
-                )
-                embedded_docs = safe_embed_documents(documents, batch_size)
-                if embedded_docs:
-                    logger.info(
-                        f"Chiến lược {strategy_name} thành công với {len(embedded_docs)} documents"
-                    )
-                    return embedded_docs
-                else:
-                    logger.warning(
-                        f"Chiến lược {strategy_name} không trả về documents nào"
-                    )
-                    continue
-            except Exception as e:
-                logger.warning(
-                    f"Chiến lược {strategy_name} (batch_size={batch_size}) thất bại: {e}"
-                )
-                continue
-        logger.error(
-            f"Tất cả các chiến lược embedding đều thất bại cho {len(documents)} documents"
+        self.embedding_cache = get_embedding_cache()
+        self.dedup = (
+            NearDuplicateFilter(
+                threshold=cf.DEDUP_THRESHOLD,
+                cross_file=cf.DEDUP_CROSS_FILE,
+                embedding_dim=get_embedding_backend().dimension,
+            )
+            if cf.DEDUP_ENABLED
+            else None
         )
-        return []
-
-    def _clean_to_embed(self, list_doc: List[Document]) -> List[Document]:
-        """Làm sạch, chia nhỏ và embed documents với batching thích ứng"""
-        # Lọc trước: Loại bỏ documents có nội dung trống trước khi xử lý
-        valid_docs = [
-            doc for doc in list_doc if doc.content and str(doc.content).strip()
-        ]
-        if len(valid_docs) < len(list_doc):
+
+    def _prepare_chunks(self, list_doc: List[Document]) -> List[Document]:
+        """Làm sạch + lọc nội dung trống (1 lượt, tại chỗ), chia nhỏ và khử chunk trùng (chưa embed)"""
+        # Parse không chờ ghi ảnh; chờ ở đây (stage chunk) và bỏ doc ảnh ghi lỗi
+        list_doc = self.parser.drop_failed_images(list_doc)
+        cleaned_docs = self.cleaner.run(documents=list_doc)
+        if len(cleaned_docs) < len(list_doc):
             logger.info(
-                f"Đã lọc ra {len(list_doc) - len(valid_docs)} documents có nội dung trống"
+                f"Đã lọc ra {len(list_doc) - len(cleaned_docs)} documents có nội dung trống"
             )
-        if not valid_docs:
+        if not cleaned_docs:
             logger.warning("Không có documents hợp lệ để xử lý sau khi lọc nội dung")
             return []
-        cleaned_docs = self.cleaner.run(documents=valid_docs)
-        chunked_docs = self.chunker.run(documents=cleaned_docs)
+        chunks = self.chunker.run(documents=cleaned_docs)
+        if self.dedup is not None:
+            chunks = self.dedup.run(chunks)
+        return self._assign_ids(chunks)
+
+    @staticmethod
+    def _assign_ids(chunks: List[Document]) -> List[Document]:
+        """Id chunk = hash(file nguồn, nội dung) => update file chỉ ghi lại chunk đã đổi."""
+        seen: Dict[str, int] = {}
+        result: List[Document] = []
+        for doc in chunks:
+            source = doc.meta.get("source") or ""
+            doc_id = chunk_id(source, doc.content or "")
+            occurrence = seen.get(doc_id, 0)
+            seen[doc_id] = occurrence + 1
+            result.append(
+                replace(doc, id=chunk_id(source, doc.content or "", occurrence))
+            )
+        return result
+
+    def embed_chunks(self, chunked_docs: List[Document]) -> List[Document]:
+        """Embed chunks: lấy từ embedding cache trước, chỉ gửi phần còn thiếu lên API"""
         if not chunked_docs:
             return []
-        # Batching thích ứng
-        optimal_batch_size = self._get_adaptive_batch_size(chunked_docs)
+        if self.embedding_cache is None:
+            return self._embed_uncached(chunked_docs)
+
+        cache = self.embedding_cache
+        texts = [str(doc.content or "").strip() for doc in chunked_docs]
+        vectors = cache.get_many(texts)
+        # Chỉ gửi mỗi nội dung 1 lần (header bảng lặp lại, file trùng nội dung...)
+        to_embed: Dict[str, Document] = {}
+        for doc, text in zip(chunked_docs, texts):
+            if text and text not in vectors and text not in to_embed:
+                to_embed[text] = doc
         logger.info(
-            f"Xử lý {len(chunked_docs)} chunks với kích thước batch tối ưu: {optimal_batch_size}"
+            f"Embedding cache: {len(chunked_docs) - len(to_embed)} hit, "
+            f"gửi {len(to_embed)}/{len(chunked_docs)} chunks lên API"
         )
-        embedded_docs = self._try_embed_with_fallback(chunked_docs, optimal_batch_size)
+        if to_embed:
+            embedded = self._embed_uncached(list(to_embed.values()))
+            new_vectors = {
+                str(doc.content).strip(): doc.embedding
+                for doc in embedded
+                if doc.embedding is not None
+            }
+            cache.put_many(new_vectors.items())
+            vectors.update(new_vectors)
+
+        result: List[Document] = []
+        for doc, text in zip(chunked_docs, texts):
+            vector = vectors.get(text)
+            if vector is not None:
+                result.append(replace(doc, embedding=vector))
+        return result
+
+    def _log_stats(self, tag: str) -> None:
+        if self.dedup is not None and self.dedup.stats["chunks"]:
+            logger.info(f"[{tag}] Khử trùng: {self.dedup.summary()}")
+            self.dedup.reset_stats()
+        if self.embedding_cache is None:
+            return
+        s = self.embedding_cache.stats()
+        logger.info(
+            f"[{tag}] Embedding cache: {s['hits']} hit / {s['misses']} miss "
+            f"({s['hit_rate']:.0%}), {s['entries']} vectors trong cache"
+        )
+        self.embedding_cache.reset_stats()
+
+    def _embed_uncached(self, chunked_docs: List[Document]) -> List[Document]:
+        """Gọi API embedding (dispatcher tự chia batch theo số token)"""
+        embedded_docs = safe_embed_documents(chunked_docs)
         logger.info(
             f"Đã embed thành công {len(embedded_docs)}/{len(chunked_docs)} documents"
         )
         return embedded_docs
 
-    def process_folder(self, folder_path: Path) -> Dict[str, List[Document]]:
+    def _clean_to_embed(
+        self, list_doc: List[Document], chunk_counts: Optional[Dict[str, int]] = None
+    ) -> List[Document]:
+        """
+        Làm sạch, chia nhỏ và embed documents.
+        chunk_counts: nếu truyền thì được cộng thêm {source: số chunk trước khi embed}
+        (so với số docs trả về để biết file nào bị embed lỗi 1 phần).
+        """
+        chunks = self._prepare_chunks(list_doc)
+        if chunk_counts is not None:
+            for doc in chunks:
+                source = doc.meta["source"]
+                chunk_counts[source] = chunk_counts.get(source, 0) + 1
+        return self.embed_chunks(chunks)
+
+    def process_folder(
+        self, folder_path: Path, chunk_counts: Optional[Dict[str, int]] = None
+    ) -> Dict[str, List[Document]]:
         grouped_docs: Dict[str, List[Document]] = {}
         try:
             parsed_docs = self.parser.parse_folder(folder_path=folder_path)
-            embedded_docs = self._clean_to_embed(parsed_docs)
+            embedded_docs = self._clean_to_embed(parsed_docs, chunk_counts)
             for doc in embedded_docs:
                 file_source = doc.meta["source"]
                 grouped_docs.setdefault(file_source, []).append(doc)
@@ -121,17 +178,20 @@ class DocToEmbed:
             )
         except Exception as e:
             logger.error(f"[process_folder] Lỗi khi xử lý folder {folder_path}: {e}")
+        self._log_stats("process_folder")
         return grouped_docs
 
     def process_list_file(
-        self, list_file_path: List[Path]
+        self,
+        list_file_path: List[Path],
+        chunk_counts: Optional[Dict[str, int]] = None,
     ) -> Dict[str, List[Document]]:
         grouped_docs: Dict[str, List[Document]] = {}
         total_chunks = 0
-        for file_path in list_file_path:
+        # Parse theo từng file (song song nếu parser có nhiều worker), xử lý file nào xong trước
+        for file_path, parsed_docs in self.parser.iter_parse_files(list_file_path):
             try:
-                parsed_docs = self.parser.parse_list_file(list_file=[file_path])
-                embedded_docs = self._clean_to_embed(parsed_docs)
+                embedded_docs = self._clean_to_embed(parsed_docs, chunk_counts)
                 for doc in embedded_docs:
                     file_source = doc.meta["source"]
                     grouped_docs.setdefault(file_source, []).append(doc)
@@ -144,8 +204,38 @@ class DocToEmbed:
         logger.info(
             f"[process_list_file] Hoàn tất: {len(grouped_docs)} file, {total_chunks} chunks."
         )
+        self._log_stats("process_list_file")
         return grouped_docs
 
+    def chunk_list_file(self, list_file_path: List[Path]) -> Dict[str, List[Document]]:
+        """Parse + làm sạch + chunk (chưa embed), nhóm theo file: dùng cho update theo diff chunk."""
+        grouped_docs: Dict[str, List[Document]] = {}
+        for file_path, parsed_docs in self.parser.iter_parse_files(list_file_path):
+            try:
+                for doc in self._prepare_chunks(parsed_docs):
+                    grouped_docs.setdefault(doc.meta["source"], []).append(doc)
+            except Exception as e:
+                logger.error(f"[chunk_list_file] Lỗi xử lý file {file_path}: {e}")
+        return grouped_docs
+
+    def stream_list_file(
+        self,
+        list_file_path: List[Path],
+        sink: Callable[[str, List[Document], int], None],
+    ) -> Dict[str, int]:
+        """
+        Ingest dạng pipeline: parse → clean/chunk → embed → sink(file_source, docs, số chunk)
+        chạy chồng lấn giữa các file với queue giới hạn (RAM không tăng theo số file).
+        Trả về {file_source: số chunks đã ghi}.
+        """
+        pipeline = StreamingIngestPipeline(
+            processor=self, sink=sink, queue_size=cf.INGEST_QUEUE_SIZE
+        )
+        try:
+            return pipeline.run(list_file_path)
+        finally:
+            self._log_stats("stream_list_file")
+
     # Hàm này chỉ để test parser
     def _test_parser(self, folder_path: Path):
         parsed_docs = self.parser.parse_folder(folder_path=folder_path)
@@ -0,0 +1,221 @@
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from dataclasses import dataclass, field
+import logging
+import queue
+import threading
+import time
+
+from haystack import Document
+from utils.logger import setup_colored_logger
+
+setup_colored_logger()
+logger = logging.getLogger(__name__)
+
+# Đánh dấu hết dữ liệu giữa các stage
+_DONE = object()
+
+
+def _count_sources(docs: List[Document]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for doc in docs:
+        source = doc.meta.get("source")
+        counts[source] = counts.get(source, 0) + 1
+    return counts
+
+
+@dataclass
+class StageStats:
+    """Bộ đếm throughput của 1 stage."""
+
+    name: str
+    files: int = 0
+    docs: int = 0
+    busy_seconds: float = 0.0
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: Optional[float] = None
+
+    def add(self, docs: int, seconds: float) -> None:
+        self.files += 1
+        self.docs += docs
+        self.busy_seconds += seconds
+
+    @property
+    def files_per_sec(self) -> float:
+        return self.files / self.busy_seconds if self.busy_seconds else 0.0
+
+    @property
+    def docs_per_sec(self) -> float:
+        return self.docs / self.busy_seconds if self.busy_seconds else 0.0
+
+    def summary(self) -> str:
+        wall = (self.finished_at or time.perf_counter()) - self.started_at
+        return (
+            f"{self.name:<6} files={self.files} docs={self.docs} "
+            f"busy={self.busy_seconds:.1f}s wall={wall:.1f}s "
+            f"({self.files_per_sec:.2f} file/s, {self.docs_per_sec:.1f} doc/s)"
+        )
+
+
+class StreamingIngestPipeline:
+    """
+    Pipeline ingest theo từng file: parse → clean/chunk → embed → write.
+    - Mỗi stage chạy 1 thread, nối với nhau bằng queue giới hạn queue_size
+      => parse file N+1 chồng lấn với embed file N và ghi file N-1.
+    - RAM chỉ giữ tối đa ~queue_size file ở mỗi chặng, không phụ thuộc kích thước folder.
+    - Lỗi của 1 file chỉ làm bỏ qua file đó; lỗi ở sink (ghi DB) dừng cả pipeline.
+    - sink(file_source, docs, n_chunks): n_chunks = số chunk của file trước khi embed
+      (docs ít hơn => embed lỗi 1 phần).
+    - stats: throughput của từng stage sau khi chạy.
+    """
+
+    def __init__(
+        self,
+        processor,
+        sink: Callable[[str, List[Document], int], None],
+        queue_size: int = 4,
+    ):
+        self.processor = processor
+        self.sink = sink
+        self.queue_size = max(1, int(queue_size))
+        self.stats: Dict[str, StageStats] = {}
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        # put có timeout để dừng được khi stage sau đã lỗi
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _parse_stage(self, files: List[Path], out_q: queue.Queue) -> None:
+        stats = self.stats["parse"]
+        try:
+            t0 = time.perf_counter()
+            for file_path, docs in self.processor.parser.iter_parse_files(files):
+                stats.add(len(docs), time.perf_counter() - t0)
+                if docs and not self._put(out_q, (file_path, docs, None)):
+                    return
+                t0 = time.perf_counter()
+        except BaseException as e:
+            self._fail("parse", e)
+        finally:
+            stats.finished_at = time.perf_counter()
+            self._put(out_q, _DONE)
+
+    def _map_stage(
+        self,
+        name: str,
+        fn: Callable[[List[Document]], List[Document]],
+        in_q: queue.Queue,
+        out_q: queue.Queue,
+    ) -> None:
+        stats = self.stats[name]
+        try:
+            while True:
+                item = self._get(in_q)
+                if item is _DONE:
+                    return
+                file_path, docs, _ = item
+                t0 = time.perf_counter()
+                try:
+                    result = fn(docs)
+                except Exception as e:
+                    logger.error(f"[pipeline:{name}] Lỗi xử lý file {file_path}: {e}")
+                    result = []
+                stats.add(len(result), time.perf_counter() - t0)
+                # Kèm số docs đầu vào theo source: stage ghi so với kết quả embed
+                if result and not self._put(
+                    out_q, (file_path, result, _count_sources(docs))
+                ):
+                    return
+        finally:
+            stats.finished_at = time.perf_counter()
+            self._put(out_q, _DONE)
+
+    def _write_stage(self, in_q: queue.Queue, written: Dict[str, int]) -> None:
+        stats = self.stats["write"]
+        try:
+            while True:
+                item = self._get(in_q)
+                if item is _DONE:
+                    return
+                _file_path, docs, n_chunks = item
+                grouped: Dict[str, List[Document]] = {}
+                for doc in docs:
+                    grouped.setdefault(doc.meta["source"], []).append(doc)
+                t0 = time.perf_counter()
+                for file_source, file_docs in grouped.items():
+                    self.sink(
+                        file_source,
+                        file_docs,
+                        n_chunks.get(file_source, len(file_docs)),
+                    )
+                    written[file_source] = written.get(file_source, 0) + len(file_docs)
+                stats.add(len(docs), time.perf_counter() - t0)
+        except BaseException as e:
+            self._fail("write", e)
+        finally:
+            stats.finished_at = time.perf_counter()
+
+    def _fail(self, stage: str, error: BaseException) -> None:
+        logger.error(f"[pipeline:{stage}] Dừng pipeline do lỗi: {error}")
+        if self._error is None:
+            self._error = error
+        self._stop.set()
+
+    def run(self, files: List[Path]) -> Dict[str, int]:
+        """Chạy pipeline cho danh sách file, trả về {file_source: số chunks đã ghi}."""
+        self.stats = {
+            name: StageStats(name) for name in ("parse", "chunk", "embed", "write")
+        }
+        self._stop.clear()
+        self._error = None
+        written: Dict[str, int] = {}
+        parsed_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        chunked_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        embedded_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        threads = [
+            threading.Thread(
+                target=self._parse_stage, args=(list(files), parsed_q), daemon=True
+            ),
+            threading.Thread(
+                target=self._map_stage,
+                args=("chunk", self.processor._prepare_chunks, parsed_q, chunked_q),
+                daemon=True,
+            ),
+            threading.Thread(
+                target=self._map_stage,
+                args=("embed", self.processor.embed_chunks, chunked_q, embedded_q),
+                daemon=True,
+            ),
+            threading.Thread(
+                target=self._write_stage, args=(embedded_q, written), daemon=True
+            ),
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        for stage in self.stats.values():
+            logger.info(f"[pipeline] {stage.summary()}")
+        logger.info(
+            f"[pipeline] Hoàn tất: {len(written)} file, {sum(written.values())} chunks."
+        )
+        if self._error is not None:
+            raise self._error
+        return written
@@ -1,42 +1,122 @@
 from haystack_integrations.document_stores.qdrant import QdrantDocumentStore
 from storage.qdrant_store_manager import QdrantManager
-from processing.files_to_embed import DocToEmbed
 from storage.vector_store import get_document_store
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
+import threading
+import config
 
 
 class DBService:
     def __init__(self):
         self.document_store: QdrantDocumentStore = get_document_store()
         self.dbmanager = QdrantManager(document_store=self.document_store)
-        self.processor = DocToEmbed()
+        # DocToEmbed (Docling, parsers, NLTK...) chỉ được dựng khi thật sự cần ingest
+        self._processor = None
+        self._processor_lock = threading.Lock()
+        # File đang được add/update/delete (để watcher không xử lý trùng)
+        self._busy: set = set()
+        self._busy_lock = threading.Lock()
+        # Mọi thao tác ghi DB/manifest chạy tuần tự; rebuild giữ lock suốt quá trình
+        # (store/manifest của dbmanager bị đổi tạm trong lúc rebuild blue/green)
+        self._write_lock = threading.RLock()
+        self._rebuilding = False
+
+    @property
+    def processor(self):
+        if self._processor is None:
+            with self._processor_lock:
+                if self._processor is None:
+                    from processing.files_to_embed import DocToEmbed
+
+                    self._processor = DocToEmbed()
+        return self._processor
+
+    @contextmanager
+    def _track(self, list_file_path: List[Path]):
+        keys = {str(Path(p).resolve()) for p in list_file_path}
+        with self._busy_lock:
+            self._busy.update(keys)
+        try:
+            yield
+        finally:
+            with self._busy_lock:
+                self._busy.difference_update(keys)
+
+    def is_busy(self, file_path) -> bool:
+        """File có đang được add/update/delete (hoặc đang rebuild cả database) hay không."""
+        with self._busy_lock:
+            return self._rebuilding or str(Path(file_path).resolve()) in self._busy
+
+    @contextmanager
+    def exclusive(self):
+        """
+        Giữ quyền ghi DB: dùng khi đọc manifest rồi quyết định add/update (watcher),
+        để không chen vào giữa 1 lần rebuild hay thao tác ghi khác. Chờ nếu đang rebuild.
+        """
+        with self._write_lock:
+            yield
+
+    def warm_up(self) -> None:
+        """Load trước model Docling (dùng chung cho mọi lần upload/rebuild sau)."""
+        self.processor.parser.warm_up()
 
     def add_chunks_from_folder(self, folder_path: Path) -> None:
-        embedded_docs = self.processor.process_folder(folder_path=folder_path)
-        self.dbmanager.add_chunks(embedded_docs)
+        with self._write_lock:
+            chunk_counts: Dict[str, int] = {}
+            embedded_docs = self.processor.process_folder(
+                folder_path=folder_path, chunk_counts=chunk_counts
+            )
+            self.dbmanager.add_chunks(embedded_docs, expected=chunk_counts)
 
     def add_chunks_from_list_file(self, list_file_path: List[Path]) -> None:
-        embedded_docs = self.processor.process_list_file(list_file_path=list_file_path)
-        self.dbmanager.add_chunks(embedded_docs)
+        with self._write_lock, self._track(list_file_path):
+            chunk_counts: Dict[str, int] = {}
+            embedded_docs = self.processor.process_list_file(
+                list_file_path=list_file_path, chunk_counts=chunk_counts
+            )
+            self.dbmanager.add_chunks(embedded_docs, expected=chunk_counts)
 
     def update_chunks_from_list_file(self, list_file_path: List[Path]) -> None:
-        embedded_docs = self.processor.process_list_file(list_file_path=list_file_path)
-        self.dbmanager.update_chunks(embedded_docs)
+        with self._write_lock, self._track(list_file_path):
+            # Chunk trước, chỉ embed các chunk chưa có trong DB (diff theo id chunk)
+            chunked_docs = self.processor.chunk_list_file(list_file_path=list_file_path)
+            self.dbmanager.update_chunks(
+                chunked_docs, embed=self.processor.embed_chunks
+            )
 
-    def delete_chunks_from_list_file(self, list_file_path: List[Path]) -> None:
-        for file_path in list_file_path:
-            file_path_str = str(file_path)
-            self.dbmanager.delete_file(file_path_str)
+    def delete_chunks_from_list_file(
+        self, list_file_path: List[Path]
+    ) -> Dict[str, Optional[int]]:
+        """Xóa chunks của nhiều file trong 1 lần; trả về {file_source: số chunks đã xóa}."""
+        with self._write_lock, self._track(list_file_path):
+            return self.dbmanager.delete_files(
+                [str(Path(p).resolve()) for p in list_file_path]
+            )
 
     def rebuild_database_from_folder(self, folder_path: Path):
         """
-        Xóa toàn bộ database và rebuild từ folder.
+        Rebuild database từ folder (incremental theo manifest nếu bật INCREMENTAL_REBUILD).
+        Trong lúc rebuild: is_busy() = True với mọi file (watcher hoãn lại), các thao tác
+        add/update/delete khác chờ đến khi xong.
         """
-        return self.dbmanager.rebuild_from_folder(folder_path)
+        with self._write_lock:
+            with self._busy_lock:
+                self._rebuilding = True
+            try:
+                return self.dbmanager.rebuild_from_folder(
+                    folder_path,
+                    incremental=config.INCREMENTAL_REBUILD,
+                    processor=self.processor,
+                )
+            finally:
+                with self._busy_lock:
+                    self._rebuilding = False
 
     def clear_all_database(self):
         """
         Xóa toàn bộ vectors trong database.
         """
-        return self.dbmanager.clear_all_vectors()
+        with self._write_lock:
+            return self.dbmanager.clear_all_vectors()
@@ -28,6 +28,9 @@ class RAGService:
                 context.append(doc.content.strip())
                 if doc.meta.get("category") == "image":
                     context.append(f"file_path: {doc.meta.get('filepath')}")
+                # Ảnh đã được gộp vào chunk text chứa văn cảnh của nó (khử trùng)
+                for path in doc.meta.get("images") or []:
+                    context.append(f"file_path: {path}")
         return "\n\n".join(context)
 
     def semantic_query(self, query: str, top_k: int) -> str:
@@ -0,0 +1,221 @@
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from collections import Counter
+import logging
+import os
+import queue
+import threading
+import time
+
+from utils.hashing import file_sha256
+from utils.logger import setup_colored_logger
+
+setup_colored_logger()
+logger = logging.getLogger(__name__)
+
+_UPSERT = "upsert"
+_DELETE = "delete"
+
+
+class WatcherService:
+    """
+    Theo dõi thư mục data (polling, không cần thêm thư viện) và ingest incremental:
+    - Phát hiện file tạo mới / sửa / xóa qua (mtime, size) giữa các lần quét.
+    - Debounce: file chỉ được xử lý khi không đổi trong debounce_seconds (đang copy/ghi dở thì chờ).
+    - Thay đổi được gom thành batch add/update/delete gọi vào DBService; file có hash nội dung
+      trùng manifest thì bỏ qua.
+    - Queue batch giới hạn queue_size (đầy thì thay đổi nằm chờ ở lần quét sau).
+    - Batch được xử lý tuần tự bởi 1 thread: DBService giữ quyền ghi suốt parse/embed/ghi của
+      mỗi thao tác nên nhiều thread cũng chỉ chờ nhau (song song nằm bên trong 1 batch:
+      parser workers, embedding dispatcher).
+    """
+
+    def __init__(
+        self,
+        db_service,
+        folder: Path,
+        poll_seconds: float = 2.0,
+        debounce_seconds: float = 5.0,
+        batch_size: int = 16,
+        queue_size: int = 8,
+        extensions: Iterable[str] = (".pdf", ".docx", ".md", ".txt"),
+    ):
+        self.db_service = db_service
+        self.folder = Path(folder)
+        self.poll_seconds = float(poll_seconds)
+        self.debounce_seconds = float(debounce_seconds)
+        self.batch_size = max(1, int(batch_size))
+        self.extensions = {e.lower() for e in extensions}
+        self.stats: Counter = Counter()
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        # path -> (mtime_ns, size) ở lần quét trước
+        self._snapshot: Dict[str, Tuple[int, int]] = {}
+        # path -> thời điểm thay đổi gần nhất (chưa xử lý)
+        self._pending: Dict[str, float] = {}
+        # path đang nằm trong queue hoặc đang được xử lý
+        self._in_flight: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    # ---- quét thư mục ----
+    def _accept(self, name: str) -> bool:
+        if name.startswith((".", "~$")):
+            return False  # file ẩn / file tạm của Office
+        return Path(name).suffix.lower() in self.extensions
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot: Dict[str, Tuple[int, int]] = {}
+        try:
+            entries = list(os.scandir(self.folder))
+        except FileNotFoundError:
+            return snapshot
+        for entry in entries:
+            if not self._accept(entry.name):
+                continue
+            try:
+                if not entry.is_file():
+                    continue
+                st = entry.stat()
+            except OSError:
+                continue  # file vừa bị xóa
+            snapshot[str(Path(entry.path).resolve())] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def _reconcile(self) -> None:
+        """Lúc khởi động: đưa file lệch với manifest (mới/đổi/đã xóa) vào hàng chờ."""
+        manifest = self.db_service.dbmanager.manifest
+        files = [Path(p) for p in self._snapshot]
+        new_files, changed_files, removed_sources = manifest.diff(files)
+        for path in [*new_files, *changed_files]:
+            self._pending[str(path.resolve())] = 0.0
+        for source in removed_sources:
+            self._pending[source] = 0.0
+        if self._pending:
+            logger.info(
+                f"[watcher] Lệch với manifest: {len(new_files)} mới, "
+                f"{len(changed_files)} đã đổi, {len(removed_sources)} đã xóa"
+            )
+
+    def poll_once(self, now: Optional[float] = None) -> None:
+        """Quét 1 lần, ghi nhận thay đổi và đẩy các file đã ổn định vào queue."""
+        now = time.monotonic() if now is None else now
+        current = self._scan()
+        with self._lock:
+            for path, sig in current.items():
+                if self._snapshot.get(path) != sig:
+                    self._pending[path] = now
+            for path in self._snapshot.keys() - current.keys():
+                self._pending[path] = now
+            self._snapshot = current
+        self._flush(now)
+
+    def _flush(self, now: float) -> None:
+        with self._lock:
+            settled = [
+                path
+                for path, changed_at in self._pending.items()
+                if now - changed_at >= self.debounce_seconds
+                and path not in self._in_flight
+                and not self.db_service.is_busy(path)
+            ]
+            upserts = [p for p in settled if p in self._snapshot]
+            deletes = [p for p in settled if p not in self._snapshot]
+            for op, paths in ((_DELETE, deletes), (_UPSERT, upserts)):
+                for i in range(0, len(paths), self.batch_size):
+                    batch = paths[i : i + self.batch_size]
+                    try:
+                        self._queue.put_nowait((op, batch))
+                    except queue.Full:
+                        # Backpressure: phần còn lại chờ lần quét sau
+                        return
+                    for path in batch:
+                        self._pending.pop(path, None)
+                        self._in_flight.add(path)
+
+    # ---- xử lý batch ----
+    def _apply(self, op: str, paths: List[str]) -> None:
+        # Giữ quyền ghi từ lúc đọc manifest đến khi ghi xong: không chen vào giữa 1 lần rebuild
+        with self.db_service.exclusive():
+            self._apply_locked(op, paths)
+
+    def _apply_locked(self, op: str, paths: List[str]) -> None:
+        if op == _DELETE:
+            logger.info(f"[watcher] Xóa {len(paths)} file khỏi database")
+            self.db_service.delete_chunks_from_list_file([Path(p) for p in paths])
+            self.stats["deleted"] += len(paths)
+            return
+
+        manifest = self.db_service.dbmanager.manifest
+        new_files: List[Path] = []
+        changed_files: List[Path] = []
+        for p in paths:
+            path = Path(p)
+            if not path.is_file():
+                continue  # đã bị xóa sau khi vào queue -> lần quét sau sẽ xử lý
+            entry = manifest.get(p)
+            if entry is None:
+                new_files.append(path)
+            elif entry.get("content_hash") != file_sha256(path):
+                changed_files.append(path)
+            else:
+                # Chỉ đổi mtime (touch, copy đè cùng nội dung)
+                self.stats["unchanged"] += 1
+        if new_files:
+            logger.info(f"[watcher] Thêm {len(new_files)} file mới")
+            self.db_service.add_chunks_from_list_file(new_files)
+            self.stats["added"] += len(new_files)
+        if changed_files:
+            logger.info(f"[watcher] Cập nhật {len(changed_files)} file đã đổi")
+            self.db_service.update_chunks_from_list_file(changed_files)
+            self.stats["updated"] += len(changed_files)
+
+    def _worker(self) -> None:
+        while not self._stop.is_set():
+            try:
+                op, paths = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                self._apply(op, paths)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"[watcher] Lỗi khi xử lý {op} {len(paths)} file: {e}")
+            finally:
+                with self._lock:
+                    self._in_flight.difference_update(paths)
+                self._queue.task_done()
+
+    def _poll_loop(self) -> None:
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.error(f"[watcher] Lỗi khi quét {self.folder}: {e}")
+
+    # ---- public API ----
+    def start(self, reconcile: bool = True) -> None:
+        """Chạy thread quét + 1 thread xử lý batch (daemon)."""
+        if self._threads:
+            return
+        self._stop.clear()
+        self._snapshot = self._scan()
+        if reconcile:
+            self._reconcile()
+        self._threads = [
+            threading.Thread(target=self._poll_loop, name="watcher-poll", daemon=True),
+            threading.Thread(target=self._worker, name="watcher-worker", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        logger.info(
+            f"[watcher] Đang theo dõi {self.folder} "
+            f"(poll {self.poll_seconds}s, debounce {self.debounce_seconds}s)"
+        )
+
+    def stop(self, wait: bool = True) -> None:
+        self._stop.set()
+        if wait:
+            for t in self._threads:
+                t.join()
+        self._threads = []
@@ -0,0 +1,111 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import threading
+
+from haystack import Document
+from utils.hashing import file_sha256
+from utils.logger import setup_colored_logger
+
+setup_colored_logger()
+logger = logging.getLogger(__name__)
+
+
+class FileManifest:
+    """
+    Manifest các file đã được index vào 1 collection:
+        {source: {"content_hash", "document_id", "chunks"}}
+    Dùng cho rebuild incremental: chỉ parse/embed file mới hoặc đã đổi nội dung,
+    xóa vectors của file đã bị xóa, bỏ qua file không đổi.
+    """
+
+    def __init__(self, path: Path, collection: str):
+        self.path = Path(path)
+        self.collection = collection
+        self.files: Dict[str, Dict] = {}
+        # Có thể được ghi từ nhiều thread (UI + watcher)
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Không đọc được manifest {self.path}, bỏ qua: {e}")
+            return
+        # Manifest của collection khác -> coi như rỗng
+        if data.get("collection") == self.collection:
+            self.files = data.get("files", {})
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            data = json.dumps(
+                {"collection": self.collection, "files": self.files},
+                ensure_ascii=False,
+                indent=2,
+            )
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(data, encoding="utf-8")
+            os.replace(tmp, self.path)
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def get(self, source: str) -> Optional[Dict]:
+        return self.files.get(source)
+
+    def record(self, source: str, docs: List[Document], complete: bool = True) -> None:
+        """
+        Ghi nhận file đã được index với danh sách chunks tương ứng.
+        complete=False: thiếu chunk (vd embed lỗi) -> không lưu hash, lần diff sau file được
+        coi là đã đổi và đi qua update (chỉ embed lại phần còn thiếu).
+        """
+        path = Path(source)
+        if not path.is_file():
+            return
+        document_id = docs[0].meta.get("document_id") if docs else None
+        entry = {
+            "content_hash": file_sha256(path) if complete else None,
+            "document_id": document_id,
+            "chunks": len(docs),
+        }
+        with self._lock:
+            self.files[source] = entry
+
+    def remove(self, source: str) -> None:
+        with self._lock:
+            self.files.pop(source, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.files = {}
+
+    def replace(self, files: Dict[str, Dict]) -> None:
+        """Thay toàn bộ nội dung (vd khôi phục bản chụp khi rebuild lỗi)."""
+        with self._lock:
+            self.files = dict(files)
+
+    def diff(self, files: List[Path]) -> Tuple[List[Path], List[Path], List[str]]:
+        """
+        So sánh danh sách file hiện tại với manifest.
+        Trả về (new_files, changed_files, removed_sources).
+        """
+        new_files: List[Path] = []
+        changed_files: List[Path] = []
+        current_sources = set()
+        for file_path in files:
+            source = str(file_path.resolve())
+            current_sources.add(source)
+            entry = self.files.get(source)
+            if entry is None:
+                new_files.append(file_path)
+            elif entry.get("content_hash") != file_sha256(file_path):
+                changed_files.append(file_path)
+        with self._lock:
+            removed_sources = [s for s in self.files if s not in current_sources]
+        return new_files, changed_files, removed_sources
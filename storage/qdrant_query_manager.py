@@ -5,9 +5,10 @@ from qdrant_client.http.models import Filter, FieldCondition, MatchValue
 from typing import List, Dict, Optional, Any, Union
 from storage.vector_store import get_document_store
 import logging
+import time
 from utils.logger import setup_colored_logger
-from processing.embedder import get_text_embedder
-
+from processing.embedding_backends import get_embedding_backend
+from processing.embedding_cache import get_query_embedding_cache
 
 setup_colored_logger()
 logger = logging.getLogger(__name__)
@@ -24,7 +25,20 @@ class QdrantQueryManager:
         logger.info(
             f"[QdrantQueryManager] Truy vấn collection: {self.document_store.index}"
         )
-        self.text_embedder = get_text_embedder()
+        self.embedder = get_embedding_backend()
+        self.query_cache = get_query_embedding_cache()
+
+    def embed_query(self, query: str) -> List[float]:
+        """Embedding câu hỏi, qua query cache nếu bật."""
+        if self.query_cache is None:
+            return self.embedder.embed_query(query)
+        vector = self.query_cache.get_or_embed(query, self.embedder.embed_query)
+        s = self.query_cache.stats()
+        logger.debug(
+            f"[QueryCache] {s['hits']} hit RAM / {s['disk_hits']} hit đĩa / "
+            f"{s['misses']} miss ({s['hit_rate']:.0%})"
+        )
+        return vector
 
     def get_retriever(
         self,
@@ -53,12 +67,14 @@ class QdrantQueryManager:
         """
         if not query:
             return []
-        embed_result = self.text_embedder.run(text=query)
-        embedded_query = embed_result["embedding"]
+        t0 = time.perf_counter()
+        embedded_query = self.embed_query(query)
+        embed_ms = (time.perf_counter() - t0) * 1000
         retriever = self.get_retriever(top_k=top_k, filters=filters)
         result = retriever.run(query_embedding=embedded_query)
         docs = result.get("documents", [])
         logger.info(
-            f"[SemanticSearch] Query='{query}' Filter={filters} → {len(docs)} kết quả"
+            f"[SemanticSearch] Query='{query}' Filter={filters} → {len(docs)} kết quả "
+            f"(embed {embed_ms:.0f} ms)"
         )
         return docs
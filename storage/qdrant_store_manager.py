@@ -1,32 +1,71 @@
 from haystack_integrations.document_stores.qdrant import QdrantDocumentStore
-from typing import List, Dict
+from haystack_integrations.document_stores.qdrant.converters import (
+    convert_haystack_documents_to_qdrant_points,
+)
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Iterator, List, Dict, Optional, Union
+from pathlib import Path
 from haystack import Document
-from qdrant_client.http.models import Filter, FieldCondition, MatchValue, FilterSelector
+from haystack.document_stores.types import DuplicatePolicy
+from qdrant_client.http.models import (
+    Filter,
+    FieldCondition,
+    MatchAny,
+    MatchValue,
+    FilterSelector,
+)
 from qdrant_client.http import models
 from qdrant_client import QdrantClient
 from utils.logger import setup_colored_logger
 from storage.vector_store import get_document_store
+from storage.file_manifest import FileManifest
+import itertools
 import logging
+import queue
+import re
+import threading
+import time
+import config
 
 setup_colored_logger()
 logger = logging.getLogger(__name__)
 
+# indexing_threshold mặc định của Qdrant (KB vector mỗi segment trước khi build HNSW)
+_DEFAULT_INDEXING_THRESHOLD = 10000
+
 
 class QdrantManager:
     """
-    Manager thao tác Add / Update / Delete chunks trong Qdrant
+    Manager thao tác Add / Update / Delete chunks trong Qdrant.
+    Mọi thay đổi đều được ghi vào FileManifest để rebuild incremental biết file nào đã index.
     """
 
-    def __init__(self, document_store: QdrantDocumentStore):
+    # Haystack lưu metadata của Document dưới key "meta" trong payload
+    SOURCE_KEY = "meta.source"
+
+    def __init__(
+        self,
+        document_store: QdrantDocumentStore,
+        manifest: Optional[FileManifest] = None,
+    ):
         self.store: QdrantDocumentStore = document_store or get_document_store()
+        # Tên client dùng để truy vấn: alias (rebuild blue/green) hoặc collection thật (DB cũ)
+        self.alias: str = self.store.index
+        # Manifest rỗng cũng falsy (__len__) -> so sánh với None
+        self.manifest = (
+            manifest
+            if manifest is not None
+            else FileManifest(config.MANIFEST_PATH, collection=self.store.index)
+        )
         # Khởi tạo client trực tiếp nếu store._client là None
         if hasattr(self.store, "_client") and self.store._client is not None:
             self.client: QdrantClient = self.store._client
         else:
             # Tạo client trực tiếp sử dụng cấu hình của store
-            from config import VECTOR_DB_URL
-
-            self.client = QdrantClient(url=VECTOR_DB_URL)
+            self.client = QdrantClient(url=config.VECTOR_DB_URL)
+        # Trạng thái bulk load (None = ghi bình thường qua store Haystack)
+        self._bulk: Optional[Dict[str, Any]] = None
+        self.bulk_stats: Dict[str, float] = {}
         # Test kết nối
         try:
             self.client.get_collections()
@@ -37,106 +76,459 @@ class QdrantManager:
                 "Chạy: docker run -p 6333:6333 qdrant/qdrant"
             )
 
-    def add_chunks(self, docs_dict: Dict[str, List[Document]]):
+    def _source_filter(self, file_source: str) -> Filter:
+        return Filter(
+            must=[
+                FieldCondition(key=self.SOURCE_KEY, match=MatchValue(value=file_source))
+            ]
+        )
+
+    def add_chunks(
+        self,
+        docs_dict: Dict[str, List[Document]],
+        save: bool = True,
+        expected: Optional[Dict[str, int]] = None,
+    ):
         """
         Thêm nhiều file cùng lúc, docs_dict {file_source: List[Document]}
         Chỉ được dùng cho logic reload database. Không dùng để add riêng lẻ
+        Trong bulk_load(): points được gom lại và upload song song, manifest lưu khi kết thúc.
+        save=False: không ghi file manifest (caller tự lưu, vd _ingest_files gom nhiều file).
+        expected: {file_source: số chunk trước khi embed}; file nhận ít docs hơn (embed lỗi 1 phần)
+        được ghi manifest là chưa đầy đủ để lần diff sau đi qua update và embed lại phần thiếu.
         """
+        expected = expected or {}
         for file_source, docs in docs_dict.items():
             if not docs:
                 logger.warning(f"Không có chunk nào để thêm cho file: {file_source}")
                 continue
             logger.info(f"Thêm {len(docs)} chunks cho file: {file_source}")
-            self.store.write_documents(docs)
+            if self._bulk is not None:
+                self._bulk_write(docs)
+            else:
+                # Id chunk cố định theo nội dung: ghi đè points còn sót từ lần ingest trước mà
+                # manifest chưa kịp ghi (crash giữa 2 lần lưu, bulk_load lỗi) thay vì báo trùng
+                self.store.write_documents(docs, policy=DuplicatePolicy.OVERWRITE)
+            n_expected = expected.get(file_source, len(docs))
+            if len(docs) < n_expected:
+                logger.error(
+                    f"Embed lỗi {n_expected - len(docs)}/{n_expected} chunk của {file_source}, "
+                    "manifest đánh dấu chưa đầy đủ để lần sau thử lại"
+                )
+            self.manifest.record(file_source, docs, complete=len(docs) >= n_expected)
+        if save and self._bulk is None:
+            self.manifest.save()
         return self.store
 
-    def update_chunks(self, docs_dict: Dict[str, List[Document]]):
+    # ---- bulk load ----
+    def _indexing_threshold(self) -> int:
+        info = self.client.get_collection(self.store.index)
+        threshold = info.config.optimizer_config.indexing_threshold
+        # None = mặc định của server; không thể "đặt lại" None nên ghi rõ giá trị mặc định
+        return _DEFAULT_INDEXING_THRESHOLD if threshold is None else threshold
+
+    def _set_indexing_threshold(self, threshold: int) -> None:
+        self.client.update_collection(
+            collection_name=self.store.index,
+            optimizers_config=models.OptimizersConfigDiff(indexing_threshold=threshold),
+        )
+
+    def _bulk_write(self, docs: List[Document]) -> None:
+        self._bulk["buffer"].extend(
+            convert_haystack_documents_to_qdrant_points(
+                docs, use_sparse_embeddings=self.store.use_sparse_embeddings
+            )
+        )
+        if len(self._bulk["buffer"]) >= config.BULK_FLUSH_POINTS:
+            self._bulk_flush()
+
+    def _bulk_flush(self) -> None:
+        points = self._bulk["buffer"]
+        if not points:
+            return
+        self._bulk["buffer"] = []
+        t0 = time.perf_counter()
+        self.client.upload_points(
+            collection_name=self.store.index,
+            points=points,
+            batch_size=config.BULK_UPLOAD_BATCH_SIZE,
+            parallel=config.BULK_UPLOAD_PARALLEL,
+            wait=False,
+        )
+        self._bulk["upload_seconds"] += time.perf_counter() - t0
+        self._bulk["points"] += len(points)
+
+    def _wait_until_indexed(self, timeout: float) -> bool:
         """
-        Update toàn bộ chunks của mỗi file theo file_source.
-        Logic: xóa chunks cũ → thêm chunks mới. Nếu source không tồn tại thì chỉ thêm mới
+        Chờ mọi lệnh ghi (wait=False) được áp dụng (update queue rỗng) và optimizer build xong
+        index (status GREEN). Không chờ theo số points: upload_points ghi đè id trùng nên số
+        points có thể không bao giờ đạt tổng số đã upload.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            info = self.client.get_collection(self.store.index)
+            queued = info.update_queue.length if info.update_queue else 0
+            if info.status == models.CollectionStatus.GREEN and not queued:
+                return True
+            if time.monotonic() > deadline:
+                logger.warning(
+                    f"Hết {timeout:.0f}s chờ index: status={info.status}, "
+                    f"{info.points_count} points, queue={queued}"
+                )
+                return False
+            time.sleep(1)
+
+    @contextmanager
+    def bulk_load(self):
+        """
+        Chế độ nạp nhanh cho rebuild: trong khối with, add_chunks không đi qua store Haystack
+        (bỏ kiểm tra trùng, write_batch_size=128, wait=True) mà gom points rồi upload_points
+        song song (BULK_UPLOAD_PARALLEL process, wait=False); index HNSW tắt (indexing_threshold=0).
+        Khi ra khỏi khối: upload nốt, khôi phục indexing_threshold, chờ optimizer xong
+        (BULK_OPTIMIZE_TIMEOUT, bỏ qua nếu khối with lỗi) rồi lưu manifest. Thống kê points/s ở self.bulk_stats.
+        Chỉ dùng khi ghi vào collection mới/đã xóa sạch (ghi đè theo id, không xóa chunk cũ).
+        """
+        if self._bulk is not None:
+            yield self
+            return
+        threshold = self._indexing_threshold()
+        self._set_indexing_threshold(0)
+        self._bulk = {"buffer": [], "points": 0, "upload_seconds": 0.0}
+        t0 = time.perf_counter()
+        completed = False
+        try:
+            yield self
+            self._bulk_flush()
+            completed = True
+        finally:
+            stats, self._bulk = self._bulk, None
+            load_seconds = time.perf_counter() - t0
+            self._set_indexing_threshold(threshold)
+            t1 = time.perf_counter()
+            # Lỗi giữa chừng: không chờ build index cho collection sắp bị bỏ
+            if completed:
+                self._wait_until_indexed(config.BULK_OPTIMIZE_TIMEOUT)
+            index_seconds = time.perf_counter() - t1
+            if not completed:
+                # Points còn trong buffer đã mất: để manifest trống => lần sau rebuild toàn bộ
+                self.manifest.clear()
+            self.manifest.save()
+            total = load_seconds + index_seconds
+            self.bulk_stats = {
+                "points": stats["points"],
+                "load_seconds": load_seconds,
+                "upload_seconds": stats["upload_seconds"],
+                "index_seconds": index_seconds,
+                "points_per_sec": stats["points"] / total if total else 0.0,
+                "upload_points_per_sec": (
+                    stats["points"] / stats["upload_seconds"]
+                    if stats["upload_seconds"]
+                    else 0.0
+                ),
+            }
+            logger.info(
+                f"Bulk load: {stats['points']} points, upload "
+                f"{self.bulk_stats['upload_points_per_sec']:.0f} points/s, nạp {load_seconds:.1f}s "
+                f"+ build index {index_seconds:.1f}s => {self.bulk_stats['points_per_sec']:.0f} points/s"
+            )
+
+    def _existing_points(self, file_source: str) -> Dict[str, tuple]:
+        """{id Document: (id point, meta)} của mọi chunk đang lưu cho 1 file (không lấy vector)."""
+        existing: Dict[str, tuple] = {}
+        for point in self._iter_points(
+            self._source_filter(file_source), with_payload=["id", "meta"]
+        ):
+            payload = point.payload or {}
+            existing[payload.get("id") or str(point.id)] = (
+                point.id,
+                payload.get("meta") or {},
+            )
+        return existing
+
+    def update_chunks(
+        self,
+        docs_dict: Dict[str, List[Document]],
+        embed: Optional[Callable[[List[Document]], List[Document]]] = None,
+    ):
+        """
+        Update chunks của mỗi file theo diff với chunks đang lưu (id chunk ổn định theo nội dung):
+        - chunk mới: embed (nếu truyền embed, docs chưa có vector) rồi ghi;
+        - chunk không đổi nội dung: giữ nguyên vector, chỉ cập nhật meta nếu khác (trang, document_id...);
+        - chunk không còn: xóa theo id point.
+        Nếu source chưa có trong DB thì chỉ thêm mới.
         """
         for file_source, docs in docs_dict.items():
             logger.info(f"Đang update file: {file_source}")
-            result = self.delete_file(file_source)
-            if result:
+            existing = self._existing_points(file_source)
+            if not existing:
                 logger.warning(
                     f"file chưa tồn tại trong database, tiến hành thêm mới: {file_source}"
                 )
-            else:
-                logger.info(
-                    f"Đã xóa tất cả chunks của file: {file_source}, tiến hành update lại file mới"
+            new_ids = {doc.id for doc in docs}
+            kept = [doc for doc in docs if doc.id in existing]
+            added = [doc for doc in docs if doc.id not in existing]
+            vanished = [
+                point_id
+                for doc_id, (point_id, _) in existing.items()
+                if doc_id not in new_ids
+            ]
+            n_added = len(added)
+            if embed is not None and added:
+                added = embed(added)
+            if len(added) < n_added:
+                logger.error(
+                    f"Embed lỗi {n_added - len(added)}/{n_added} chunk mới của {file_source}, "
+                    "manifest đánh dấu chưa đầy đủ để lần sau thử lại"
+                )
+            if added:
+                self.store.write_documents(added, policy=DuplicatePolicy.OVERWRITE)
+            changed_meta = [
+                models.SetPayloadOperation(
+                    set_payload=models.SetPayload(
+                        payload={"meta": doc.meta}, points=[existing[doc.id][0]]
+                    )
                 )
-            self.store.write_documents(docs)
-            logger.info(f"Update thành công file: {file_source}")
+                for doc in kept
+                if existing[doc.id][1] != doc.meta
+            ]
+            if changed_meta:
+                self.client.batch_update_points(
+                    collection_name=self.store.index, update_operations=changed_meta
+                )
+            if vanished:
+                self.client.delete(
+                    collection_name=self.store.index,
+                    points_selector=models.PointIdsList(points=vanished),
+                )
+            self.manifest.record(
+                file_source, kept + added, complete=len(added) == n_added
+            )
+            logger.info(
+                f"Update thành công file: {file_source} — giữ {len(kept)} chunks "
+                f"({len(changed_meta)} đổi meta), thêm {len(added)}, xóa {len(vanished)}"
+            )
+        self.manifest.save()
         return self.store
 
-    def delete_file(self, file_source: str):
+    def delete_file(self, file_source: str) -> int:
         """
-        Xóa tất cả chunks thuộc 1 file theo metadata 'source'.
+        Xóa tất cả chunks thuộc 1 file theo metadata 'source'. Trả về số chunks đã xóa.
         """
         if not file_source:
             raise ValueError("file_source không được để trống")
-        chunks = self.get_all_chunks(file_source, limit=1)
-        if not chunks:
-            logger.warning(f"Không tìm thấy chunks nào cho file: {file_source}")
-            return None
-        total_chunks = len(self.get_all_chunks(file_source))
-        logger.info(f"Bắt đầu xóa {total_chunks} chunks cho file: {file_source}")
-        try:
-            result = self.client.delete(
-                collection_name=self.store.index,
-                points_selector=models.FilterSelector(
-                    filter=Filter(
-                        must=[
-                            FieldCondition(
-                                key="source", match=MatchValue(value=file_source)
-                            )
-                        ]
-                    )
-                ),
+        return self.delete_files([file_source])[file_source] or 0
+
+    def delete_files(
+        self, file_sources: List[str], count: bool = True, batch_size: int = 256
+    ) -> Dict[str, Optional[int]]:
+        """
+        Xóa chunks của nhiều file: mỗi batch_size file chỉ 1 request delete (MatchAny theo source).
+        count=True: đếm trước số chunks mỗi file bằng count API (không tải payload/vector);
+        count=False: bỏ qua đếm (giá trị None).
+        Trả về {file_source: số chunks đã xóa}.
+        Manifest chỉ bỏ file sau khi request delete của batch chứa nó thành công: lỗi giữa chừng
+        thì file còn lại vẫn trong manifest => rebuild incremental sau sẽ xóa lại.
+        """
+        sources = list(dict.fromkeys(s for s in file_sources if s))
+        if not sources:
+            return {}
+
+        counts: Dict[str, Optional[int]] = {}
+        for source in sources:
+            counts[source] = (
+                self.client.count(
+                    collection_name=self.store.index,
+                    count_filter=self._source_filter(source),
+                    exact=True,
+                ).count
+                if count
+                else None
             )
-            if hasattr(result, "status") and result.status == "ok":
-                logger.info(
-                    f"Xóa thành công {total_chunks} chunks cho file: {file_source}"
+            if counts[source] == 0:
+                logger.warning(f"Không tìm thấy chunks nào cho file: {source}")
+        targets = [s for s in sources if counts[s] != 0]
+        # File không còn chunk nào: bỏ khỏi manifest luôn
+        deleted = [s for s in sources if counts[s] == 0]
+        for i in range(0, len(targets), batch_size):
+            batch = targets[i : i + batch_size]
+            try:
+                result = self.client.delete(
+                    collection_name=self.store.index,
+                    points_selector=models.FilterSelector(
+                        filter=Filter(
+                            must=[
+                                FieldCondition(
+                                    key=self.SOURCE_KEY, match=MatchAny(any=batch)
+                                )
+                            ]
+                        )
+                    ),
                 )
-            else:
+            except Exception as e:
+                logger.error(f"Lỗi khi xóa {len(batch)} file: {e}")
+                self._forget_files(deleted)
+                raise e
+            if getattr(result, "status", None) not in (
+                "ok",
+                "acknowledged",
+                "completed",
+            ):
                 logger.warning(
-                    f"Xóa file {file_source} có thể không thành công, result: {result}"
+                    f"Xóa {len(batch)} file có thể không thành công, giữ trong manifest, "
+                    f"result: {result}"
                 )
-            return result
-        except Exception as e:
-            logger.error(f"Lỗi khi xóa file {file_source}: {e}")
-            raise e
+                continue
+            deleted.extend(batch)
+        self._forget_files(deleted)
+        if count:
+            logger.info(
+                f"Đã xóa {sum(counts.values())} chunks của {len(targets)}/{len(sources)} file"
+            )
+        else:
+            logger.info(f"Đã xóa chunks của {len(sources)} file")
+        return counts
 
-    def get_all_chunks(
-        self, file_source: str, limit: int = 100, offset: int = 0
-    ) -> List[Document]:
-        """
-        Lấy tất cả chunks của 1 file theo metadata 'source'.
-        Có hỗ trợ phân trang qua limit và offset.
-        """
-        documents = []
-        next_offset = offset
+    def _scroll_pages(
+        self,
+        scroll_filter: Optional[Filter],
+        with_payload: Union[bool, List[str], models.PayloadSelector],
+        page_size: int,
+    ) -> Iterator[list]:
+        """Từng trang points, đi theo con trỏ next_page_offset server trả về."""
+        next_offset = None
         while True:
-            scroll_resp = self.client.scroll(
+            points, next_offset = self.client.scroll(
                 collection_name=self.store.index,
-                scroll_filter=Filter(
-                    must=[
-                        FieldCondition(
-                            key="source", match=MatchValue(value=file_source)
-                        )
-                    ]
-                ),
-                limit=limit,
+                scroll_filter=scroll_filter,
+                limit=page_size,
                 offset=next_offset,
+                with_payload=with_payload,
+                with_vectors=False,
             )
-            if not scroll_resp or not scroll_resp[0]:
-                break
-            for d in scroll_resp[0]:
-                payload = d.payload or {}
-                doc = Document(content=payload.get("content", ""), meta=payload)
-                documents.append(doc)
-            next_offset += limit
+            if points:
+                yield points
+            if next_offset is None:
+                return
+
+    @staticmethod
+    def _prefetch(pages: Iterator[list], depth: int) -> Iterator[list]:
+        """
+        Tải trước tối đa depth trang trong 1 thread nền (chồng lấn request trang sau với xử lý
+        trang hiện tại). Bộ nhớ giới hạn ~depth+1 trang; dừng thread khi caller ngừng đọc.
+        """
+        done = object()
+        pages_q: queue.Queue = queue.Queue(maxsize=depth)
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    pages_q.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce() -> None:
+            try:
+                for page in pages:
+                    if not put(page):
+                        return
+                put(done)
+            except BaseException as e:
+                put(e)
+
+        worker = threading.Thread(target=produce, name="qdrant-prefetch", daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = pages_q.get()
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+
+    def _iter_points(
+        self,
+        scroll_filter: Optional[Filter],
+        with_payload: Union[bool, List[str], models.PayloadSelector] = True,
+        page_size: int = 256,
+        prefetch: int = 0,
+    ) -> Iterator[Any]:
+        pages = self._scroll_pages(scroll_filter, with_payload, max(1, int(page_size)))
+        if prefetch > 0:
+            pages = self._prefetch(pages, int(prefetch))
+        for page in pages:
+            yield from page
+
+    def iter_chunks(
+        self,
+        file_source: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+        ids_only: bool = False,
+        page_size: int = 256,
+        prefetch: int = 2,
+    ) -> Iterator[Union[Document, Any]]:
+        """
+        Duyệt chunks (của 1 file, hoặc cả collection nếu file_source=None) theo từng trang,
+        bộ nhớ không phụ thuộc số chunks. Không tải vector.
+        - fields: chỉ lấy các key payload này (vd ["content", "meta.source"]);
+          exclude: bỏ các key (vd ["meta.table_html"]); mặc định lấy toàn bộ payload.
+        - ids_only=True: chỉ trả về id point, không tải payload.
+        - prefetch: số trang tải trước song song với việc xử lý của caller (0 = tắt).
+        """
+        if ids_only:
+            with_payload: Union[bool, List[str], models.PayloadSelector] = False
+        elif fields is not None:
+            with_payload = list(fields)
+        elif exclude:
+            with_payload = models.PayloadSelectorExclude(exclude=list(exclude))
+        else:
+            with_payload = True
+        scroll_filter = self._source_filter(file_source) if file_source else None
+        points = self._iter_points(scroll_filter, with_payload, page_size, prefetch)
+        for point in points:
+            if ids_only:
+                yield point.id
+                continue
+            payload = point.payload or {}
+            yield Document(
+                id=payload.get("id") or str(point.id),
+                content=payload.get("content"),
+                meta=payload.get("meta") or {},
+            )
+
+    def _forget_files(self, sources: List[str]) -> None:
+        """Bỏ các file khỏi manifest (1 lần ghi file)."""
+        if not sources:
+            return
+        for source in sources:
+            self.manifest.remove(source)
+        self.manifest.save()
+
+    def get_all_chunks(
+        self,
+        file_source: str,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        **kwargs,
+    ) -> List[Document]:
+        """
+        Lấy chunks của 1 file theo metadata 'source', có phân trang: bỏ qua offset chunks đầu,
+        trả về tối đa limit chunks (None = tất cả). Thứ tự ổn định theo id point.
+        kwargs (fields, exclude, prefetch...) chuyển cho iter_chunks.
+        Với file lớn nên dùng iter_chunks để không giữ cả danh sách trong RAM.
+        """
+        offset = max(0, int(offset))
+        stop = None if limit is None else offset + max(0, int(limit))
+        kwargs.setdefault("page_size", min(256, stop) if stop else 256)
+        documents = list(
+            itertools.islice(self.iter_chunks(file_source, **kwargs), offset, stop)
+        )
         logger.info(f"Lấy {len(documents)} chunks cho file: {file_source}")
         return documents
 
@@ -146,6 +538,8 @@ class QdrantManager:
         """
         if self.client is None:
             raise ConnectionError("Qdrant client is not initialized")
+        self.manifest.clear()
+        self.manifest.save()
 
         try:
             collection_info = self.client.get_collection(self.store.index)
@@ -167,11 +561,15 @@ class QdrantManager:
                 logger.info(f"Collection {self.store.index} đã trống")
         except Exception as e:
             logger.warning(f"Không thể xóa points, thử xóa và tạo lại collection: {e}")
-            # Fallback: xóa collection và tạo lại
+            # Fallback: xóa collection và tạo lại (DB dạng alias: tạo collection rỗng mới rồi chuyển alias)
             try:
+                if self._alias_target() is not None:
+                    self._swap_alias(self._new_generation().index)
+                    self._drop_old_generations(keep=0)
+                    logger.info(f"Đã chuyển {self.alias} sang collection rỗng mới")
+                    return
                 self.client.delete_collection(self.store.index)
                 logger.info(f"Đã xóa collection: {self.store.index}")
-                from storage.vector_store import get_document_store
 
                 new_store = get_document_store(recreate_index=True)
                 self.store = new_store
@@ -180,25 +578,231 @@ class QdrantManager:
                 logger.error(f"Lỗi khi tạo lại collection: {e2}")
                 raise e2
 
-    def rebuild_from_folder(self, folder_path):
+    def rebuild_from_folder(
+        self,
+        folder_path,
+        incremental: bool = False,
+        processor=None,
+        bulk: Optional[bool] = None,
+    ) -> Dict[str, int]:
         """
-        Xóa toàn bộ vectors và rebuild từ folder.
+        Rebuild database từ folder.
+        - incremental=False: parse/embed lại cả folder; BLUE_GREEN_REBUILD: vào collection mới
+          rồi chuyển alias (không downtime), nếu không thì xóa toàn bộ vectors trước.
+        - incremental=True : dựa vào manifest, chỉ xử lý file mới/đổi nội dung,
+          xóa vectors của file đã bị xóa, giữ nguyên các file không đổi.
+        processor: DocToEmbed dùng lại (nếu None thì tạo mới).
+        bulk: rebuild toàn bộ bằng bulk_load() (mặc định config.BULK_LOAD_REBUILD).
+        Trả về {file_source: số chunks đã ghi} của các file được xử lý.
         """
-        from processing.files_to_embed import DocToEmbed
+        if processor is None:
+            from processing.files_to_embed import DocToEmbed
+
+            processor = DocToEmbed()
+        if incremental:
+            if len(self.manifest) and self._points_count() > 0:
+                return self._rebuild_incremental(Path(folder_path), processor)
+            logger.info(
+                "Manifest hoặc collection đang trống, chuyển sang rebuild toàn bộ"
+            )
 
         logger.info("Bắt đầu rebuild database...")
-        # 1. Xóa toàn bộ vectors
-        self.clear_all_vectors()
-        # 2. Process folder và add chunks
-        processor = DocToEmbed()
-        embedded_docs = processor.process_folder(folder_path)
-        # 3. Add chunks vào DB
-        if embedded_docs:
-            self.add_chunks(embedded_docs)
-            total_chunks = sum(len(docs) for docs in embedded_docs.values())
+        if bulk is None:
+            bulk = config.BULK_LOAD_REBUILD
+        if config.BLUE_GREEN_REBUILD:
+            chunk_counts = self._rebuild_blue_green(Path(folder_path), processor, bulk)
+        else:
+            # 1. Xóa toàn bộ vectors
+            self.clear_all_vectors()
+            # 2. Process folder và add chunks vào DB
+            chunk_counts = self._load_folder(Path(folder_path), processor, bulk)
+        if chunk_counts:
             logger.info(
-                f"Rebuild hoàn tất: {len(embedded_docs)} files, {total_chunks} chunks"
+                f"Rebuild hoàn tất: {len(chunk_counts)} files, {sum(chunk_counts.values())} chunks"
             )
         else:
             logger.warning("Không có documents nào được process")
-        return embedded_docs
+        return chunk_counts
+
+    def _load_folder(self, folder_path: Path, processor, bulk: bool) -> Dict[str, int]:
+        """Parse/embed cả folder và ghi vào self.store (bulk_load nếu bulk)."""
+        with self.bulk_load() if bulk else nullcontext():
+            if config.STREAMING_INGEST:
+                files = [p for p in folder_path.iterdir() if p.is_file()]
+                return self._ingest_files(processor, files)
+            chunk_counts: Dict[str, int] = {}
+            embedded_docs = processor.process_folder(
+                folder_path, chunk_counts=chunk_counts
+            )
+            if embedded_docs:
+                self.add_chunks(embedded_docs, expected=chunk_counts)
+            return {src: len(docs) for src, docs in embedded_docs.items()}
+
+    # ---- collection theo thế hệ + alias (rebuild blue/green) ----
+    def _alias_target(self) -> Optional[str]:
+        """Collection alias đang trỏ tới (None nếu chưa có alias)."""
+        for alias in self.client.get_aliases().aliases:
+            if alias.alias_name == self.alias:
+                return alias.collection_name
+        return None
+
+    def _generations(self) -> List[str]:
+        """Các collection "<alias>_v<ms>", cũ trước mới sau."""
+        pattern = re.compile(rf"^{re.escape(self.alias)}_v(\d+)$")
+        versions = {}
+        for collection in self.client.get_collections().collections:
+            match = pattern.match(collection.name)
+            if match:
+                versions[collection.name] = int(match.group(1))
+        return sorted(versions, key=versions.get)
+
+    def _new_generation(self) -> QdrantDocumentStore:
+        store = get_document_store(
+            recreate_index=True, index=f"{self.alias}_v{int(time.time() * 1000)}"
+        )
+        store.count_documents()  # Haystack tạo collection khi dùng lần đầu
+        return store
+
+    def _swap_alias(self, collection_name: str) -> None:
+        """Chuyển alias sang collection_name: xóa + tạo alias trong 1 request (atomic)."""
+        current = self._alias_target()
+        actions = []
+        if current is not None:
+            actions.append(
+                models.DeleteAliasOperation(
+                    delete_alias=models.DeleteAlias(alias_name=self.alias)
+                )
+            )
+        elif self.client.collection_exists(self.alias):
+            # DB cũ: collection thật trùng tên alias -> phải xóa trước khi tạo alias,
+            # truy vấn lỗi trong khoảng ngắn giữa 2 request (chỉ xảy ra 1 lần khi chuyển đổi)
+            logger.warning(
+                f"Chuyển collection cũ {self.alias} sang dạng alias: xóa collection cũ"
+            )
+            self.client.delete_collection(self.alias)
+        actions.append(
+            models.CreateAliasOperation(
+                create_alias=models.CreateAlias(
+                    collection_name=collection_name, alias_name=self.alias
+                )
+            )
+        )
+        self.client.update_collection_aliases(change_aliases_operations=actions)
+        logger.info(f"Alias {self.alias}: {current or '-'} -> {collection_name}")
+
+    def _drop_old_generations(self, keep: int) -> None:
+        """Xóa collection cũ không còn alias nào trỏ tới, giữ lại keep bản mới nhất."""
+        in_use = {a.collection_name for a in self.client.get_aliases().aliases}
+        old = [name for name in self._generations() if name not in in_use]
+        for name in old[: max(0, len(old) - keep)]:
+            self.client.delete_collection(name)
+            logger.info(f"Đã xóa collection cũ: {name}")
+
+    def _rebuild_blue_green(
+        self, folder_path: Path, processor, bulk: bool
+    ) -> Dict[str, int]:
+        """
+        Build vào collection mới trong khi alias vẫn trỏ bản cũ (chat truy vấn đầy đủ, không
+        chậm đi), xong thì chuyển alias atomic rồi xóa bản cũ. Lỗi giữa chừng: bỏ collection
+        mới, giữ nguyên bản đang phục vụ và manifest của nó.
+        Trong lúc build, self.store trỏ collection mới: không chạy add/update/delete khác song song.
+        """
+        live_store = self.store
+        new_store = self._new_generation()
+        logger.info(
+            f"Rebuild vào collection {new_store.index}, {self.alias} vẫn phục vụ truy vấn"
+        )
+        previous_files = self.manifest.files
+        self.manifest.clear()
+        self.store = new_store
+        try:
+            chunk_counts = self._load_folder(folder_path, processor, bulk)
+            self._swap_alias(new_store.index)
+        except BaseException:
+            logger.error(
+                f"Rebuild lỗi: giữ nguyên collection đang phục vụ, xóa {new_store.index}"
+            )
+            self.manifest.replace(previous_files)
+            self.manifest.save()
+            self.client.delete_collection(new_store.index)
+            raise
+        finally:
+            self.store = live_store
+        self.manifest.save()
+        self._drop_old_generations(config.KEEP_OLD_COLLECTIONS)
+        return chunk_counts
+
+    def _ingest_files(self, processor, files: List[Path]) -> Dict[str, int]:
+        """
+        Parse/embed danh sách file rồi ghi bằng add_chunks.
+        STREAMING_INGEST: chạy pipeline chồng lấn các stage, ghi ngay khi từng file embed xong;
+        manifest ghi ra file tối đa mỗi MANIFEST_SAVE_INTERVAL giây và 1 lần khi kết thúc
+        (không ghi lại cả file JSON sau mỗi file ingest).
+        """
+        if not files:
+            return {}
+        if not config.STREAMING_INGEST:
+            chunk_counts: Dict[str, int] = {}
+            embedded_docs = processor.process_list_file(
+                files, chunk_counts=chunk_counts
+            )
+            if embedded_docs:
+                self.add_chunks(embedded_docs, expected=chunk_counts)
+            return {src: len(docs) for src, docs in embedded_docs.items()}
+
+        last_save = time.monotonic()
+
+        def sink(source: str, docs: List[Document], n_chunks: int) -> None:
+            nonlocal last_save
+            self.add_chunks({source: docs}, save=False, expected={source: n_chunks})
+            # Trong bulk_load manifest chỉ được lưu sau khi points đã upload hết
+            if (
+                self._bulk is None
+                and time.monotonic() - last_save >= config.MANIFEST_SAVE_INTERVAL
+            ):
+                self.manifest.save()
+                last_save = time.monotonic()
+
+        try:
+            return processor.stream_list_file(files, sink=sink)
+        finally:
+            if self._bulk is None:
+                self.manifest.save()
+
+    def _points_count(self) -> int:
+        try:
+            info = self.client.get_collection(self.store.index)
+            return int(info.points_count or 0)
+        except Exception:
+            return 0
+
+    def _rebuild_incremental(self, folder_path: Path, processor) -> Dict[str, int]:
+        files = [p for p in folder_path.iterdir() if p.is_file()]
+        new_files, changed_files, removed_sources = self.manifest.diff(files)
+        logger.info(
+            f"Rebuild incremental: {len(new_files)} file mới, {len(changed_files)} file thay đổi, "
+            f"{len(removed_sources)} file đã xóa, "
+            f"{len(files) - len(new_files) - len(changed_files)} file giữ nguyên"
+        )
+        # 1. Xóa vectors của file không còn trong folder (1 request cho nhiều file)
+        if removed_sources:
+            self.delete_files(removed_sources, count=False)
+        # 2. Parse/embed file mới
+        chunk_counts = self._ingest_files(processor, new_files)
+        # 3. File đã đổi: chunk lại rồi chỉ embed/ghi chunk mới, xóa chunk không còn
+        if changed_files:
+            changed_docs = processor.chunk_list_file(changed_files)
+            self.update_chunks(changed_docs, embed=processor.embed_chunks)
+            chunk_counts.update({src: len(docs) for src, docs in changed_docs.items()})
+        # File đã đổi nhưng không còn ra chunk nào -> xóa vectors cũ như khi rebuild toàn bộ
+        emptied = [
+            str(p.resolve())
+            for p in changed_files
+            if str(p.resolve()) not in chunk_counts
+        ]
+        if emptied:
+            self.delete_files(emptied, count=False)
+        logger.info(
+            f"Rebuild incremental hoàn tất: {len(chunk_counts)} files, {sum(chunk_counts.values())} chunks"
+        )
+        return chunk_counts
@@ -1,11 +1,18 @@
 from haystack_integrations.document_stores.qdrant import QdrantDocumentStore
 from qdrant_client import models
+from typing import Optional
+from processing.embedding_backends import get_embedding_backend
 import config
 
 
-def get_document_store(recreate_index=False) -> QdrantDocumentStore:
+def get_document_store(
+    recreate_index=False, index: Optional[str] = None
+) -> QdrantDocumentStore:
     """
     Khởi tạo và trả về một QdrantDocumentStore đã được tối ưu cho hiệu năng và bộ nhớ.
+    Số chiều vector lấy theo backend embedding đang dùng.
+    index mặc định là VECTOR_DB_COLLECTION: alias trỏ tới collection đang phục vụ (rebuild
+    blue/green) hoặc tên collection thật với database cũ; truyền index để tạo collection khác.
     """
     quantization_config_object = models.ScalarQuantization(
         scalar=models.ScalarQuantizationConfig(
@@ -15,8 +22,8 @@ def get_document_store(recreate_index=False) -> QdrantDocumentStore:
 
     document_store = QdrantDocumentStore(
         url=config.VECTOR_DB_URL,
-        index=config.VECTOR_DB_COLLECTION,
-        embedding_dim=1536,
+        index=index or config.VECTOR_DB_COLLECTION,
+        embedding_dim=get_embedding_backend().dimension,
         similarity="cosine",
         recreate_index=recreate_index,
         hnsw_config={"m": 16, "ef_construct": 64},
@@ -24,9 +31,9 @@ def get_document_store(recreate_index=False) -> QdrantDocumentStore:
         on_disk_payload=True,
         write_batch_size=128,
         payload_fields_to_index=[
-            {"field_name": "document_id", "field_schema": {"type": "keyword"}},
-            {"field_name": "category", "field_schema": {"type": "keyword"}},
-            {"field_name": "source", "field_schema": {"type": "keyword"}},
+            {"field_name": "meta.document_id", "field_schema": {"type": "keyword"}},
+            {"field_name": "meta.category", "field_schema": {"type": "keyword"}},
+            {"field_name": "meta.source", "field_schema": {"type": "keyword"}},
         ],
     )
     return document_store
@@ -0,0 +1,28 @@
+import tiktoken
+
+from processing._chunker import TokenChunker
+
+
+def _byte_encoding():
+    # Mỗi byte 1 token (không cần tải bảng BPE): ký tự tiếng Việt có dấu bị cắt thành 2-3 token
+    return tiktoken.Encoding(
+        name="bytes",
+        pat_str=r"\S+|\s+",
+        mergeable_ranks={bytes([i]): i for i in range(256)},
+        special_tokens={},
+    )
+
+
+def test_long_word_split_on_character_boundaries():
+    chunker = TokenChunker(max_tokens=8, overlap_tokens=0)
+    chunker.tokens._encoding = _byte_encoding()
+    word = "đườngẩmướt" * 5
+    text = f"Mở đầu. {word} kết thúc."
+
+    pieces = chunker.tokens.split(word, 8)
+    assert "".join(pieces) == word
+    assert all("�" not in p and chunker.tokens.count(p) <= 8 for p in pieces)
+
+    chunks = chunker.split_text(text)
+    assert "".join(c for c, _ in chunks).replace(" ", "") == text.replace(" ", "")
+    assert all("�" not in c and n <= 8 for c, n in chunks)
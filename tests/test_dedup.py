@@ -0,0 +1,92 @@
+import copy
+
+from haystack import Document
+
+from processing._dedup import NearDuplicateFilter
+from processing.files_to_embed import DocToEmbed
+
+_TEXT = (
+    "Hợp đồng có hiệu lực kể từ ngày ký và được lập thành hai bản có giá trị như nhau"
+)
+
+
+def _doc(content, category="text", document_id="d1", **meta):
+    return Document(
+        content=content,
+        meta={
+            "category": category,
+            "document_id": document_id,
+            "source": f"/data/{document_id}.pdf",
+            **meta,
+        },
+    )
+
+
+def test_run_does_not_mutate_input_documents():
+    docs = [
+        _doc(_TEXT, trace="Trang 1"),
+        _doc(_TEXT, trace="Trang 2"),
+        _doc("hai bản có giá trị", category="image", filepath="/img/a.png"),
+    ]
+    before = copy.deepcopy([d.meta for d in docs])
+
+    kept = NearDuplicateFilter().run(docs)
+
+    assert [d.meta for d in docs] == before
+    assert len(kept) == 1
+    assert kept[0].meta["duplicates"][0]["trace"] == "Trang 2"
+    assert kept[0].meta["images"] == ["/img/a.png"]
+
+
+def test_assign_ids_returns_copies():
+    docs = [_doc(_TEXT), _doc(_TEXT)]
+    ids = [d.id for d in docs]
+
+    assigned = DocToEmbed._assign_ids(docs)
+
+    assert [d.id for d in docs] == ids
+    assert len({d.id for d in assigned}) == 2
+
+
+def _words(n, offset=0):
+    return " ".join(f"từ{i}" for i in range(offset, offset + n))
+
+
+def test_near_duplicate_threshold():
+    base = _words(200)
+    # Đổi 1 từ cuối: Jaccard shingle ~0.97 -> gộp; đổi 1/3 văn bản -> giữ cả hai
+    near = _words(199) + " khác"
+    far = _words(130) + " " + _words(70, offset=1000)
+    strict = NearDuplicateFilter(threshold=0.99)
+    loose = NearDuplicateFilter(threshold=0.8)
+
+    assert len(loose.run([_doc(base), _doc(near)])) == 1
+    assert loose.stats["near_duplicates"] == 1
+    assert len(strict.run([_doc(base), _doc(near)])) == 2
+    assert len(loose.run([_doc(base), _doc(far)])) == 2
+
+
+def test_duplicates_scoped_by_file_and_category():
+    docs = [_doc(_TEXT), _doc(_TEXT, document_id="d2"), _doc(_TEXT, category="table")]
+    assert len(NearDuplicateFilter().run(docs)) == 3
+    kept = NearDuplicateFilter(cross_file=True).run(docs)
+    assert len(kept) == 2
+    assert kept[0].meta["duplicates"][0]["document_id"] == "d2"
+
+
+def test_image_merged_into_text_chunk_of_same_file():
+    text = _doc(f"Sơ đồ tổ chức. {_TEXT}")
+    inside = _doc("lập thành hai bản", category="image", filepath="/img/1.png")
+    same = _doc("lập thành hai bản", category="image", filepath="/img/2.png")
+    other_file = _doc(
+        "lập thành hai bản", category="image", document_id="d2", filepath="/img/3.png"
+    )
+    outside = _doc("không có trong văn bản", category="image", filepath="/img/4.png")
+
+    f = NearDuplicateFilter()
+    kept = f.run([text, inside, same, other_file, outside])
+
+    assert [d.meta.get("filepath") for d in kept] == [None, "/img/3.png", "/img/4.png"]
+    assert kept[0].meta["images"] == ["/img/1.png", "/img/2.png"]
+    assert f.stats["images_merged"] == 1
+    assert f.stats["exact_duplicates"] == 1
@@ -0,0 +1,75 @@
+import pytest
+
+# tokenizers đi kèm fastembed (extra "local")
+tokenizers = pytest.importorskip("tokenizers")
+
+from processing import _chunker
+from processing.embedding_backends import EmbeddingBackend
+from utils.tokens import HFTokenCounter
+
+_TEXT = "một hai ba bốn năm sáu bảy tám chín mười"
+
+
+def _hf_tokenizer(max_length=4):
+    words = _TEXT.split()
+    vocab = {w: i for i, w in enumerate(["[UNK]", *words])}
+    tokenizer = tokenizers.Tokenizer(tokenizers.models.WordLevel(vocab, "[UNK]"))
+    tokenizer.pre_tokenizer = tokenizers.pre_tokenizers.Whitespace()
+    # Giống tokenizer fastembed: bật truncation theo max_length của model
+    tokenizer.enable_truncation(max_length=max_length)
+    return tokenizer
+
+
+class _FakeBackend(EmbeddingBackend):
+    name = "fake"
+    model = "fake"
+    dimension = 4
+    max_input_tokens = 3
+
+    def __init__(self, tokenizer):
+        self._tokens = HFTokenCounter(tokenizer)
+
+    def embed(self, texts):
+        return [[0.0] * 4 for _ in texts]
+
+    def embed_query(self, text):
+        return [0.0] * 4
+
+    def token_counter(self):
+        return self._tokens
+
+
+def test_incomplete_backend_fails_at_instantiation():
+    class NoQuery(EmbeddingBackend):
+        def embed(self, texts):
+            return []
+
+    with pytest.raises(TypeError):
+        NoQuery()
+
+
+def test_hf_counter_ignores_model_truncation():
+    tokenizer = _hf_tokenizer(max_length=4)
+    counter = HFTokenCounter(tokenizer)
+
+    assert counter.count(_TEXT) == 10
+    assert counter.truncate(_TEXT, 3) == "một hai ba "
+    assert counter.split(_TEXT, 4) == [
+        "một hai ba bốn ",
+        "năm sáu bảy tám ",
+        "chín mười",
+    ]
+    # Tokenizer của model không bị đổi
+    assert tokenizer.truncation["max_length"] == 4
+
+
+def test_chunker_uses_backend_tokenizer_and_limit(monkeypatch):
+    backend = _FakeBackend(_hf_tokenizer())
+    monkeypatch.setattr(_chunker.config, "CHUNKER", "token")
+    monkeypatch.setattr(_chunker, "get_embedding_backend", lambda: backend)
+
+    chunker = _chunker.DocumentChunkerWrapper().chunker
+
+    assert chunker.tokens is backend.token_counter()
+    assert chunker.max_tokens == 3
+    assert all(n <= 3 for _, n in chunker.split_text(_TEXT))
@@ -0,0 +1,126 @@
+import threading
+import unicodedata
+
+from processing import embedding_cache
+from processing.embedding_cache import (
+    EmbeddingCache,
+    QueryEmbeddingCache,
+    normalize_query,
+)
+
+
+class _Embedder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, query):
+        self.calls.append(query)
+        return [float(len(self.calls)), 0.0, 0.0, 0.0]
+
+
+def test_normalize_query_casefold_is_optional():
+    assert normalize_query("  Thủ  tục\tnghỉ phép??") == "thủ tục nghỉ phép"
+    assert normalize_query("AI là gì?", casefold=False) == "AI là gì"
+    # NFD (dấu tổ hợp) và NFC cho cùng key
+    assert normalize_query(unicodedata.normalize("NFD", "Hoà")) == normalize_query(
+        "Hoà"
+    )
+
+
+def test_case_sensitive_cache_keeps_separate_vectors():
+    embed = _Embedder()
+    folded = QueryEmbeddingCache()
+    assert folded.get_or_embed("AI?", embed) == folded.get_or_embed("ai", embed)
+    assert len(embed.calls) == 1
+
+    exact = QueryEmbeddingCache(casefold=False)
+    assert exact.get_or_embed("AI", embed) != exact.get_or_embed("ai", embed)
+    assert exact.get_or_embed("ai ?", embed) == exact.get_or_embed("ai", embed)
+
+
+def test_ttl_expires_memory_entries(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(embedding_cache.time, "monotonic", lambda: now[0])
+    embed = _Embedder()
+    cache = QueryEmbeddingCache(ttl_seconds=60)
+
+    first = cache.get_or_embed("hạn nộp báo cáo", embed)
+    now[0] += 59
+    assert cache.get_or_embed("hạn nộp báo cáo", embed) == first
+    now[0] += 2
+    assert cache.get_or_embed("hạn nộp báo cáo", embed) != first
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_disk_tier_shared_between_instances(tmp_path):
+    disk = EmbeddingCache(tmp_path / "e.sqlite", model="m", dimension=4)
+    embed = _Embedder()
+    QueryEmbeddingCache(disk=disk).get_or_embed("Lịch họp?", embed)
+
+    other = QueryEmbeddingCache(disk=disk)
+    assert other.get_or_embed("lịch họp", embed) == [1.0, 0.0, 0.0, 0.0]
+    assert other.get_or_embed("lịch họp", embed) == [1.0, 0.0, 0.0, 0.0]
+    assert len(embed.calls) == 1
+    stats = other.stats()
+    assert (stats["disk_hits"], stats["hits"], stats["misses"]) == (1, 1, 0)
+    disk.close()
+
+
+def test_counters_are_exact_under_concurrency():
+    cache = QueryEmbeddingCache()
+    embed = _Embedder()
+    cache.get_or_embed("q", embed)
+
+    def worker():
+        for _ in range(2000):
+            cache.get_or_embed("q", embed)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert cache.stats()["hits"] == 8 * 2000
+
+
+def _vec(i):
+    return [float(i), 0.0, 0.0, 0.0]
+
+
+def test_sqlite_lru_evicts_least_recently_used(tmp_path, monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: clock[0])
+    cache = EmbeddingCache(tmp_path / "e.sqlite", model="m", dimension=4)
+    cache.max_bytes = cache._entry_bytes * 10
+    for i in range(10):
+        clock[0] += 1
+        cache.put_many([(f"t{i}", _vec(i))])
+    clock[0] += 1
+    cache.get_many(["t0"])  # t0 mới được dùng -> không bị evict
+
+    clock[0] += 1
+    cache.put_many([("t10", _vec(10))])
+
+    found = cache.get_many([f"t{i}" for i in range(11)])
+    assert sorted(found) == sorted({"t0", *(f"t{i}" for i in range(3, 11))})
+    assert len(cache) == 9
+    cache.close()
+
+
+def test_keys_isolated_by_model_dimension_and_table(tmp_path):
+    path = tmp_path / "e.sqlite"
+    docs = EmbeddingCache(path, model="m", dimension=4)
+    docs.put_many([("câu hỏi", _vec(1))])
+
+    assert EmbeddingCache(path, model="m2", dimension=4).get_many(["câu hỏi"]) == {}
+    assert EmbeddingCache(path, model="m", dimension=8).get_many(["câu hỏi"]) == {}
+    queries = EmbeddingCache(path, model="m", dimension=4, table="query_embeddings")
+    assert queries.get_many(["câu hỏi"]) == {}
+
+    # Mỗi bảng đếm và evict riêng: evict bảng câu hỏi không đụng tới documents
+    queries.max_bytes = queries._entry_bytes * 2
+    queries.put_many([(f"q{i}", _vec(i)) for i in range(5)])
+    assert len(queries) <= 2
+    assert len(docs) == 1
+    assert docs.get_many(["câu hỏi"]) == {"câu hỏi": _vec(1)}
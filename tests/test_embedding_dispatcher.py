@@ -0,0 +1,134 @@
+import time
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from processing import embedding_dispatcher
+from processing.embedding_dispatcher import EmbeddingDispatcher, TokenBucket
+from utils.tokens import TokenCounter
+
+
+def _error(cls, status, headers=None):
+    request = httpx.Request("POST", "http://embeddings.test/v1/embeddings")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return cls(f"HTTP {status}", response=response, body=None)
+
+
+class _FakeEmbeddings:
+    """embeddings.create giả: raise error(inputs) nếu trả về lỗi, ngược lại vector [len(text)]."""
+
+    def __init__(self, error=None):
+        self.error = error
+        self.calls = []
+
+    def create(self, model, input, **kwargs):
+        self.calls.append(list(input))
+        if self.error is not None:
+            err = self.error(input)
+            if err is not None:
+                raise err
+        return SimpleNamespace(
+            data=[
+                SimpleNamespace(index=i, embedding=[float(len(t))])
+                for i, t in enumerate(input)
+            ]
+        )
+
+
+@pytest.fixture
+def make_dispatcher(monkeypatch):
+    # Ước lượng token (không tải bảng BPE của tiktoken)
+    monkeypatch.setattr(
+        embedding_dispatcher, "TokenCounter", lambda m: TokenCounter(None)
+    )
+    created = []
+
+    def make(error=None, **kwargs):
+        dispatcher = EmbeddingDispatcher("test-model", api_key="test", **kwargs)
+        fake = _FakeEmbeddings(error)
+        dispatcher.client = SimpleNamespace(embeddings=fake)
+        created.append(dispatcher)
+        return dispatcher, fake
+
+    yield make
+    for dispatcher in created:
+        dispatcher.close()
+
+
+def test_token_bucket_paces_after_burst():
+    bucket = TokenBucket(rate_per_minute=1200)  # 20/giây
+    t0 = time.monotonic()
+    bucket.acquire(1200)  # hết bucket ngay, không chờ
+    assert time.monotonic() - t0 < 0.05
+    bucket.acquire(4)  # phải chờ nạp lại ~0.2s
+    assert 0.15 <= time.monotonic() - t0 < 1.0
+    # Request lớn hơn cả bucket vẫn đi được (không treo)
+    TokenBucket(rate_per_minute=6000).acquire(10**9)
+
+
+def test_batches_consume_token_bucket(make_dispatcher):
+    dispatcher, fake = make_dispatcher(tokens_per_minute=10_000, max_batch_inputs=2)
+    texts = ["một hai ba", "bốn năm", "sáu"]
+
+    dispatcher.embed(texts)
+
+    _, counts = dispatcher._prepare(texts)
+    assert len(fake.calls) == 2
+    assert dispatcher.token_bucket._tokens == pytest.approx(10_000 - sum(counts), abs=1)
+
+
+def test_non_retryable_error_bisects_to_bad_text(make_dispatcher):
+    def error(inputs):
+        if "hỏng" in inputs:
+            return _error(openai.BadRequestError, 400)
+        return None
+
+    dispatcher, fake = make_dispatcher(error)
+
+    vectors = dispatcher.embed(["a", "bb", "hỏng", "dddd"])
+
+    assert vectors == [[1.0], [2.0], None, [4.0]]
+    # cả batch -> 2 nửa -> nửa lỗi chia tiếp thành 2 text
+    assert fake.calls == [
+        ["a", "bb", "hỏng", "dddd"],
+        ["a", "bb"],
+        ["hỏng", "dddd"],
+        ["hỏng"],
+        ["dddd"],
+    ]
+
+
+def test_rate_limit_retries_without_bisect(make_dispatcher):
+    def error(inputs):
+        return _error(openai.RateLimitError, 429, {"retry-after-ms": "1"})
+
+    dispatcher, fake = make_dispatcher(error, max_retries=2)
+
+    vectors = dispatcher.embed(["a", "bb", "ccc"])
+
+    assert vectors == [None, None, None]
+    assert fake.calls == [["a", "bb", "ccc"]] * 3
+
+
+def test_pack_by_token_budget_and_input_count(make_dispatcher):
+    dispatcher, _ = make_dispatcher(max_batch_inputs=3, max_batch_tokens=10)
+
+    assert dispatcher._pack([4, 4, 4, 1, 1, 1, 1, 12, 2]) == [
+        (0, 2),  # 4+4, thêm 4 vượt 10 token
+        (2, 5),  # 4+1+1, đủ 3 input
+        (5, 7),
+        (7, 8),  # 1 text vượt budget vẫn đi riêng 1 request
+        (8, 9),
+    ]
+
+
+def test_long_text_truncated_to_max_input_tokens(make_dispatcher):
+    dispatcher, fake = make_dispatcher(max_input_tokens=5)
+
+    dispatcher.embed(["x" * 100, "ngắn"])
+
+    sent, short = fake.calls[0]
+    # Ước lượng ~3 ký tự/token: cắt còn 5 * 3 ký tự
+    assert (sent, short) == ("x" * 15, "ngắn")
@@ -0,0 +1,46 @@
+import json
+
+from haystack import Document
+
+from storage.file_manifest import FileManifest
+
+
+def _index(manifest, path, n=2):
+    source = str(path.resolve())
+    docs = [Document(content=str(i), meta={"document_id": "doc"}) for i in range(n)]
+    manifest.record(source, docs)
+    return source
+
+
+def test_diff_new_changed_removed(tmp_path):
+    manifest = FileManifest(tmp_path / "manifest.json", "kb")
+    same, edited, gone = (tmp_path / n for n in ("same.txt", "edited.txt", "gone.txt"))
+    for path in (same, edited, gone):
+        path.write_text(f"nội dung {path.name}", encoding="utf-8")
+        _index(manifest, path)
+    edited.write_text("nội dung mới", encoding="utf-8")
+    gone.unlink()
+    fresh = tmp_path / "fresh.txt"
+    fresh.write_text("file mới", encoding="utf-8")
+    # touch không đổi nội dung -> không coi là đã đổi
+    same.write_text(f"nội dung {same.name}", encoding="utf-8")
+
+    new, changed, removed = manifest.diff([same, edited, fresh])
+
+    assert new == [fresh]
+    assert changed == [edited]
+    assert removed == [str(gone.resolve())]
+
+
+def test_save_reload_scoped_by_collection(tmp_path):
+    path = tmp_path / "manifest.json"
+    manifest = FileManifest(path, "kb")
+    doc = tmp_path / "a.txt"
+    doc.write_text("a", encoding="utf-8")
+    source = _index(manifest, doc, n=3)
+    manifest.save()
+
+    assert FileManifest(path, "kb").get(source)["chunks"] == 3
+    assert json.loads(path.read_text(encoding="utf-8"))["collection"] == "kb"
+    # Manifest của collection khác không được dùng lại
+    assert len(FileManifest(path, "other")) == 0
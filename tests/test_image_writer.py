@@ -0,0 +1,38 @@
+import pytest
+from haystack import Document
+
+Image = pytest.importorskip("PIL.Image")
+
+from parsers._image_writer import ImageWriter
+
+
+def _image_doc(path):
+    return Document(content="ảnh", meta={"category": "image", "filepath": path})
+
+
+def test_duplicate_images_written_once(tmp_path):
+    writer = ImageWriter(max_workers=1)
+    pil = Image.new("RGB", (4, 4), "red")
+    try:
+        path_a, _ = writer.submit(pil, tmp_path / "img_1")
+        path_b, _ = writer.submit(pil.copy(), tmp_path / "img_2")
+        docs = writer.drop_failed([_image_doc(path_a), _image_doc(path_b)])
+    finally:
+        writer.shutdown()
+    assert path_a == path_b
+    assert len(docs) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["img_1.png"]
+
+
+def test_drop_failed_waits_and_drops_failed_writes(tmp_path):
+    blocker = tmp_path / "blocker"
+    blocker.write_text("không phải thư mục")
+    writer = ImageWriter(max_workers=1)
+    try:
+        ok, _ = writer.submit(Image.new("RGB", (4, 4), "red"), tmp_path / "ok")
+        bad, _ = writer.submit(Image.new("RGB", (4, 4), "blue"), blocker / "bad")
+        text = Document(content="text", meta={"category": "text"})
+        docs = writer.drop_failed([_image_doc(ok), _image_doc(bad), text])
+    finally:
+        writer.shutdown()
+    assert [d.meta.get("filepath") for d in docs] == [ok, None]
@@ -0,0 +1,84 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from haystack import Document
+
+from processing.ingest_pipeline import StreamingIngestPipeline
+
+
+class _FakeProcessor:
+    """parse: 1 doc/file; chunk: 3 chunk/doc; embed: bỏ 1 chunk của file trong partial."""
+
+    def __init__(self, parse_error_at=None, chunk_error=(), partial=()):
+        self.parse_error_at = parse_error_at
+        self.chunk_error = set(chunk_error)
+        self.partial = set(partial)
+        self.parser = SimpleNamespace(iter_parse_files=self._iter_parse_files)
+
+    def _iter_parse_files(self, files):
+        for i, path in enumerate(files):
+            if i == self.parse_error_at:
+                raise OSError("ổ đĩa lỗi")
+            yield path, [Document(content=path.name, meta={"source": str(path)})]
+
+    def _prepare_chunks(self, docs):
+        source = docs[0].meta["source"]
+        if Path(source).name in self.chunk_error:
+            raise ValueError("chunk lỗi")
+        return [
+            Document(content=f"{d.content} {j}", meta=dict(d.meta))
+            for d in docs
+            for j in range(3)
+        ]
+
+    def embed_chunks(self, chunks):
+        if Path(chunks[0].meta["source"]).name in self.partial:
+            return chunks[1:]
+        return chunks
+
+
+def _files(n):
+    return [Path(f"/data/f{i}.txt") for i in range(n)]
+
+
+def test_file_errors_skip_file_and_partial_counts_reach_sink():
+    calls = []
+    pipeline = StreamingIngestPipeline(
+        _FakeProcessor(chunk_error={"f1.txt"}, partial={"f2.txt"}),
+        lambda source, docs, n: calls.append((Path(source).name, len(docs), n)),
+        queue_size=1,
+    )
+
+    written = pipeline.run(_files(4))
+
+    assert sorted(calls) == [("f0.txt", 3, 3), ("f2.txt", 2, 3), ("f3.txt", 3, 3)]
+    assert len(written) == 3
+    assert pipeline.stats["write"].files == 3
+
+
+def test_sink_error_stops_pipeline_and_propagates():
+    calls = []
+
+    def sink(source, docs, n):
+        calls.append(source)
+        if len(calls) == 2:
+            raise ConnectionError("Qdrant mất kết nối")
+
+    pipeline = StreamingIngestPipeline(_FakeProcessor(), sink, queue_size=1)
+
+    with pytest.raises(ConnectionError):
+        pipeline.run(_files(50))
+    assert len(calls) == 2
+
+
+def test_parse_error_propagates_after_earlier_files_written():
+    calls = []
+    pipeline = StreamingIngestPipeline(
+        _FakeProcessor(parse_error_at=2),
+        lambda source, docs, n: calls.append(source),
+    )
+
+    with pytest.raises(OSError):
+        pipeline.run(_files(5))
+    assert len(calls) <= 2
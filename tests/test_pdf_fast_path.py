@@ -0,0 +1,65 @@
+import ctypes
+
+import pytest
+
+pdfium = pytest.importorskip("pypdfium2")
+import pypdfium2.raw as pdfium_c
+
+from parsers._docling_pdf_parser import PdfParser
+
+_PROSE = [
+    "Báo cáo quý. Đoạn văn mô tả kết quả kinh doanh bằng văn xuôi.",
+    "Dòng thứ hai của đoạn văn, không có cột nào thẳng hàng cả.",
+]
+
+
+def _make_pdf(path, rows):
+    """PDF 1 trang: 2 dòng văn xuôi, rồi các dòng `rows` (mỗi ô đặt tại x cố định, không kẻ viền)."""
+    pdf = pdfium.PdfDocument.new()
+    page = pdf.new_page(595, 842)
+    font = pdfium_c.FPDFText_LoadStandardFont(pdf.raw, b"Helvetica")
+
+    def put(x, y, text):
+        obj = pdfium_c.FPDFPageObj_CreateTextObj(pdf.raw, font, 10.0)
+        buf = ctypes.create_string_buffer((text + "\0").encode("utf-16-le"))
+        pdfium_c.FPDFText_SetText(
+            obj, ctypes.cast(buf, ctypes.POINTER(pdfium_c.FPDF_WCHAR))
+        )
+        pdfium_c.FPDFPageObj_Transform(obj, 1, 0, 0, 1, x, y)
+        pdfium_c.FPDFPage_InsertObject(page.raw, obj)
+
+    y = 800
+    for line in _PROSE:
+        put(50, y, line)
+        y -= 14
+    y -= 16
+    for row in rows:
+        for x, cell in zip((50, 220, 390), row):
+            put(x, y, cell)
+        y -= 14
+    pdfium_c.FPDFPage_GenerateContent(page.raw)
+    pdf.save(str(path))
+    pdf.close()
+
+
+def _classify(tmp_path, rows):
+    path = tmp_path / "doc.pdf"
+    _make_pdf(path, rows)
+    parser = PdfParser(images_root=tmp_path, extract_images=False, text_fast_path=True)
+    return parser._classify_pages(path)[0]
+
+
+def test_borderless_table_goes_to_docling(tmp_path):
+    rows = [("Vùng", "Doanh thu", "Tăng")] + [
+        (f"Khu {i}", str(i * 1000), f"{i}.5%") for i in range(1, 5)
+    ]
+    page = _classify(tmp_path, rows)
+    assert page["path"] == "docling"
+    assert "bảng" in page["reason"]
+
+
+def test_prose_and_short_column_runs_stay_on_text_path(tmp_path):
+    # 2 dòng có cột chưa đủ _TABLE_MIN_ROWS -> vẫn là trang text
+    page = _classify(tmp_path, [("Ký tên", "Ngày", "Nơi")] * 2)
+    assert page["path"] == "text"
+    assert page["text"]
@@ -0,0 +1,209 @@
+from dataclasses import replace
+
+import pytest
+from haystack import Document
+from haystack_integrations.document_stores.qdrant import QdrantDocumentStore
+
+import config
+from storage.file_manifest import FileManifest
+from storage.qdrant_store_manager import QdrantManager
+
+
+def _manager(tmp_path, index="test"):
+    store = QdrantDocumentStore(location=":memory:", index=index, embedding_dim=4)
+    store.count_documents()  # khởi tạo client + collection
+    return QdrantManager(
+        store, manifest=FileManifest(tmp_path / "manifest.json", index)
+    )
+
+
+def _file(tmp_path, name="a.txt", text="nội dung"):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path.resolve())
+
+
+def _docs(source, n=3):
+    return [
+        Document(
+            id=f"{source}-{j}",
+            content=f"chunk {j}",
+            meta={"source": source, "document_id": source},
+            embedding=[1.0, float(j), 0.0, 0.0],
+        )
+        for j in range(n)
+    ]
+
+
+def test_reingest_after_manifest_loss_overwrites(tmp_path):
+    manager = _manager(tmp_path)
+    source = _file(tmp_path)
+    manager.add_chunks({source: _docs(source)})
+    # Crash trước khi manifest được lưu: points còn trong Qdrant, manifest không biết file
+    manager.manifest.remove(source)
+
+    manager.add_chunks({source: _docs(source)})
+
+    assert manager._points_count() == 3
+    assert manager.manifest.get(source)["chunks"] == 3
+
+
+def test_partially_embedded_file_is_retried(tmp_path):
+    manager = _manager(tmp_path)
+    complete, partial = _file(tmp_path, "a.txt"), _file(tmp_path, "b.txt")
+    # b.txt ra 3 chunks nhưng chỉ 2 chunk embed được
+    manager.add_chunks(
+        {complete: _docs(complete), partial: _docs(partial, 2)},
+        expected={complete: 3, partial: 3},
+    )
+
+    new, changed, removed = manager.manifest.diff(
+        [tmp_path / "a.txt", tmp_path / "b.txt"]
+    )
+    assert (new, removed) == ([], [])
+    assert changed == [tmp_path / "b.txt"]
+
+
+def test_bulk_load_reupload_does_not_wait_for_point_count(tmp_path, monkeypatch):
+    manager = _manager(tmp_path)
+    source = _file(tmp_path)
+    manager.add_chunks({source: _docs(source)})
+    monkeypatch.setattr(config, "BULK_OPTIMIZE_TIMEOUT", 0)
+    waits = []
+    wait = manager._wait_until_indexed
+
+    def recording_wait(timeout):
+        waits.append(wait(timeout))
+        return waits[-1]
+
+    monkeypatch.setattr(manager, "_wait_until_indexed", recording_wait)
+
+    # Upload lại cùng id: số points không tăng nhưng vẫn coi là đã index xong
+    with manager.bulk_load():
+        manager.add_chunks({source: _docs(source)})
+
+    assert waits == [True]
+    assert manager._points_count() == 3
+
+
+def test_bulk_load_failure_skips_index_wait(tmp_path, monkeypatch):
+    manager = _manager(tmp_path)
+    source = _file(tmp_path)
+    waits = []
+    monkeypatch.setattr(manager, "_wait_until_indexed", waits.append)
+
+    with pytest.raises(RuntimeError):
+        with manager.bulk_load():
+            manager.add_chunks({source: _docs(source)})
+            raise RuntimeError("parse lỗi")
+
+    assert waits == []
+    assert len(manager.manifest) == 0
+
+
+def test_get_all_chunks_limit_offset(tmp_path):
+    manager = _manager(tmp_path)
+    source = _file(tmp_path)
+    manager.add_chunks({source: _docs(source, 10)})
+    all_ids = [d.id for d in manager.get_all_chunks(source)]
+
+    assert len(all_ids) == 10
+    assert [d.id for d in manager.get_all_chunks(source, limit=4)] == all_ids[:4]
+    assert [d.id for d in manager.get_all_chunks(source, 4, 8)] == all_ids[8:]
+    assert manager.get_all_chunks(source, limit=0) == []
+
+
+def test_update_chunks_embeds_only_added(tmp_path):
+    manager = _manager(tmp_path)
+    source = _file(tmp_path)
+    old = _docs(source, 3)
+    manager.add_chunks({source: old})
+    renamed = {**old[0].meta, "trace": "Trang 2"}
+    new = [
+        Document(id=old[0].id, content=old[0].content, meta=renamed),
+        Document(id=old[1].id, content=old[1].content, meta=old[1].meta),
+        Document(id=f"{source}-new", content="chunk mới", meta=old[0].meta),
+    ]
+    embedded = []
+
+    def embed(docs):
+        embedded.extend(d.id for d in docs)
+        return [replace(d, embedding=[0.0, 0.0, 1.0, 0.0]) for d in docs]
+
+    manager.update_chunks({source: new}, embed=embed)
+
+    assert embedded == [f"{source}-new"]
+    chunks = {d.id: d for d in manager.get_all_chunks(source)}
+    assert sorted(chunks) == sorted(d.id for d in new)
+    assert chunks[old[0].id].meta["trace"] == "Trang 2"
+    assert manager.manifest.get(source)["chunks"] == 3
+
+
+def _ingest(manager, tmp_path, n_files):
+    sources = [_file(tmp_path, f"f{i}.txt", f"nội dung {i}") for i in range(n_files)]
+    manager.add_chunks({s: _docs(s, 2) for s in sources})
+    return sources
+
+
+def _count_deletes(manager, monkeypatch, fail_on=None):
+    calls = []
+    delete = manager.client.delete
+
+    def counting(**kwargs):
+        calls.append(kwargs)
+        if len(calls) == fail_on:
+            raise ConnectionError("Qdrant mất kết nối")
+        return delete(**kwargs)
+
+    monkeypatch.setattr(manager.client, "delete", counting)
+    return calls
+
+
+def test_delete_files_one_request_per_batch(tmp_path, monkeypatch):
+    manager = _manager(tmp_path)
+    sources = _ingest(manager, tmp_path, 5)
+    calls = _count_deletes(manager, monkeypatch)
+
+    counts = manager.delete_files(sources, batch_size=2)
+
+    assert len(calls) == 3
+    assert counts == {s: 2 for s in sources}
+    assert manager._points_count() == 0
+    assert len(manager.manifest) == 0
+
+
+def test_delete_failure_keeps_remaining_files_in_manifest(tmp_path, monkeypatch):
+    manager = _manager(tmp_path)
+    sources = _ingest(manager, tmp_path, 5)
+    _count_deletes(manager, monkeypatch, fail_on=2)
+
+    with pytest.raises(ConnectionError):
+        manager.delete_files(sources, batch_size=2)
+
+    assert [s for s in sources if manager.manifest.get(s)] == sources[2:]
+    assert manager._points_count() == 6
+
+
+@pytest.mark.parametrize("prefetch", [0, 2])
+def test_iter_chunks_follows_next_page_offset(tmp_path, monkeypatch, prefetch):
+    manager = _manager(tmp_path)
+    source, other = _file(tmp_path, "a.txt"), _file(tmp_path, "b.txt")
+    manager.add_chunks({source: _docs(source, 10), other: _docs(other, 3)})
+    offsets, returned = [], []
+    scroll = manager.client.scroll
+
+    def recording(**kwargs):
+        offsets.append(kwargs["offset"])
+        points, next_offset = scroll(**kwargs)
+        returned.append(next_offset)
+        return points, next_offset
+
+    monkeypatch.setattr(manager.client, "scroll", recording)
+
+    ids = [d.id for d in manager.iter_chunks(source, page_size=4, prefetch=prefetch)]
+
+    assert sorted(ids) == sorted(d.id for d in _docs(source, 10))
+    assert len(offsets) == 3
+    assert offsets == [None, *returned[:-1]]
+    assert returned[-1] is None
+    assert len(list(manager.iter_chunks(ids_only=True, page_size=5))) == 13
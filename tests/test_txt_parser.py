@@ -0,0 +1,40 @@
+from parsers._docling_txt_parser import TxtParser
+
+_VI = "tăng đô ăn ơn Đà"
+
+
+def _count_reads(parser, monkeypatch):
+    encodings = []
+    read = parser._iter_paragraphs
+
+    def counting(path, encoding, errors="strict"):
+        encodings.append(encoding)
+        return read(path, encoding, errors)
+
+    monkeypatch.setattr(parser, "_iter_paragraphs", counting)
+    return encodings
+
+
+def test_non_ascii_after_sample_window_uses_next_encoding(tmp_path, monkeypatch):
+    # 64 KB đầu toàn ASCII (utf-8 decode được), phần tiếng Việt cp1258 nằm sau sample
+    path = tmp_path / "cp1258.txt"
+    path.write_bytes(b"a" * (64 * 1024) + b"\n\n" + _VI.encode("cp1258"))
+    parser = TxtParser()
+    reads = _count_reads(parser, monkeypatch)
+
+    docs = parser.parse(path)
+
+    assert docs[-1].content.endswith(_VI)
+    # Khối ASCII đã yield trước khi gặp lỗi decode không bị lặp lại
+    assert [d.meta["trace"] for d in docs] == ["Khối 1", "Khối 2"]
+    assert reads == ["utf-8-sig", "cp1258"]
+
+
+def test_utf8_file_is_read_once(tmp_path, monkeypatch):
+    path = tmp_path / "utf8.txt"
+    path.write_text("x" * (70 * 1024) + "\n\n" + _VI, encoding="utf-8")
+    parser = TxtParser(read_chunk_chars=1024)
+    reads = _count_reads(parser, monkeypatch)
+
+    assert parser.parse(path)[-1].content.endswith(_VI)
+    assert len(reads) == 1 and reads[0] in ("utf-8-sig", "utf-8")
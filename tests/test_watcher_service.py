@@ -0,0 +1,87 @@
+from services.watcher_service import WatcherService
+
+
+class _FakeDB:
+    def __init__(self):
+        self.busy = set()
+
+    def is_busy(self, path):
+        return path in self.busy
+
+
+def _watcher(tmp_path, **kwargs):
+    kwargs.setdefault("debounce_seconds", 5)
+    return WatcherService(_FakeDB(), tmp_path, **kwargs)
+
+
+def _queued(watcher):
+    items = []
+    while not watcher._queue.empty():
+        items.append(watcher._queue.get_nowait())
+    return items
+
+
+def _write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return str(path.resolve())
+
+
+def test_debounce_waits_until_file_is_stable(tmp_path):
+    watcher = _watcher(tmp_path)
+    path = _write(tmp_path, "a.txt", "đang ghi")
+    watcher.poll_once(now=0)
+    watcher.poll_once(now=3)
+    assert _queued(watcher) == []
+
+    # Ghi tiếp -> debounce tính lại từ lần đổi cuối
+    _write(tmp_path, "a.txt", "đang ghi... xong")
+    watcher.poll_once(now=4)
+    watcher.poll_once(now=8.9)
+    assert _queued(watcher) == []
+    watcher.poll_once(now=9)
+    assert _queued(watcher) == [("upsert", [path])]
+
+    # File lạ (đuôi khác, file tạm Office) bị bỏ qua; xóa file -> batch delete
+    _write(tmp_path, "~$a.docx", "tạm")
+    _write(tmp_path, "b.csv", "x")
+    (tmp_path / "a.txt").unlink()
+    watcher._in_flight.clear()
+    watcher.poll_once(now=10)
+    watcher.poll_once(now=15)
+    assert _queued(watcher) == [("delete", [path])]
+
+
+def test_busy_files_wait_for_db(tmp_path):
+    watcher = _watcher(tmp_path)
+    path = _write(tmp_path, "a.txt", "nội dung")
+    watcher.db_service.busy.add(path)
+    watcher.poll_once(now=0)
+    watcher.poll_once(now=10)
+    assert _queued(watcher) == []
+
+    watcher.db_service.busy.clear()
+    watcher.poll_once(now=11)
+    assert _queued(watcher) == [("upsert", [path])]
+
+
+def test_full_queue_keeps_changes_pending(tmp_path):
+    watcher = _watcher(tmp_path, batch_size=2, queue_size=1)
+    paths = sorted(_write(tmp_path, f"f{i}.txt", str(i)) for i in range(5))
+    watcher.poll_once(now=0)
+    watcher.poll_once(now=5)
+
+    # Queue chỉ chứa 1 batch, phần còn lại vẫn chờ (không mất thay đổi)
+    assert watcher._queue.qsize() == 1
+    assert len(watcher._pending) == 3
+
+    batches = []
+    for _ in range(3):
+        op, batch = watcher._queue.get_nowait()
+        batches.append(batch)
+        # giống _worker: xử lý xong thì bỏ khỏi in-flight
+        watcher._in_flight.difference_update(batch)
+        watcher.poll_once(now=6)
+    assert sorted(p for batch in batches for p in batch) == paths
+    assert [len(b) for b in batches] == [2, 2, 1]
+    assert watcher._pending == {}
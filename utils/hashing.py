@@ -0,0 +1,34 @@
+from pathlib import Path
+import hashlib
+import uuid
+
+
+def file_sha256(path: Path, chunk_size: int = 1 << 20) -> str:
+    """
+    Hash SHA-256 nội dung file (đọc theo từng khối để không tốn RAM với file lớn).
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def file_document_id(path: Path) -> str:
+    """
+    document_id ổn định theo (đường dẫn, nội dung) của file:
+    chỉ "touch" file (đổi mtime) thì id không đổi, sửa nội dung thì id đổi.
+    """
+    seed = f"{path.resolve()}:{file_sha256(path)}"
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, seed))
+
+
+def chunk_id(source: str, content: str, occurrence: int = 0) -> str:
+    """
+    Id ổn định của 1 chunk theo (file nguồn, hash nội dung chunk):
+    sửa 1 đoạn của file chỉ đổi id các chunk bị ảnh hưởng, chunk khác giữ nguyên id.
+    occurrence phân biệt các chunk trùng nội dung trong cùng 1 file.
+    """
+    content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+    seed = f"{source}:{content_hash}" + (f":{occurrence}" if occurrence else "")
+    return hashlib.sha256(seed.encode("utf-8")).hexdigest()
@@ -0,0 +1,81 @@
+"""
+Chuẩn hóa text và tách câu dùng chung cho các parser.
+- normalize_text: gỡ ngắt dòng có gạch nối, bỏ soft-hyphen, gom mọi khoảng trắng/xuống dòng
+  thành 1 dấu cách — 1 lần quét regex (chỉ khi có "-" và xuống dòng) + split/join chạy trong C.
+- SentenceWindow: cửa sổ N câu gần nhất (deque có maxlen), dùng làm văn cảnh cho bảng/ảnh.
+- sentence_spans: vị trí (start, end) từng câu trong text gốc, 1 lần quét regex, không cần NLTK.
+"""
+
+from __future__ import annotations
+from collections import deque
+from itertools import islice
+from typing import List, Tuple
+import re
+
+# Gạch nối cuối dòng: "phát tri-\nển" -> "phát triển"
+_HYPHEN_BREAK = re.compile(r"-\s*\n")
+
+SENT_SPLIT = re.compile(r"(?<=[\.!?])\s+(?=[A-ZÀ-Ỵ])|(?<=[\.!\?])\s+(?=\d+)|\n{2,}")
+
+
+def normalize_text(t: str) -> str:
+    """Chuẩn hóa text trích từ tài liệu về 1 dòng, khoảng trắng đơn, không có khoảng trắng 2 đầu."""
+    if not t:
+        return ""
+    if "\u00ad" in t:
+        t = t.replace("\u00ad", "")  # bỏ soft-hyphen
+    if "-" in t and "\n" in t:
+        t = _HYPHEN_BREAK.sub("", t)  # gỡ ngắt dòng có gạch nối
+    # gom dòng + bóp khoảng trắng + strip
+    return " ".join(t.split())
+
+
+# 1 câu: bắt đầu bằng ký tự khác trắng, kết thúc ở dấu câu (kèm ngoặc/nháy đóng) trước khoảng
+# trắng, ở cuối dòng hoặc cuối text. "3.5%" / "v1.2" không bị tách vì sau dấu chấm không phải khoảng trắng.
+_SENT_SPAN = re.compile(r"\S[^\n]*?(?:[.!?…]+[\"'”’)\]]*(?=\s)|(?=\n)|\Z)")
+_WORD_SPAN = re.compile(r"\S+")
+
+
+def sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """(start, end) của từng câu trong text (không gồm khoảng trắng giữa các câu)."""
+    return [m.span() for m in _SENT_SPAN.finditer(text)]
+
+
+def word_spans(text: str, start: int = 0, end: int = -1) -> List[Tuple[int, int]]:
+    """(start, end) của từng từ trong text[start:end] (dùng khi 1 câu quá dài)."""
+    end = len(text) if end < 0 else end
+    return [m.span() for m in _WORD_SPAN.finditer(text, start, end)]
+
+
+def split_sentences(text: str) -> List[str]:
+    """Tách câu; không tách được thì fallback theo dòng."""
+    sents = [s.strip() for s in SENT_SPLIT.split(text or "") if s.strip()]
+    return sents or [ln.strip() for ln in (text or "").splitlines() if ln.strip()]
+
+
+class SentenceWindow:
+    """Giữ tối đa max_sentences câu gần nhất (deque: thêm/bỏ câu cũ O(1), không cắt list)."""
+
+    __slots__ = ("_sentences",)
+
+    def __init__(self, max_sentences: int = 6) -> None:
+        self._sentences: deque = deque(maxlen=max(1, int(max_sentences)))
+
+    def push(self, text: str) -> None:
+        """Thêm các câu của text (đã chuẩn hóa) vào cửa sổ."""
+        self._sentences.extend(split_sentences(text))
+
+    def context(self, n: int) -> str:
+        """N câu cuối cùng nối bằng dấu cách."""
+        if n <= 0 or not self._sentences:
+            return ""
+        if n >= len(self._sentences):
+            return " ".join(self._sentences).strip()
+        tail = list(islice(reversed(self._sentences), n))
+        return " ".join(reversed(tail)).strip()
+
+    def clear(self) -> None:
+        self._sentences.clear()
+
+    def __len__(self) -> int:
+        return len(self._sentences)
@@ -0,0 +1,147 @@
+"""
+Đếm/cắt token theo tokenizer của model embedding, dùng chung cho EmbeddingDispatcher
+(đóng gói batch) và TokenChunker (chia chunk theo ngân sách token):
+- TokenCounter: tiktoken (model OpenAI). Không có tiktoken (hoặc không tải được bảng BPE)
+  thì ước lượng ~3 ký tự/token.
+- HFTokenCounter: tokenizer Hugging Face (`tokenizers`) của model local (fastembed).
+"""
+
+from typing import List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Ước lượng số token (tiếng Việt ~3 ký tự/token) khi không có tiktoken."""
+    return len(text) // 3 + 1
+
+
+class TokenCounter:
+    """
+    Đếm/cắt token bằng tiktoken theo model; không dùng được tiktoken thì dùng ước lượng.
+    model=None: chỉ ước lượng (model không dùng tokenizer tiktoken).
+    """
+
+    def __init__(self, model: Optional[str]) -> None:
+        self._encoding = None
+        if model is None:
+            return
+        try:
+            import tiktoken
+        except ImportError:
+            logger.warning("Chưa cài tiktoken, số token chỉ là ước lượng")
+            return
+        try:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            # Bảng BPE được tải từ mạng ở lần dùng đầu tiên
+            logger.warning(f"Không tải được tokenizer ({e}), số token chỉ là ước lượng")
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        if self._encoding is None:
+            return estimate_tokens(text)
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def count_many(self, texts: List[str]) -> List[int]:
+        if self._encoding is None:
+            return [estimate_tokens(t) for t in texts]
+        # encode_batch chạy song song trong tiktoken (Rust)
+        return [
+            len(tokens)
+            for tokens in self._encoding.encode_batch(texts, disallowed_special=())
+        ]
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if self._encoding is None:
+            return text[: max_tokens * 3]
+        tokens = self._encoding.encode(text, disallowed_special=())
+        return self._encoding.decode(tokens[:max_tokens])
+
+    def split(self, text: str, max_tokens: int) -> List[str]:
+        """
+        Cắt text thành các đoạn liên tiếp, mỗi đoạn tối đa max_tokens token.
+        Các đoạn là lát cắt của text gốc (nối lại đúng bằng text), chỉ cắt ở ranh giới ký tự.
+        """
+        if self._encoding is None:
+            step = max(1, (max_tokens - 1) * 3)
+            return [text[i : i + step] for i in range(0, len(text), step)]
+        tokens = self._encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return [text]
+        decoded, offsets = self._encoding.decode_with_offsets(tokens)
+        if decoded != text:  # text có ký tự không mã hóa utf-8 được (surrogate lẻ)
+            step = max(1, max_tokens)
+            return [text[i : i + step] for i in range(0, len(text), step)]
+        # 1 token BPE có thể cắt giữa 1 ký tự nhiều byte (tiếng Việt có dấu): chỉ cắt ở token
+        # bắt đầu bằng byte đầu của ký tự, vị trí cắt lấy theo offset ký tự trong text gốc
+        starts = [
+            self._encoding.decode_single_token_bytes(t)[0] & 0xC0 != 0x80
+            for t in tokens
+        ]
+        pieces: List[str] = []
+        s = 0
+        while s < len(tokens):
+            e = s + max_tokens
+            if e >= len(tokens):
+                pieces.append(text[offsets[s] :])
+                break
+            while e > s + 1 and not starts[e]:
+                e -= 1
+            while e < len(tokens) and not starts[e]:  # 1 ký tự dài hơn max_tokens token
+                e += 1
+            pieces.append(
+                text[offsets[s] : offsets[e]] if e < len(tokens) else text[offsets[s] :]
+            )
+            s = e
+        return pieces
+
+
+class HFTokenCounter:
+    """
+    Cùng API với TokenCounter, dùng tokenizer Hugging Face của model (vd model fastembed).
+    Đếm không tính token đặc biệt ([CLS]/[SEP]...) và không bị cắt theo max_length của model.
+    """
+
+    def __init__(self, tokenizer) -> None:
+        from tokenizers import Tokenizer
+
+        # Bản sao riêng: tắt truncation/padding mà không ảnh hưởng tokenizer của model
+        self._tokenizer = Tokenizer.from_str(tokenizer.to_str())
+        self._tokenizer.no_truncation()
+        self._tokenizer.no_padding()
+
+    @property
+    def exact(self) -> bool:
+        return True
+
+    def count(self, text: str) -> int:
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+    def count_many(self, texts: List[str]) -> List[int]:
+        return [
+            len(e.ids)
+            for e in self._tokenizer.encode_batch(texts, add_special_tokens=False)
+        ]
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        offsets = self._tokenizer.encode(text, add_special_tokens=False).offsets
+        if len(offsets) <= max_tokens:
+            return text
+        return text[: offsets[max_tokens][0]]
+
+    def split(self, text: str, max_tokens: int) -> List[str]:
+        """Cắt text thành các lát cắt liên tiếp tối đa max_tokens token (theo offset ký tự)."""
+        offsets = self._tokenizer.encode(text, add_special_tokens=False).offsets
+        if len(offsets) <= max_tokens:
+            return [text]
+        cuts = [offsets[i][0] for i in range(max_tokens, len(offsets), max_tokens)]
+        bounds = [0, *cuts, len(text)]
+        return [text[a:b] for a, b in zip(bounds, bounds[1:]) if b > a]